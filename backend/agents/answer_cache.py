@@ -0,0 +1,129 @@
+"""
+시맨틱 답변 캐시 — 방문자 간에 거의 같은 질문("ダウンタイムはどれくらい？" 등)에 생성된 답변을 재사용.
+
+키: 최신 사용자 메시지 임베딩 + 언어 + 리포트 안내 여부 (+ 카테고리를 알면 카테고리)
+  - 코사인 유사도 >= CHAT_ANSWER_CACHE_THRESHOLD인 가장 가까운 항목을 반환
+  - 대화 이력/롤링 요약 없이 생성된 답변(첫 턴)만 저장·조회 (판정은 chat_router.is_cacheable_turn)
+  - cta_level 등 세션별 값은 저장하지 않음 — 히트 시 호출 측이 현재 세션 기준으로 채움
+  - 조회는 라우팅과 병렬 (라우팅 전에 아는 값만 키로 사용 — chat_router.run_multi_agent_chat)
+  - TTL + 최대 항목 수(LRU), faq_vectors 변경 시 rag_agent.invalidate_faq_cache에서 함께 비움
+
+프로세스 내 메모리 캐시 — 항목 수가 작아(수천) 전수 내적으로 조회한다.
+"""
+import logging
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import (
+    CHAT_ANSWER_CACHE_TTL_SEC,
+    CHAT_ANSWER_CACHE_MAX_ENTRIES,
+    CHAT_ANSWER_CACHE_THRESHOLD,
+)
+
+logger = logging.getLogger(__name__)
+
+# 세션마다 다시 판정하는 필드 — 다른 방문자의 값이 섞이지 않도록 저장 전에 제거
+_SESSION_FIELDS = ("cta_level",)
+
+
+class SemanticAnswerCache:
+    def __init__(self, ttl: int, max_entries: int, threshold: float):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.threshold = threshold
+        # key → (저장 시각, 정규화 임베딩, 언어, 카테고리, 리포트 안내 여부, 원문 메시지, 결과)
+        self._entries: OrderedDict[int, tuple[float, np.ndarray, str, str, bool, str, dict]] = OrderedDict()
+        self._next_key = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray | None:
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else None
+
+    def _expire(self):
+        now = time.time()
+        expired = [k for k, entry in self._entries.items() if now - entry[0] > self.ttl]
+        for k in expired:
+            del self._entries[k]
+
+    def lookup(
+        self, embedding: list[float], language: str, category: str | None, report_hint: bool,
+    ) -> dict | None:
+        """가장 유사한 캐시 답변의 복사본 (similarity 포함, 세션별 필드 없음). 없으면 None.
+        report_hint: 현재 세션에서 답변에 리포트 안내를 넣어야 하는지 — 같은 조건으로 생성된 답변만 반환"""
+        if not self.enabled or not self._entries:
+            self.misses += 1
+            return None
+        query = self._normalize(embedding)
+        if query is None:
+            self.misses += 1
+            return None
+
+        self._expire()
+        keys = [
+            k for k, entry in self._entries.items()
+            if entry[2] == language and (category is None or entry[3] == category) and entry[4] == report_hint
+        ]
+        if not keys:
+            self.misses += 1
+            return None
+        sims = np.vstack([self._entries[k][1] for k in keys]) @ query
+        best = int(np.argmax(sims))
+        if float(sims[best]) < self.threshold:
+            self.misses += 1
+            return None
+
+        key = keys[best]
+        self._entries.move_to_end(key)
+        self.hits += 1
+        _, _, _, _, _, message, result = self._entries[key]
+        logger.info(f"[AnswerCache] hit sim={float(sims[best]):.3f} cached_q={message[:40]!r}")
+        return {
+            **result,
+            "rag_references": [dict(r) for r in result.get("rag_references") or []],
+            "cache_similarity": round(float(sims[best]), 4),
+        }
+
+    def put(
+        self, embedding: list[float], language: str, category: str, report_hint: bool, message: str, result: dict,
+    ):
+        if not self.enabled:
+            return
+        vec = self._normalize(embedding)
+        if vec is None:
+            return
+        stored = {k: v for k, v in result.items() if k not in _SESSION_FIELDS}
+        stored["rag_references"] = [dict(r) for r in result.get("rag_references") or []]
+        self._entries[self._next_key] = (time.time(), vec, language, category, report_hint, message, stored)
+        self._next_key += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self, reason: str):
+        if self._entries:
+            logger.info(f"[AnswerCache] Invalidated {len(self._entries)} entries ({reason})")
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "threshold": self.threshold,
+        }
+
+
+answer_cache = SemanticAnswerCache(
+    CHAT_ANSWER_CACHE_TTL_SEC, CHAT_ANSWER_CACHE_MAX_ENTRIES, CHAT_ANSWER_CACHE_THRESHOLD,
+)
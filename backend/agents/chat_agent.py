@@ -3,6 +3,7 @@ import logging
 
 from services.gemini_client import generate_text, generate_json, get_query_embedding
 from agents.rag_agent import search_relevant_faq
+from agents.rag_context import assemble_rag_context
 
 logger = logging.getLogger(__name__)
 
@@ -87,21 +88,20 @@ def _get_system_prompt(language: str = "ja") -> str:
     return SYSTEM_PROMPT_JA
 
 
-async def extract_keywords_from_messages(
-    messages: list[dict], language: str = "ja"
-) -> list[str]:
-    """최근 사용자 메시지에서 RAG 검색용 키워드를 추출"""
-    # 사용자 메시지만 추출 (최근 5개)
-    user_texts = [
-        m["content"] for m in messages if m["role"] == "user"
-    ][-5:]
+def recent_user_texts(messages: list[dict], limit: int = 5) -> list[str]:
+    """키워드 추출 대상 — 최근 사용자 메시지 limit개"""
+    return [m["content"] for m in messages if m["role"] == "user"][-limit:]
+
 
+def build_keyword_prompt(messages: list[dict]) -> str | None:
+    """키워드 추출 프롬프트 (사용자 메시지가 없으면 None)"""
+    user_texts = recent_user_texts(messages)
     if not user_texts:
-        return []
+        return None
 
     combined = "\n".join(user_texts)
 
-    prompt = f"""다음 사용자 메시지에서 미용 의료 상담과 관련된 핵심 키워드를 한국어로 추출해주세요.
+    return f"""다음 사용자 메시지에서 미용 의료 상담과 관련된 핵심 키워드를 한국어로 추출해주세요.
 시술명, 부위명, 증상, 고민 등을 포함합니다.
 
 사용자 메시지:
@@ -110,12 +110,25 @@ async def extract_keywords_from_messages(
 JSON 배열로 반환 (최대 8개):
 예: ["코끝 성형", "자연스러운 코", "회복 기간"]
 """
+
+
+def parse_keywords(data) -> list[str]:
+    if isinstance(data, list):
+        return [str(k) for k in data[:8]]
+    return []
+
+
+async def extract_keywords_from_messages(
+    messages: list[dict], language: str = "ja"
+) -> list[str]:
+    """최근 사용자 메시지에서 RAG 검색용 키워드를 추출"""
+    prompt = build_keyword_prompt(messages)
+    if prompt is None:
+        return []
+
     try:
         raw = await generate_json(prompt, model_name="gemini-2.5-flash-lite")
-        data = json.loads(raw)
-        if isinstance(data, list):
-            return [str(k) for k in data[:8]]
-        return []
+        return parse_keywords(json.loads(raw))
     except Exception as e:
         logger.warning(f"[ChatAgent] Keyword extraction failed: {e}")
         return []
@@ -161,23 +174,12 @@ async def detect_category_from_messages(
 
 async def generate_chat_response(
     messages: list[dict],
-    rag_results: list[dict],
+    rag_context: str,
     language: str = "ja",
 ) -> str:
-    """대화 이력 + RAG 결과를 바탕으로 AI 응답 생성"""
+    """대화 이력 + RAG 컨텍스트(assemble_rag_context 결과)를 바탕으로 AI 응답 생성"""
     system_prompt = _get_system_prompt(language)
 
-    # RAG 컨텍스트 구성
-    rag_context = ""
-    if rag_results:
-        rag_lines = []
-        for i, faq in enumerate(rag_results, 1):
-            q = faq.get("question", "")
-            a = faq.get("answer", "")
-            proc = faq.get("procedure_name", "")
-            rag_lines.append(f"[참고{i}] 시술: {proc}\nQ: {q}\nA: {a}")
-        rag_context = "\n\n".join(rag_lines)
-
     # 대화 이력 구성 (최근 20개)
     recent = messages[-20:]
     history_lines = []
@@ -261,8 +263,9 @@ async def run_chat_rag(
         except Exception as e:
             logger.warning(f"[ChatAgent] RAG search failed: {e}")
 
-    # 4. 응답 생성
-    response_text = await generate_chat_response(messages, rag_results, language)
+    # 4. 응답 생성 (MMR 재정렬 + 토큰 예산 — 프롬프트에 들어간 항목만 참조로 반환)
+    rag_context, rag_results = assemble_rag_context(rag_results, "chat")
+    response_text = await generate_chat_response(messages, rag_context, language)
 
     # RAG 참조 정보 정리 (프론트엔드용 — youtube_url 포함)
     rag_references = []
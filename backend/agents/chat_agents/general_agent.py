@@ -1,6 +1,7 @@
 import logging
 
 from services.gemini_client import generate_text
+from agents.conversation_summary import build_history_text
 
 logger = logging.getLogger(__name__)
 
@@ -75,19 +76,13 @@ SYSTEM_PROMPT_KO = """당신은 「ARUMI(아루미)」 미용의료 플랫폼의
 async def generate_general_response(
     messages: list[dict],
     language: str = "ja",
+    summary: dict | None = None,
 ) -> str:
     system_prompt = SYSTEM_PROMPT_JA if language == "ja" else SYSTEM_PROMPT_KO
 
-    # 대화 이력 구성 (최근 10개)
-    recent = messages[-10:]
-    role_user = "ユーザー" if language == "ja" else "사용자"
+    # 대화 이력 구성 (요약 + 최근 10개)
     role_ai = "アシスタント" if language == "ja" else "안내"
-
-    history_lines = []
-    for m in recent:
-        label = role_user if m["role"] == "user" else role_ai
-        history_lines.append(f"{label}: {m['content']}")
-    history_text = "\n".join(history_lines)
+    history_text = build_history_text(messages[-10:], language, role_ai, summary)
 
     if language == "ja":
         prompt = f"""【会話履歴】
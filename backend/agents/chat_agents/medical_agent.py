@@ -1,8 +1,11 @@
 import logging
 
+from config import CHAT_RAG_MATCH_THRESHOLD, CHAT_RAG_MATCH_COUNT
 from services.gemini_client import generate_text
-from agents.rag_agent import search_relevant_faq
+from agents.rag_agent import SpeculativeRetrieval, search_relevant_faq
+from agents.rag_context import assemble_rag_context
 from agents.chat_agent import extract_keywords_from_messages
+from agents.conversation_summary import build_history_text
 
 logger = logging.getLogger(__name__)
 
@@ -98,6 +101,8 @@ async def generate_medical_response(
     category: str = "plastic_surgery",
     cta_level: str = "cool",
     pre_extracted_keywords: list[str] | None = None,
+    speculative: SpeculativeRetrieval | None = None,
+    summary: dict | None = None,
 ) -> tuple[str, list[dict]]:
     """치료전문 에이전트 응답 생성. Returns: (response_text, rag_references)"""
     system_prompt = SYSTEM_PROMPT_JA if language == "ja" else SYSTEM_PROMPT_KO
@@ -120,34 +125,23 @@ async def generate_medical_response(
     if keywords:
         try:
             rag_results = await search_relevant_faq(
-                keywords, category, match_threshold=0.55, match_count=8,
-                latest_message=latest_user_msg,
+                keywords, category,
+                match_threshold=CHAT_RAG_MATCH_THRESHOLD, match_count=CHAT_RAG_MATCH_COUNT,
+                latest_message=latest_user_msg, speculative=speculative,
             )
             logger.info(f"[MedicalAgent] RAG results: {len(rag_results)}")
         except Exception as e:
             logger.warning(f"[MedicalAgent] RAG search failed: {e}")
+    if speculative is not None:
+        speculative.discard()  # 키워드 없음/검색 실패 — 사용되지 않은 추측 검색 정리
 
     # 2. RAG 컨텍스트 구성
-    rag_context = ""
-    if rag_results:
-        rag_lines = []
-        for i, faq in enumerate(rag_results, 1):
-            q = faq.get("question", "")
-            a = faq.get("answer", "")
-            proc = faq.get("procedure_name", "")
-            rag_lines.append(f"[참고{i}] 시술: {proc}\nQ: {q}\nA: {a}")
-        rag_context = "\n\n".join(rag_lines)
-
-    # 3. 대화 이력 구성
-    recent = messages[-20:]
-    role_user = "ユーザー" if language == "ja" else "사용자"
-    role_ai = "専門コンサルタント" if language == "ja" else "전문상담"
+    # 후보 8건 → MMR 재정렬 + 토큰 예산 안에서 최대 5건 (프롬프트에 들어간 항목만 참조로 반환)
+    rag_context, rag_results = assemble_rag_context(rag_results, "medical", max_items=5)
 
-    history_lines = []
-    for m in recent:
-        label = role_user if m["role"] == "user" else role_ai
-        history_lines.append(f"{label}: {m['content']}")
-    history_text = "\n".join(history_lines)
+    # 3. 대화 이력 구성 (요약 + 최근 메시지, 토큰 예산)
+    role_ai = "専門コンサルタント" if language == "ja" else "전문상담"
+    history_text = build_history_text(messages, language, role_ai, summary)
 
     # 4. CTA 기반 리포트 안내 힌트
     report_hint = ""
@@ -1,11 +1,20 @@
 import asyncio
 import json
 import logging
+import random
 import re
 
+from config import (
+    CHAT_ROUTER_MODE, CHAT_FAST_ROUTER, CHAT_FAST_ROUTER_AUDIT_RATE,
+    CHAT_RAG_MATCH_THRESHOLD, CHAT_RAG_MATCH_COUNT, CHAT_SPECULATIVE_RAG,
+)
 from services.gemini_client import generate_json
 from services.supabase_client import get_supabase
-from agents.chat_agent import get_greeting, extract_keywords_from_messages
+from agents.chat_agent import (
+    get_greeting, extract_keywords_from_messages, recent_user_texts, parse_keywords,
+)
+from agents.answer_cache import answer_cache
+from agents.rag_agent import SpeculativeRetrieval
 from agents.chat_agents.general_agent import generate_general_response
 from agents.chat_agents.consultation_agent import generate_consultation_response
 from agents.chat_agents.medical_agent import generate_medical_response
@@ -82,6 +91,26 @@ JSON 형식으로 반환:
 {"intent": "medical", "category": "plastic_surgery", "cta_level": "hot"}
 """
 
+# 통합 라우터 — 의도/카테고리/CTA 판정과 RAG 키워드 추출을 한 번의 호출로 (CHAT_ROUTER_MODE=combined)
+# 위 ROUTE_PROMPT 뒤에 붙이며, 키워드 규칙은 extract_keywords_from_messages와 동일
+KEYWORD_ADDENDUM_JA = """
+【追加出力: keywords】
+下の【キーワード抽出対象】のユーザーメッセージから、美容医療相談に関する核心キーワードを**韓国語で**抽出してください。
+施術名、部位名、症状、悩みなどを含めます（最大8個）。intentが"greeting"または"general"の場合は空配列。
+
+JSON形式で返してください：
+{"intent": "medical", "category": "plastic_surgery", "cta_level": "hot", "keywords": ["코끝 성형", "자연스러운 코", "회복 기간"]}
+"""
+
+KEYWORD_ADDENDUM_KO = """
+【추가 출력: keywords】
+아래 【키워드 추출 대상】 사용자 메시지에서 미용 의료 상담과 관련된 핵심 키워드를 한국어로 추출해주세요.
+시술명, 부위명, 증상, 고민 등을 포함합니다 (최대 8개). intent가 "greeting" 또는 "general"이면 빈 배열.
+
+JSON 형식으로 반환:
+{"intent": "medical", "category": "plastic_surgery", "cta_level": "hot", "keywords": ["코끝 성형", "자연스러운 코", "회복 기간"]}
+"""
+
 # 이메일 정규식
 EMAIL_PATTERN = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
 
@@ -95,27 +124,61 @@ CONSENT_NO_PATTERN = re.compile(
     re.IGNORECASE,
 )
 
+# ============================================
+# Fast-path 라우터 어휘 — ROUTE_PROMPT의 판정 포인트를 로컬 규칙으로
+# 값은 RAG 검색용 한국어 키워드 (extract_keywords_from_messages와 같은 형식)
+# ============================================
+GREETING_PATTERN = re.compile(
+    r"(こんにちは|こんばんは|おはよう(ございます)?|はじめまして|よろしく(お願いします)?|"
+    r"안녕(하세요)?|반갑습니다|처음 뵙겠습니다|hi|hello)[\s!！?？。.~〜♪]*",
+    re.IGNORECASE,
+)
 
-async def route_message(
-    messages: list[dict],
-    language: str = "ja",
-) -> dict:
-    """사용자 메시지의 의도를 분류.
-    Returns: {"intent": "...", "category": "...", "email": "..." or None, "cta_level": "..."}
-    """
-    # 최신 사용자 메시지
-    latest_user_msg = ""
+CONSULTATION_TERMS = {
+    "いくら": "비용", "費用": "비용", "値段": "가격", "料金": "비용", "価格": "가격",
+    "予約": "예약", "日程": "일정", "スケジュール": "일정", "入院": "입원 기간", "期間": "회복 기간",
+    "얼마": "비용", "비용": "비용", "가격": "가격", "예약": "예약", "일정": "일정",
+    "스케줄": "일정", "입원": "입원 기간", "기간": "회복 기간",
+}
+
+MEDICAL_TERMS = {
+    "方法": "시술 방법", "副作用": "부작용", "効果": "효과", "原理": "원리", "リスク": "리스크",
+    "比較": "비교", "おすすめ": "추천 시술",
+    "방법": "시술 방법", "부작용": "부작용", "효과": "효과", "원리": "원리", "리스크": "리스크",
+    "비교": "비교", "추천": "추천 시술",
+}
+
+PROCEDURE_TERMS = {
+    "dermatology": {
+        "ニキビ": "여드름", "シミ": "기미", "肝斑": "기미", "毛穴": "모공", "レーザー": "레이저",
+        "HIFU": "하이푸", "ハイフ": "하이푸", "ウルセラ": "울쎄라", "リジュラン": "리쥬란",
+        "スキンブースター": "스킨부스터", "薄毛": "탈모",
+        "여드름": "여드름", "기미": "기미", "색소": "색소", "모공": "모공", "레이저": "레이저",
+        "하이푸": "하이푸", "울쎄라": "울쎄라", "리쥬란": "리쥬란", "스킨부스터": "스킨부스터", "탈모": "탈모",
+    },
+    "plastic_surgery": {
+        # "鼻" 단독은 鼻水/鼻炎 같은 증상 질문까지 잡으므로 시술 표현만
+        "二重": "쌍꺼풀", "鼻整形": "코 성형", "鼻の整形": "코 성형", "隆鼻": "코 성형", "鼻先": "코끝 성형",
+        "脂肪吸引": "지방흡입", "輪郭": "안면윤곽",
+        "リフティング": "리프팅", "リフトアップ": "리프팅", "豊胸": "가슴 성형",
+        "쌍꺼풀": "쌍꺼풀", "코성형": "코 성형", "코 성형": "코 성형", "코끝": "코끝 성형",
+        "지방흡입": "지방흡입", "윤곽": "안면윤곽", "리프팅": "리프팅", "가슴 성형": "가슴 성형",
+    },
+}
+
+
+def _latest_user_message(messages: list[dict]) -> str:
     for m in reversed(messages):
         if m["role"] == "user":
-            latest_user_msg = m["content"]
-            break
+            return m["content"]
+    return ""
 
-    if not latest_user_msg:
-        return {"intent": "greeting", "category": None, "email": None, "cta_level": "cool"}
 
-    # 이메일 감지
-    email_match = EMAIL_PATTERN.search(latest_user_msg)
-    detected_email = email_match.group(0) if email_match else None
+def build_route_prompt(messages: list[dict], language: str = "ja", with_keywords: bool = False) -> str | None:
+    """라우터 프롬프트 (사용자 메시지가 없으면 None). with_keywords=True면 키워드 추출까지 포함한 통합 프롬프트."""
+    latest_user_msg = _latest_user_message(messages)
+    if not latest_user_msg:
+        return None
 
     # 대화 이력 (최근 6개)
     recent = messages[-6:]
@@ -126,6 +189,8 @@ async def route_message(
     history_text = "\n".join(history_lines)
 
     route_prompt = ROUTE_PROMPT_JA if language == "ja" else ROUTE_PROMPT_KO
+    if with_keywords:
+        route_prompt += KEYWORD_ADDENDUM_JA if language == "ja" else KEYWORD_ADDENDUM_KO
 
     prompt = f"""{route_prompt}
 
@@ -135,33 +200,226 @@ async def route_message(
 【最新メッセージ / 최신 메시지】
 {latest_user_msg}
 """
+    if with_keywords:
+        # 이력 6개 밖의 사용자 메시지도 키워드에 반영 (기존 키워드 추출과 같은 최근 5개)
+        user_texts = "\n".join(recent_user_texts(messages))
+        prompt += f"""
+【キーワード抽出対象 / 키워드 추출 대상】
+{user_texts}
+"""
+    return prompt
 
-    try:
-        raw = await generate_json(prompt, model_name="gemini-2.5-flash-lite")
-        data = json.loads(raw)
-        if isinstance(data, list):
-            data = data[0] if data else {}
 
-        intent = data.get("intent", "general")
-        if intent not in ("greeting", "general", "consultation", "medical"):
-            intent = "general"
+def parse_route_result(data, detected_email: str | None = None) -> dict:
+    """라우터 JSON → 검증된 결과. keywords가 있으면 함께 반환 (없으면 None — 에이전트가 별도 추출)."""
+    if isinstance(data, list):
+        data = data[0] if data else {}
 
-        category = data.get("category", "plastic_surgery")
-        if category not in ("dermatology", "plastic_surgery"):
-            category = "plastic_surgery"
+    intent = data.get("intent", "general")
+    if intent not in ("greeting", "general", "consultation", "medical"):
+        intent = "general"
 
-        cta_level = data.get("cta_level", "cool")
-        if cta_level not in ("hot", "warm", "cool"):
-            cta_level = "cool"
+    category = data.get("category", "plastic_surgery")
+    if category not in ("dermatology", "plastic_surgery"):
+        category = "plastic_surgery"
 
-        result = {
-            "intent": intent,
-            "category": category if intent in ("consultation", "medical") else None,
-            "email": detected_email,
-            "cta_level": cta_level,
+    cta_level = data.get("cta_level", "cool")
+    if cta_level not in ("hot", "warm", "cool"):
+        cta_level = "cool"
+
+    result = {
+        "intent": intent,
+        "category": category if intent in ("consultation", "medical") else None,
+        "email": detected_email,
+        "cta_level": cta_level,
+    }
+    if "keywords" in data:
+        result["keywords"] = parse_keywords(data["keywords"])
+    return result
+
+
+def _detect_email(messages: list[dict]) -> str | None:
+    email_match = EMAIL_PATTERN.search(_latest_user_message(messages))
+    return email_match.group(0) if email_match else None
+
+
+# ============================================
+# Fast-path 라우터 — 확실한 경우만 로컬 판정, 애매하면 None (LLM 라우터로)
+# ============================================
+
+def _match_terms(text: str, terms: dict[str, str]) -> list[str]:
+    """text에 포함된 용어의 키워드 (순서 유지, 중복 제거)"""
+    return list(dict.fromkeys(kw for term, kw in terms.items() if term.lower() in text.lower()))
+
+
+def _detect_category(texts: list[str]) -> tuple[str | None, list[str]]:
+    """뒤(최신)부터 시술 용어를 찾아 카테고리 결정. 같은 메시지에 두 계열이 섞이면 None."""
+    for text in reversed(texts):
+        hits = {cat: _match_terms(text, terms) for cat, terms in PROCEDURE_TERMS.items()}
+        found = [cat for cat, kws in hits.items() if kws]
+        if len(found) == 1:
+            return found[0], hits[found[0]]
+        if len(found) > 1:
+            return None, []
+    return None, []
+
+
+def fast_route(messages: list[dict]) -> dict | None:
+    """규칙/어휘 기반 라우팅. 확신할 수 있을 때만 route_and_extract와 같은 형식(keywords 포함)으로 반환.
+    - greeting: 첫 턴이고 메시지 전체가 인사말
+    - consultation: 비용/예약/일정 용어만 있고(의료 용어 없음) 시술 카테고리가 하나로 정해짐 → cta hot
+    - medical: 부작용/효과/방법 용어만 있고 최신 메시지에 시술 용어 → cta 3턴 이상 hot, 아니면 warm
+    그 외(잡담, 혼합, 보톡스/필러 등 경계 시술)는 None.
+    """
+    latest = _latest_user_message(messages).strip()
+    if not latest:
+        return None
+    user_texts = recent_user_texts(messages)
+    user_turns = sum(1 for m in messages if m["role"] == "user")
+
+    if GREETING_PATTERN.fullmatch(latest):
+        if user_turns > 1:
+            return None  # 대화 중 인사 — CTA를 LLM이 이어서 판정
+        return {"intent": "greeting", "category": None, "email": None, "cta_level": "cool",
+                "keywords": [], "rule": "greeting"}
+
+    consult_kws = _match_terms(latest, CONSULTATION_TERMS)
+    medical_kws = _match_terms(latest, MEDICAL_TERMS)
+    if bool(consult_kws) == bool(medical_kws):
+        return None  # 둘 다 없거나(잡담/모호) 둘 다 있음(혼합)
+
+    if medical_kws:
+        category, proc_kws = _detect_category([latest])
+        intent, topic_kws = "medical", medical_kws
+        cta_level = "hot" if user_turns >= 3 else "warm"
+    else:
+        category, proc_kws = _detect_category(user_texts)
+        intent, topic_kws = "consultation", consult_kws
+        cta_level = "hot"
+    if category is None:
+        return None
+
+    # 이전 사용자 메시지의 같은 계열 시술명도 키워드에 포함
+    for text in user_texts:
+        proc_kws += _match_terms(text, PROCEDURE_TERMS[category])
+    keywords = list(dict.fromkeys(proc_kws + topic_kws))[:8]
+    return {"intent": intent, "category": category, "email": None, "cta_level": cta_level,
+            "keywords": keywords, "rule": f"{intent}_lexicon"}
+
+
+# 답변 캐시 대상 판정 — 개인 정보가 들어간 메시지는 제외
+PERSONAL_TERMS = (
+    "私", "わたし", "僕", "自分", "歳", "妊娠", "授乳", "持病", "アレルギー", "飲んで",
+    "저는", "제가", "저의", "제 ", "나는", "내가", "살이", "살인데", "임신", "수유", "지병", "알레르기", "복용",
+)
+_CACHEABLE_MAX_CHARS = 80
+
+
+def is_cacheable_turn(messages: list[dict], summary: dict | None = None) -> bool:
+    """시맨틱 답변 캐시 대상: 대화 이력/롤링 요약 없이 답하는 첫 사용자 턴의 짧은 질문.
+    이후 턴의 답변은 그 방문자의 이력·요약(build_history_text)으로 생성되므로 다른 방문자와 공유하지 않음.
+    개인 상황(나이, 임신, 복용약 등)이나 이메일이 들어간 메시지도 제외."""
+    if summary and summary.get("conversation_summary"):
+        return False
+    if sum(1 for m in messages if m["role"] == "user") != 1:
+        return False
+    latest = _latest_user_message(messages).strip()
+    if not latest or len(latest) > _CACHEABLE_MAX_CHARS or EMAIL_PATTERN.search(latest):
+        return False
+    return not any(term in latest for term in PERSONAL_TERMS)
+
+
+class _FastRouteStats:
+    """fast-path 커버리지 / LLM 라우터와의 일치율 (/health/router, 임계값 튜닝용)"""
+
+    def __init__(self):
+        self.turns = 0
+        self.fast = 0
+        self.by_rule: dict[str, int] = {}
+        self.audited = 0
+        self.agree = {"intent": 0, "category": 0, "cta_level": 0}
+        self.disagreements: list[dict] = []  # 최근 20건
+
+    def record(self, decision: dict | None):
+        self.turns += 1
+        if decision:
+            self.fast += 1
+            self.by_rule[decision["rule"]] = self.by_rule.get(decision["rule"], 0) + 1
+
+    def compare(self, decision: dict, llm: dict, latest: str):
+        self.audited += 1
+        mismatched = []
+        for field in self.agree:
+            if decision[field] == llm[field]:
+                self.agree[field] += 1
+            else:
+                mismatched.append(field)
+        if mismatched:
+            self.disagreements = (self.disagreements + [{
+                "rule": decision["rule"], "message": latest[:80],
+                **{f: [decision[f], llm[f]] for f in mismatched},
+            }])[-20:]
+            logger.info(f"[Router] fast/LLM disagree rule={decision['rule']} " +
+                        ", ".join(f"{f}={decision[f]}→{llm[f]}" for f in mismatched))
+
+    def stats(self) -> dict:
+        return {
+            "mode": CHAT_FAST_ROUTER,
+            "turns": self.turns,
+            "fast": self.fast,
+            "coverage": round(self.fast / self.turns, 3) if self.turns else 0.0,
+            "by_rule": dict(self.by_rule),
+            "audited": self.audited,
+            "agreement": {f: round(n / self.audited, 3) if self.audited else None for f, n in self.agree.items()},
+            "recent_disagreements": list(self.disagreements),
         }
 
-        logger.info(f"[Router] intent={intent}, category={category}, cta={cta_level}, email={detected_email}")
+
+_fast_stats = _FastRouteStats()
+_audit_tasks: set[asyncio.Task] = set()
+
+
+def get_router_stats() -> dict:
+    return _fast_stats.stats()
+
+
+async def _audit_fast_route(decision: dict, messages: list[dict], language: str):
+    """같은 턴을 LLM 라우터로도 판정해 일치율 기록 (응답 경로 밖에서)"""
+    try:
+        llm = await route_message(messages, language)
+        _fast_stats.compare(decision, llm, _latest_user_message(messages))
+    except Exception as e:
+        logger.warning(f"[Router] Fast-path audit failed: {e}")
+
+
+def _schedule_audit(decision: dict, messages: list[dict], language: str):
+    task = asyncio.create_task(_audit_fast_route(decision, messages, language))
+    _audit_tasks.add(task)
+    task.add_done_callback(_audit_tasks.discard)
+
+
+async def route_message(
+    messages: list[dict],
+    language: str = "ja",
+) -> dict:
+    """사용자 메시지의 의도를 분류.
+    Returns: {"intent": "...", "category": "...", "email": "..." or None, "cta_level": "..."}
+    """
+    prompt = build_route_prompt(messages, language)
+    if prompt is None:
+        return {"intent": "greeting", "category": None, "email": None, "cta_level": "cool"}
+
+    # 이메일 감지
+    detected_email = _detect_email(messages)
+
+    try:
+        raw = await generate_json(prompt, model_name="gemini-2.5-flash-lite")
+        result = parse_route_result(json.loads(raw), detected_email)
+        result.pop("keywords", None)
+        logger.info(
+            f"[Router] intent={result['intent']}, category={result['category']}, "
+            f"cta={result['cta_level']}, email={detected_email}"
+        )
         return result
 
     except Exception as e:
@@ -169,16 +427,51 @@ async def route_message(
         return {"intent": "general", "category": None, "email": detected_email, "cta_level": "cool"}
 
 
+async def route_and_extract(
+    messages: list[dict],
+    language: str = "ja",
+) -> dict:
+    """의도 분류 + RAG 키워드 추출을 한 번의 LLM 호출로.
+    Returns: route_message 결과 + {"keywords": list[str] | None}
+    keywords가 None이면(호출 실패/누락) 에이전트가 기존 방식으로 추출한다.
+    """
+    prompt = build_route_prompt(messages, language, with_keywords=True)
+    if prompt is None:
+        return {"intent": "greeting", "category": None, "email": None, "cta_level": "cool", "keywords": []}
+
+    detected_email = _detect_email(messages)
+
+    try:
+        raw = await generate_json(prompt, model_name="gemini-2.5-flash-lite")
+        result = parse_route_result(json.loads(raw), detected_email)
+        result.setdefault("keywords", None)
+        logger.info(
+            f"[Router] intent={result['intent']}, category={result['category']}, "
+            f"cta={result['cta_level']}, keywords={result['keywords']}, email={detected_email}"
+        )
+        return result
+
+    except Exception as e:
+        logger.warning(f"[Router] Combined routing failed: {e}, defaulting to general")
+        return {"intent": "general", "category": None, "email": detected_email, "cta_level": "cool", "keywords": None}
+
+
 async def run_multi_agent_chat(
     messages: list[dict],
     language: str = "ja",
     session_id: str | None = None,
+    consent_state: dict | None = None,
+    summary: dict | None = None,
 ) -> dict:
     """멀티에이전트 오케스트레이터.
+    consent_state: 연결이 메모리에 들고 있는 이메일 동의 상태 (WebSocket) — 주면 턴마다 세션을 조회하지 않음.
+    summary: 세션 롤링 요약 {"conversation_summary", "summary_until"} — 에이전트 대화 이력에 사용
     1. 이메일 동의 상태 확인 (대화형)
-    2. Router + 키워드 추출 병렬 실행
-    3. 이메일 감지 시 대화형 동의 요청
-    4. 해당 에이전트에 디스패치 (pre-extracted keywords 전달)
+    2. 이메일 감지 시 대화형 동의 요청 (라우팅 생략)
+    3. Fast-path 규칙 → 애매하면 Router + 키워드 추출 (combined: 한 번의 호출 / split: 두 호출 병렬)
+       LLM 라우팅 중에는 최신 메시지 검색을 추측 실행 (SpeculativeRetrieval)
+    4. 이력 없는 첫 턴은 라우팅과 병렬로 시맨틱 답변 캐시 조회 (히트 시 라우팅 취소, 즉시 반환)
+    5. 해당 에이전트에 디스패치 (pre-extracted keywords 전달)
 
     Returns: {
         "response": str,
@@ -188,31 +481,85 @@ async def run_multi_agent_chat(
     """
     # 0. 이메일 동의 대기 상태 확인
     if session_id:
-        consent_result = await _check_email_consent(messages, session_id, language)
+        consent_result = await _check_email_consent(messages, session_id, language, consent_state)
         if consent_result:
             return consent_result
 
-    # 1. Router + 키워드 추출 병렬 실행
-    route_task = route_message(messages, language)
-    keyword_task = extract_keywords_from_messages(messages, language)
-    route_result, pre_keywords = await asyncio.gather(route_task, keyword_task)
+    # 1. 이메일이 포함된 메시지는 라우팅 없이 바로 동의 요청
+    detected_email = _detect_email(messages)
+    if detected_email and session_id:
+        return await _handle_email_detected(detected_email, session_id, language, consent_state)
+
+    # 2. Fast-path 규칙 → 애매하면 Router + 키워드 추출
+    fast = fast_route(messages) if CHAT_FAST_ROUTER != "off" else None
+    _fast_stats.record(fast)
+    if fast and (CHAT_FAST_ROUTER == "shadow" or random.random() < CHAT_FAST_ROUTER_AUDIT_RATE):
+        _schedule_audit(fast, messages, language)
+
+    use_fast = bool(fast) and CHAT_FAST_ROUTER == "on"
+    latest_user_msg = _latest_user_message(messages)
+    cacheable = (
+        answer_cache.enabled and latest_user_msg.strip() != ""
+        and not (use_fast and fast["intent"] == "greeting") and is_cacheable_turn(messages, summary)
+    )
+
+    # LLM 라우팅을 기다리는 동안(또는 답변 캐시 조회용으로) 최신 메시지 임베딩/포커스 검색을 미리 시작
+    speculative = None
+    if cacheable or (CHAT_SPECULATIVE_RAG and not use_fast and latest_user_msg.strip()):
+        speculative = SpeculativeRetrieval(latest_user_msg, CHAT_RAG_MATCH_THRESHOLD, CHAT_RAG_MATCH_COUNT)
+
+    async def _route() -> tuple[dict, list[str] | None]:
+        if use_fast:
+            route_result = dict(fast)
+            route_result.pop("rule")
+            pre_keywords = route_result.pop("keywords")
+            logger.info(
+                f"[Router] fast intent={route_result['intent']}, category={route_result['category']}, "
+                f"cta={route_result['cta_level']}, keywords={pre_keywords} ({fast['rule']})"
+            )
+            return route_result, pre_keywords
+        if CHAT_ROUTER_MODE == "combined":
+            route_result = await route_and_extract(messages, language)
+            return route_result, route_result.pop("keywords")
+        return await asyncio.gather(
+            route_message(messages, language), extract_keywords_from_messages(messages, language),
+        )
 
+    routing = asyncio.create_task(_route())
+
+    # 3. 시맨틱 답변 캐시 — LLM 라우팅과 병렬로 조회, 히트 시 라우팅/검색/생성 모두 생략
+    #    라우팅 전에 아는 값으로만 조회: fast-path면 카테고리/CTA, 아니면 언어만 + CTA는 라우터 기본값(cool)
+    #    cta_level은 캐시하지 않고 이 세션 값으로 붙임 (리포트 안내가 들어간 답변은 같은 CTA 조건에만)
+    query_emb = None
+    if cacheable:
+        pre_cta = fast["cta_level"] if use_fast else "cool"
+        try:
+            query_emb = await speculative.embedding()
+        except Exception as e:
+            logger.warning(f"[AnswerCache] embedding failed: {e}")
+        cached = answer_cache.lookup(
+            query_emb, language, fast["category"] if use_fast else None, pre_cta in ("hot", "warm"),
+        ) if query_emb else None
+        if cached:
+            routing.cancel()
+            speculative.discard()
+            return {**cached, "cta_level": pre_cta}
+
+    route_result, pre_keywords = await routing
     intent = route_result["intent"]
     category = route_result["category"] or "plastic_surgery"
-    detected_email = route_result["email"]
     cta_level = route_result.get("cta_level", "cool")
+    report_hint = cta_level in ("hot", "warm")  # 첫 턴이라 리포트 안내는 CTA로만 결정
+    if speculative is not None and intent not in ("consultation", "medical"):
+        speculative.discard()
 
-    # 2. 이메일 감지 시 → 대화형 동의 요청
-    if detected_email and session_id:
-        return await _handle_email_detected(detected_email, session_id, language)
-
-    # 3. 에이전트 디스패치
+    # 4. 에이전트 디스패치
     user_turn_count = sum(1 for m in messages if m["role"] == "user")
 
     if intent == "greeting":
         # 대화 중 인사(2턴 이상)는 General Agent로
         if user_turn_count > 1:
-            response = await generate_general_response(messages, language)
+            response = await generate_general_response(messages, language, summary)
             return {
                 "response": response,
                 "rag_references": [],
@@ -228,7 +575,7 @@ async def run_multi_agent_chat(
         }
 
     elif intent == "general":
-        response = await generate_general_response(messages, language)
+        response = await generate_general_response(messages, language, summary)
         return {
             "response": response,
             "rag_references": [],
@@ -236,32 +583,30 @@ async def run_multi_agent_chat(
             "cta_level": cta_level,
         }
 
-    elif intent == "consultation":
-        response, rag_refs = await generate_consultation_response(
-            messages, language, category, user_turn_count, cta_level,
-            pre_extracted_keywords=pre_keywords,
-        )
-        return {
-            "response": response,
-            "rag_references": rag_refs,
-            "agent_type": "consultation",
-            "cta_level": cta_level,
-        }
-
-    elif intent == "medical":
-        response, rag_refs = await generate_medical_response(
-            messages, language, category, cta_level,
-            pre_extracted_keywords=pre_keywords,
-        )
-        return {
+    elif intent in ("consultation", "medical"):
+        if intent == "consultation":
+            response, rag_refs = await generate_consultation_response(
+                messages, language, category, user_turn_count, cta_level,
+                pre_extracted_keywords=pre_keywords, speculative=speculative, summary=summary,
+            )
+        else:
+            response, rag_refs = await generate_medical_response(
+                messages, language, category, cta_level,
+                pre_extracted_keywords=pre_keywords, speculative=speculative, summary=summary,
+            )
+        result = {
             "response": response,
             "rag_references": rag_refs,
-            "agent_type": "medical",
+            "agent_type": intent,
             "cta_level": cta_level,
         }
+        # 참고자료에 근거한 답변만 캐시 (근거 없는 "내원 시 안내" 답변은 제외)
+        if query_emb and rag_refs and response:
+            answer_cache.put(query_emb, language, category, report_hint, latest_user_msg, result)
+        return result
 
     # fallback
-    response = await generate_general_response(messages, language)
+    response = await generate_general_response(messages, language, summary)
     return {
         "response": response,
         "rag_references": [],
@@ -278,29 +623,36 @@ async def _check_email_consent(
     messages: list[dict],
     session_id: str,
     language: str,
+    consent_state: dict | None = None,
 ) -> dict | None:
-    """동의 대기 상태면 사용자 응답을 처리. 아니면 None 반환."""
+    """동의 대기 상태면 사용자 응답을 처리. 아니면 None 반환.
+    consent_state: 호출자가 들고 있는 {"pending_email", "email_consent_status"} (WebSocket 연결) —
+    있으면 DB 조회 없이 사용하고 변경도 함께 반영. 없으면 chat_sessions에서 조회."""
     db = get_supabase()
 
-    try:
-        session_result = (
-            db.table("chat_sessions")
-            .select("pending_email, email_consent_status")
-            .eq("id", session_id)
-            .single()
-            .execute()
-        )
-    except Exception:
-        return None
+    if consent_state is None:
+        try:
+            session_result = (
+                db.table("chat_sessions")
+                .select("pending_email, email_consent_status")
+                .eq("id", session_id)
+                .single()
+                .execute()
+            )
+        except Exception:
+            return None
 
-    if not session_result.data:
-        return None
+        if not session_result.data:
+            return None
+        state = session_result.data
+    else:
+        state = consent_state
 
-    consent_status = session_result.data.get("email_consent_status")
+    consent_status = state.get("email_consent_status")
     if consent_status != "pending":
         return None
 
-    pending_email = session_result.data.get("pending_email")
+    pending_email = state.get("pending_email")
     if not pending_email:
         return None
 
@@ -321,6 +673,7 @@ async def _check_email_consent(
             "customer_email": pending_email,
             "email_consent_status": "agreed",
         }).eq("id", session_id).execute()
+        state["email_consent_status"] = "agreed"
 
         if language == "ja":
             response = (
@@ -342,6 +695,7 @@ async def _check_email_consent(
             "pending_email": None,
             "email_consent_status": "declined",
         }).eq("id", session_id).execute()
+        state.update({"pending_email": None, "email_consent_status": "declined"})
 
         if language == "ja":
             response = "承知いたしました。引き続きご質問がございましたらお気軽にどうぞ。"
@@ -359,6 +713,7 @@ async def _handle_email_detected(
     email: str,
     session_id: str,
     language: str,
+    consent_state: dict | None = None,
 ) -> dict:
     """이메일 감지 시 DB에 pending 저장 + 대화형 동의 질문 반환."""
     db = get_supabase()
@@ -367,6 +722,8 @@ async def _handle_email_detected(
         "pending_email": email,
         "email_consent_status": "pending",
     }).eq("id", session_id).execute()
+    if consent_state is not None:
+        consent_state.update({"pending_email": email, "email_consent_status": "pending"})
 
     if language == "ja":
         response = (
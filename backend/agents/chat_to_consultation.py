@@ -1,6 +1,7 @@
 import logging
 
 from services.supabase_client import get_supabase
+from services.chat_persistence import chat_persistence
 
 logger = logging.getLogger(__name__)
 
@@ -43,7 +44,8 @@ async def convert_chat_to_consultation(
         )
         return session["consultation_id"]
 
-    # 2. 메시지 로드 (시간순)
+    # 2. 메시지 로드 (시간순, 대기 중인 채팅 쓰기를 먼저 마침)
+    await chat_persistence.drain(session_id)
     msg_result = (
         db.table("chat_messages")
         .select("role, content")
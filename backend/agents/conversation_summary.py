@@ -0,0 +1,176 @@
+"""
+롤링 대화 요약 — 긴 세션에서도 에이전트 프롬프트의 대화 이력 크기를 일정하게 유지.
+
+저장: chat_sessions.conversation_summary / summary_until (migration 014)
+  - summary_until: 요약에 접힌 마지막 메시지의 created_at. 이후 메시지만 원문으로 프롬프트에 들어감
+갱신: 요약 밖 메시지가 KEEP + 사용자 N턴분(2N) 이상 쌓이면 응답 후 백그라운드로
+      (이전 요약 + 새로 접을 메시지) → 새 요약 (증분, 최근 KEEP개는 원문 유지)
+조립: build_history_text — 요약 블록 + 최근 메시지를 CHAT_HISTORY_TOKEN_BUDGET 안에서 최신부터 채움
+"""
+import asyncio
+import logging
+from datetime import datetime
+
+from config import (
+    CHAT_SUMMARY_EVERY_TURNS,
+    CHAT_SUMMARY_KEEP_MESSAGES,
+    CHAT_SUMMARY_MAX_CHARS,
+    CHAT_HISTORY_TOKEN_BUDGET,
+)
+from services.gemini_client import generate_text
+from services.supabase_client import get_supabase
+from services.chat_persistence import chat_persistence
+from agents.rag_context import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+_MAX_FOLD_MESSAGES = 40  # 요약 1회에 접는 최대 메시지 수 (밀린 세션은 여러 턴에 걸쳐 따라잡음)
+_running: set[str] = set()  # 요약 갱신 중인 세션 (중복 실행 방지)
+
+
+def _parse_ts(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def unsummarized(messages: list[dict], summary: dict | None) -> list[dict]:
+    """요약에 아직 접히지 않은 메시지 (created_at이 없는 메시지는 새 메시지로 간주)"""
+    until = _parse_ts((summary or {}).get("summary_until"))
+    if until is None:
+        return list(messages)
+    out = []
+    for m in messages:
+        ts = _parse_ts(m.get("created_at"))
+        if ts is None or ts > until:
+            out.append(m)
+    return out
+
+
+# ============================================
+# 프롬프트용 대화 이력
+# ============================================
+
+def build_history_text(
+    messages: list[dict],
+    language: str,
+    role_ai: str,
+    summary: dict | None = None,
+    budget: int = CHAT_HISTORY_TOKEN_BUDGET,
+) -> str:
+    """요약 + 최근 메시지로 【会話履歴】 블록 본문 생성.
+    최신 메시지부터 예산 안에서 채우고, 최신 메시지 1개는 예산을 넘어도 항상 포함."""
+    role_user = "ユーザー" if language == "ja" else "사용자"
+    summary_text = ((summary or {}).get("conversation_summary") or "").strip()
+
+    header = ""
+    if summary_text:
+        label = "［これまでの会話の要約］" if language == "ja" else "［이전 대화 요약］"
+        header = f"{label}\n{truncate_to_tokens(summary_text, budget // 2)}\n\n"
+
+    remaining = budget - estimate_tokens(header)
+    lines: list[str] = []
+    for m in reversed(unsummarized(messages, summary)):
+        label = role_user if m["role"] == "user" else role_ai
+        line = f"{label}: {m['content']}"
+        cost = estimate_tokens(line) + 1
+        if lines and cost > remaining:
+            break
+        lines.append(line)
+        remaining -= cost
+    return header + "\n".join(reversed(lines))
+
+
+# ============================================
+# 백그라운드 요약 갱신
+# ============================================
+
+def needs_update(messages: list[dict], summary: dict | None) -> bool:
+    """요약 밖 메시지가 최근 KEEP개 + 사용자 N턴분 이상이면 갱신 대상"""
+    if CHAT_SUMMARY_EVERY_TURNS <= 0:
+        return False
+    pending = unsummarized(messages, summary)
+    return len(pending) >= CHAT_SUMMARY_KEEP_MESSAGES + 2 * CHAT_SUMMARY_EVERY_TURNS
+
+
+def _summary_prompt(previous: str, new_lines: str, language: str) -> str:
+    if language == "ja":
+        return f"""以下は美容医療クリニックのチャット相談の記録です。
+これまでの要約に新しい会話の内容を統合し、{CHAT_SUMMARY_MAX_CHARS}文字以内の要約を作成してください。
+必ず残す情報: 関心のある施術・部位、悩み・希望、予算・日程・来院の意向、既往歴・アレルギー・服薬、すでに案内した内容、まだ答えていない質問
+挨拶や重複は省略し、要約文のみを出力すること。
+
+【これまでの要約】
+{previous or "（なし）"}
+
+【新しい会話】
+{new_lines}"""
+    return f"""아래는 미용의료 클리닉 채팅 상담 기록입니다.
+이전 요약에 새 대화 내용을 통합해 {CHAT_SUMMARY_MAX_CHARS}자 이내의 요약을 작성해주세요.
+반드시 남길 정보: 관심 시술/부위, 고민·희망, 예산·일정·내원 의향, 병력·알레르기·복용약, 이미 안내한 내용, 아직 답하지 않은 질문
+인사와 중복은 생략하고 요약문만 출력할 것.
+
+【이전 요약】
+{previous or "(없음)"}
+
+【새 대화】
+{new_lines}"""
+
+
+async def update_summary(session_id: str, language: str) -> dict | None:
+    """요약 밖의 오래된 메시지를 요약에 접고 chat_sessions에 저장.
+    Returns: 갱신된 {"conversation_summary", "summary_until"} 또는 None (갱신 없음/실패)"""
+    if session_id in _running:
+        return None
+    _running.add(session_id)
+    try:
+        await chat_persistence.drain(session_id)
+        db = get_supabase()
+        session = (await asyncio.to_thread(
+            lambda: db.table("chat_sessions")
+            .select("conversation_summary, summary_until")
+            .eq("id", session_id).limit(1).execute()
+        )).data
+        if not session:
+            return None
+        previous = session[0].get("conversation_summary") or ""
+        until = session[0].get("summary_until")
+
+        def _load():
+            query = db.table("chat_messages").select("role, content, created_at").eq("session_id", session_id)
+            if until:
+                query = query.gt("created_at", until)
+            return query.order("created_at").limit(_MAX_FOLD_MESSAGES + CHAT_SUMMARY_KEEP_MESSAGES).execute()
+
+        pending = (await asyncio.to_thread(_load)).data or []
+        fold = pending[:max(0, len(pending) - CHAT_SUMMARY_KEEP_MESSAGES)][:_MAX_FOLD_MESSAGES]
+        if len(fold) < 2:
+            return None
+
+        role_user = "ユーザー" if language == "ja" else "사용자"
+        role_ai = "クリニック" if language == "ja" else "클리닉"
+        new_lines = "\n".join(
+            f"{role_user if m['role'] == 'user' else role_ai}: {m['content']}" for m in fold
+        )
+        text = (await generate_text(_summary_prompt(previous, new_lines, language))).strip()
+        if not text:
+            return None
+        text = text[:CHAT_SUMMARY_MAX_CHARS * 2]  # 지시를 어긴 긴 출력 방어
+
+        updated = {"conversation_summary": text, "summary_until": fold[-1]["created_at"]}
+        await asyncio.to_thread(
+            lambda: db.table("chat_sessions").update(updated).eq("id", session_id).execute()
+        )
+        logger.info(
+            f"[Summary] session {session_id[:8]}: folded {len(fold)} messages "
+            f"({len(previous)} → {len(text)} chars)"
+        )
+        return updated
+    except Exception as e:
+        logger.warning(f"[Summary] update failed (session {session_id[:8]}): {e}")
+        return None
+    finally:
+        _running.discard(session_id)
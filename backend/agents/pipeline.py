@@ -1,9 +1,14 @@
+import asyncio
+import hashlib
 import json
 import logging
 import time
 import uuid
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
 
+from config import PIPELINE_CHECKPOINTS
 from services.supabase_client import get_supabase
 from agents.text_refiner import preprocess_stt_dialog, refine_stt_text
 from agents.translator import translate_to_korean
@@ -50,7 +55,191 @@ async def _update_consultation(consultation_id: str, data: dict):
     db.table("consultations").update(data).eq("id", consultation_id).execute()
 
 
-async def run_pipeline(consultation_id: str):
+# ============================================
+# 스텝 그래프 실행기
+# ============================================
+
+class _StepHalted(Exception):
+    """스텝이 후속 스텝을 멈출 때 (예: 미분류). 이 스텝에 의존하지 않는 스텝은 계속 실행."""
+
+
+@dataclass(frozen=True)
+class PipelineStep:
+    name: str
+    fn: Callable[[dict], Awaitable[dict | None]]  # ctx → 출력 (ctx에 병합)
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
+    checkpoint: bool = True  # 규칙 기반처럼 다시 돌려도 싼 스텝은 False
+    version: int = 1  # 프롬프트/로직 변경으로 이전 체크포인트를 무효화할 때 올림
+
+
+class _Checkpoints:
+    """스텝 체크포인트 (pipeline_checkpoints, migration 016).
+    키 = 스텝 이름 + version + 입력 값의 내용 해시. resume=True일 때만 저장된 출력을 재사용하고,
+    저장은 항상 (다음 재실행 대비). 저장/조회 실패는 파이프라인을 멈추지 않음"""
+
+    def __init__(self, consultation_id: str, resume: bool):
+        self.consultation_id = consultation_id
+        self.resume = resume
+        self._saved: dict[str, dict] = {}
+        self.restored: list[str] = []
+        if resume:
+            try:
+                rows = (
+                    get_supabase().table("pipeline_checkpoints")
+                    .select("step, input_hash, output")
+                    .eq("consultation_id", consultation_id).execute()
+                ).data or []
+                self._saved = {r["step"]: r for r in rows}
+            except Exception as e:
+                logger.warning(f"[Pipeline:{consultation_id[:8]}] checkpoint load failed: {e}")
+
+    @staticmethod
+    def input_hash(step: PipelineStep, ctx: dict) -> str:
+        payload = {"v": step.version, "inputs": {k: ctx.get(k) for k in step.inputs}}
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def lookup(self, step: PipelineStep, digest: str) -> dict | None:
+        row = self._saved.get(step.name)
+        if not self.resume or not row or row["input_hash"] != digest:
+            return None
+        output = row["output"] or {}
+        if any(out not in output for out in step.outputs):
+            return None
+        self.restored.append(step.name)
+        return output
+
+    def save(self, step: PipelineStep, digest: str, output: dict | None, duration_ms: int):
+        try:
+            get_supabase().table("pipeline_checkpoints").upsert({
+                "consultation_id": self.consultation_id,
+                "step": step.name,
+                "input_hash": digest,
+                "output": output or {},
+                "duration_ms": duration_ms,
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            }, on_conflict="consultation_id,step").execute()
+        except Exception as e:
+            logger.warning(f"[Pipeline:{self.consultation_id[:8]}] checkpoint save failed ({step.name}): {e}")
+
+
+async def _run_step_graph(
+    consultation_id: str,
+    steps: list[PipelineStep],
+    ctx: dict,
+    checkpoints: _Checkpoints | None = None,
+) -> dict:
+    """입력이 모두 준비된 스텝부터 동시 실행.
+    - 스텝 예외: 실행 중인 나머지 스텝을 취소하고 그대로 전파
+    - _StepHalted: 해당 스텝에 (간접) 의존하는 스텝만 건너뜀
+    - checkpoints: 입력 해시가 같은 체크포인트가 있으면 fn 대신 저장된 출력 사용, 성공한 스텝은 저장
+    Returns: {"timings": {스텝: ms}, "wall_ms", "serial_ms", "halted", "skipped", "restored"}"""
+    producers = {out: s.name for s in steps for out in s.outputs}
+    for s in steps:
+        missing = [i for i in s.inputs if i not in producers and i not in ctx]
+        if missing:
+            raise ValueError(f"step '{s.name}' has unresolved inputs: {missing}")
+    pending = {s.name: {producers[i] for i in s.inputs if i in producers} for s in steps}
+    by_name = {s.name: s for s in steps}
+
+    finished: set[str] = set()
+    halted: set[str] = set()
+    skipped: set[str] = set()
+    timings: dict[str, int] = {}
+    running: dict[asyncio.Task, str] = {}
+
+    async def _timed(step: PipelineStep):
+        digest = None
+        if checkpoints and step.checkpoint:
+            digest = _Checkpoints.input_hash(step, ctx)
+            cached = checkpoints.lookup(step, digest)
+            if cached is not None:
+                logger.info(f"[Pipeline:{consultation_id[:8]}] {step.name}: restored from checkpoint")
+                timings[step.name] = 0
+                return {out: cached[out] for out in step.outputs}
+        start = time.time()
+        try:
+            output = await step.fn(ctx)
+        finally:
+            timings[step.name] = int((time.time() - start) * 1000)
+        if digest is not None:
+            checkpoints.save(step, digest, output, timings[step.name])
+        return output
+
+    started = time.time()
+    try:
+        while pending or running:
+            progressed = True
+            while progressed:
+                progressed = False
+                for name in [n for n, d in pending.items() if d <= finished]:
+                    deps = pending.pop(name)
+                    progressed = True
+                    if deps & (halted | skipped):
+                        skipped.add(name)
+                        finished.add(name)
+                    else:
+                        running[asyncio.create_task(_timed(by_name[name]))] = name
+            if not running:
+                if pending:
+                    raise RuntimeError(f"step graph has a cycle: {sorted(pending)}")
+                break
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                exc = task.exception()
+                if isinstance(exc, _StepHalted):
+                    halted.add(name)
+                elif exc is not None:
+                    raise exc
+                else:
+                    ctx.update(task.result() or {})
+                finished.add(name)
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    wall_ms = int((time.time() - started) * 1000)
+    serial_ms = sum(timings.values())
+    restored = checkpoints.restored if checkpoints else []
+    logger.info(
+        f"[Pipeline:{consultation_id[:8]}] Steps done (wall {wall_ms}ms, serial {serial_ms}ms): "
+        + ", ".join(f"{n}={ms}ms" for n, ms in timings.items())
+        + (f" | restored={restored}" if restored else "")
+        + (f" | halted={sorted(halted)} skipped={sorted(skipped)}" if halted else "")
+    )
+    return {
+        "timings": timings,
+        "wall_ms": wall_ms,
+        "serial_ms": serial_ms,
+        "halted": sorted(halted),
+        "skipped": sorted(skipped),
+        "restored": list(restored),
+    }
+
+
+_RAG_CATEGORIES = ("dermatology", "plastic_surgery")
+
+
+async def run_pipeline(consultation_id: str, resume: bool = False):
+    """상담 분석 파이프라인. 스텝 의존 관계 (→: 입력으로 사용):
+
+        preprocess → translate → refine ─┬→ cta ─────────────────────────────┐
+                                         └→ intent ─┬→ classify → validate ─┬→ report → finalize
+                                                    └→ rag_prefetch ────────┘
+
+    - CTA와 의도 추출은 정제 텍스트만 필요 → 동시 실행. R4 리포트는 CTA를 쓰지 않으므로
+      CTA는 리포트 생성과도 겹쳐 돌고 finalize(report_ready)만 CTA를 기다림
+    - RAG는 의도 키워드 + 분류가 필요 → 분류/검증과 겹치도록 두 카테고리를 미리 검색하고
+      검증 결과에 맞는 쪽을 사용 (임베딩/검색 1회 추가, LLM 호출 없음)
+    - resume=True: 입력이 바뀌지 않은 스텝은 체크포인트 출력으로 건너뜀 (DB 반영은 이전 실행에서 끝남)
+      → 일시적 실패 후 재실행은 실패한 뒤쪽 스텝만 다시 실행 (리포트 생성은 체크포인트 없이 항상 실행)
+      작업 큐 재시도에서만 사용 — 관리자 재생성 요청은 resume=False로 처음부터
+    """
     db = get_supabase()
 
     # 상담 데이터 조회
@@ -59,22 +248,21 @@ async def run_pipeline(consultation_id: str):
 
     original_text = consultation["original_text"]
     customer_name = consultation["customer_name"]
+    tag = consultation_id[:8]
 
-    try:
-        # ========================================
-        # Step 0: STT 텍스트 전처리 (규칙 기반, LLM 불필요)
-        # ========================================
-        logger.info(f"[Pipeline:{consultation_id[:8]}] Step 0: Preprocessing start")
+    # ========================================
+    # Step 0: STT 텍스트 전처리 (규칙 기반, LLM 불필요)
+    # ========================================
+    async def _preprocess(ctx: dict) -> dict:
+        logger.info(f"[Pipeline:{tag}] Step 0: Preprocessing start")
         start = time.time()
-        preprocess_result = preprocess_stt_dialog(original_text)
+        preprocess_result = preprocess_stt_dialog(ctx["original_text"])
         duration = int((time.time() - start) * 1000)
 
         has_labels = preprocess_result["has_speaker_labels"]
-        pre_segments = preprocess_result.get("speaker_segments")
-        pre_customer = preprocess_result.get("customer_utterances")
         cleaned_text = preprocess_result["cleaned_text"]
         logger.info(
-            f"[Pipeline:{consultation_id[:8]}] Step 0: Preprocess done ({duration}ms, "
+            f"[Pipeline:{tag}] Step 0: Preprocess done ({duration}ms, "
             f"labels={has_labels}, {len(original_text)}→{len(cleaned_text)} chars)"
         )
         await _log_agent(
@@ -83,53 +271,62 @@ async def run_pipeline(consultation_id: str):
             {"cleaned_len": len(cleaned_text), "has_labels": has_labels},
             duration, "success",
         )
+        return {
+            "cleaned_text": cleaned_text,
+            "pre_segments": preprocess_result.get("speaker_segments"),
+            "pre_customer": preprocess_result.get("customer_utterances"),
+        }
 
-        # ========================================
-        # Step 1: 언어 감지 + 번역 (한국어면 스킵)
-        # ========================================
-        logger.info(f"[Pipeline:{consultation_id[:8]}] Step 1: Translation start")
+    # ========================================
+    # Step 1: 언어 감지 + 번역 (한국어면 스킵)
+    # ========================================
+    async def _translate(ctx: dict) -> dict:
+        logger.info(f"[Pipeline:{tag}] Step 1: Translation start")
         start = time.time()
-        translated_text, input_lang = await translate_to_korean(cleaned_text)
+        translated_text, input_lang = await translate_to_korean(ctx["cleaned_text"])
         duration = int((time.time() - start) * 1000)
-        logger.info(f"[Pipeline:{consultation_id[:8]}] Step 1: Translation done ({duration}ms, lang={input_lang})")
+        logger.info(f"[Pipeline:{tag}] Step 1: Translation done ({duration}ms, lang={input_lang})")
 
         await _log_agent(consultation_id, "translator", {"input_lang": input_lang}, {"translated_text": translated_text[:200]}, duration, "success")
         await _update_consultation(consultation_id, {
             "translated_text": translated_text,
             "input_language": input_lang,
         })
+        return {"translated_text": translated_text, "input_lang": input_lang}
 
-        # ========================================
-        # Step 1.5: STT 텍스트 정제 (LLM 기반, 15000자 이하만)
-        # ========================================
-        logger.info(f"[Pipeline:{consultation_id[:8]}] Step 1.5: STT refinement start")
+    # ========================================
+    # Step 1.5: STT 텍스트 정제 (LLM 기반, 15000자 이하만)
+    # ========================================
+    async def _refine(ctx: dict) -> dict:
+        translated_text = ctx["translated_text"]
+        logger.info(f"[Pipeline:{tag}] Step 1.5: STT refinement start")
         start = time.time()
         refined_text = await refine_stt_text(translated_text)
         duration = int((time.time() - start) * 1000)
-        logger.info(f"[Pipeline:{consultation_id[:8]}] Step 1.5: Refinement done ({duration}ms)")
+        logger.info(f"[Pipeline:{tag}] Step 1.5: Refinement done ({duration}ms)")
         await _log_agent(
             consultation_id, "text_refiner",
             {"input_len": len(translated_text)},
             {"output_len": len(refined_text), "skipped": refined_text == translated_text},
             duration, "success",
         )
-
         # 정제된 텍스트를 이후 단계에서 사용
-        text_for_analysis = refined_text
+        return {"text_for_analysis": refined_text}
 
-        # ========================================
-        # Step 2: 화자 분리 + CTA 분석
-        # ========================================
-        logger.info(f"[Pipeline:{consultation_id[:8]}] Step 2: CTA analysis start")
+    # ========================================
+    # Step 2: 화자 분리 + CTA 분석
+    # ========================================
+    async def _cta(ctx: dict) -> dict:
+        logger.info(f"[Pipeline:{tag}] Step 2: CTA analysis start")
         start = time.time()
         cta_result = await analyze_cta(
-            cleaned_text, text_for_analysis,
-            input_lang=input_lang,
-            pre_extracted_segments=pre_segments,
-            pre_customer_utterances=pre_customer,
+            ctx["cleaned_text"], ctx["text_for_analysis"],
+            input_lang=ctx["input_lang"],
+            pre_extracted_segments=ctx["pre_segments"],
+            pre_customer_utterances=ctx["pre_customer"],
         )
         duration = int((time.time() - start) * 1000)
-        logger.info(f"[Pipeline:{consultation_id[:8]}] Step 2: CTA done ({duration}ms)")
+        logger.info(f"[Pipeline:{tag}] Step 2: CTA done ({duration}ms)")
 
         await _log_agent(consultation_id, "cta_analyzer", None, cta_result, duration, "success")
         # CTA 레벨 소문자 정규화
@@ -143,69 +340,138 @@ async def run_pipeline(consultation_id: str):
             "cta_level": cta_level,
             "cta_signals": cta_result.get("cta_signals"),
         })
+        return {"cta_level": cta_level}
 
-        # ========================================
-        # Step 3: 의도 추출 (정제된 한국어 텍스트 사용)
-        # ========================================
-        logger.info(f"[Pipeline:{consultation_id[:8]}] Step 3: Intent extraction start")
+    # ========================================
+    # Step 3: 의도 추출 (정제된 한국어 텍스트 사용)
+    # ========================================
+    async def _intent(ctx: dict) -> dict:
+        logger.info(f"[Pipeline:{tag}] Step 3: Intent extraction start")
         start = time.time()
-        intent = await extract_intent(text_for_analysis)
+        intent = await extract_intent(ctx["text_for_analysis"])
         duration = int((time.time() - start) * 1000)
-        logger.info(f"[Pipeline:{consultation_id[:8]}] Step 3: Intent done ({duration}ms)")
+        logger.info(f"[Pipeline:{tag}] Step 3: Intent done ({duration}ms)")
 
         await _log_agent(consultation_id, "intent_extractor", None, intent, duration, "success")
         await _update_consultation(consultation_id, {"intent_extraction": intent})
+        return {"intent": intent}
 
-        # ========================================
-        # Step 4: 분류
-        # ========================================
-        logger.info(f"[Pipeline:{consultation_id[:8]}] Step 4: Classification start")
+    # ========================================
+    # Step 4: 분류
+    # ========================================
+    async def _classify(ctx: dict) -> dict:
+        logger.info(f"[Pipeline:{tag}] Step 4: Classification start")
         start = time.time()
-        classification_result = await classify_consultation(translated_text, intent)
+        classification_result = await classify_consultation(ctx["translated_text"], ctx["intent"])
         duration = int((time.time() - start) * 1000)
-        logger.info(f"[Pipeline:{consultation_id[:8]}] Step 4: Classification done ({duration}ms)")
+        logger.info(f"[Pipeline:{tag}] Step 4: Classification done ({duration}ms)")
 
         await _log_agent(consultation_id, "classifier", None, classification_result, duration, "success")
+        return {"classification_result": classification_result}
 
-        # ========================================
-        # Step 5: 검증
-        # ========================================
-        logger.info(f"[Pipeline:{consultation_id[:8]}] Step 5: Validation start")
+    # ========================================
+    # Step 5: 검증
+    # ========================================
+    async def _validate(ctx: dict) -> dict:
+        logger.info(f"[Pipeline:{tag}] Step 5: Validation start")
         start = time.time()
-        validation = await validate_classification(classification_result, translated_text, intent)
+        validation = await validate_classification(ctx["classification_result"], ctx["translated_text"], ctx["intent"])
         duration = int((time.time() - start) * 1000)
-        logger.info(f"[Pipeline:{consultation_id[:8]}] Step 5: Validation done ({duration}ms)")
+        logger.info(f"[Pipeline:{tag}] Step 5: Validation done ({duration}ms)")
 
         final_classification = validation.get("classification", "unclassified")
-        confidence = validation.get("confidence", 0.0)
-        reason = validation.get("reason", "")
-
         await _log_agent(consultation_id, "validator", None, validation, duration, "success")
         await _update_consultation(consultation_id, {
             "classification": final_classification,
-            "classification_confidence": confidence,
-            "classification_reason": reason,
+            "classification_confidence": validation.get("confidence", 0.0),
+            "classification_reason": validation.get("reason", ""),
         })
 
-        # 미분류면 파이프라인 중단
+        # 미분류면 리포트 생성 중단 (CTA는 계속 — 수동 분류 후 resume_pipeline이 사용)
         if final_classification == "unclassified":
             await _update_consultation(consultation_id, {"status": "classification_pending"})
-            return
+            raise _StepHalted(final_classification)
+        return {"classification": final_classification}
 
-        # ========================================
-        # Step 6~ : R1→R2→R3→R4 리포트 일괄 생성
-        # ========================================
+    # ========================================
+    # Step 6: RAG 선검색 (분류 결과를 기다리지 않고 카테고리별로)
+    # ========================================
+    async def _rag_prefetch(ctx: dict) -> dict:
+        keywords = ctx["intent"].get("keywords", [])
+        logger.info(f"[Pipeline:{tag}] Step 6: RAG prefetch start")
+        start = time.time()
+        results = await asyncio.gather(
+            *(search_relevant_faq(keywords, category) for category in _RAG_CATEGORIES)
+        )
+        duration = int((time.time() - start) * 1000)
+        rag_by_category = dict(zip(_RAG_CATEGORIES, results))
+        counts = {c: len(r) for c, r in rag_by_category.items()}
+        logger.info(f"[Pipeline:{tag}] Step 6: RAG prefetch done ({duration}ms, {counts})")
+
+        await _log_agent(
+            consultation_id, "rag_agent", {"keywords": keywords, "categories": list(_RAG_CATEGORIES)},
+            {"result_count": counts}, duration, "success",
+        )
+        return {"rag_by_category": rag_by_category}
+
+    # ========================================
+    # Step 7~ : 리포트 생성 → 상태 업데이트
+    # ========================================
+    async def _report(ctx: dict) -> dict:
+        classification = ctx["classification"]
+        # R1~R3 활성화 시 CTA 결과가 필요 → inputs에 cta_level 추가하고 cta_* 전달
         await _generate_all_reports(
-            consultation_id, cleaned_text, text_for_analysis,
-            intent, final_classification, customer_name,
-            cta_level=cta_level,
-            cta_signals=cta_result.get("cta_signals"),
-            speaker_segments=cta_result.get("speaker_segments"),
-            input_lang=input_lang,
+            consultation_id, ctx["cleaned_text"], ctx["text_for_analysis"],
+            ctx["intent"], classification, customer_name,
+            input_lang=ctx["input_lang"],
+            rag_results=ctx["rag_by_category"].get(classification),
+            mark_ready=False,
+            raise_errors=True,
+        )
+        return {"report_done": True}
+
+    async def _finalize(ctx: dict) -> None:
+        await _update_consultation(consultation_id, {"status": "report_ready"})
+
+    steps = [
+        PipelineStep(
+            "preprocess", _preprocess, ("original_text",), ("cleaned_text", "pre_segments", "pre_customer"),
+            checkpoint=False,
+        ),
+        PipelineStep("translate", _translate, ("cleaned_text",), ("translated_text", "input_lang")),
+        PipelineStep("refine", _refine, ("translated_text",), ("text_for_analysis",)),
+        PipelineStep(
+            "cta", _cta,
+            ("cleaned_text", "text_for_analysis", "input_lang", "pre_segments", "pre_customer"),
+            ("cta_level",),
+        ),
+        PipelineStep("intent", _intent, ("text_for_analysis",), ("intent",)),
+        PipelineStep("classify", _classify, ("translated_text", "intent"), ("classification_result",)),
+        PipelineStep("validate", _validate, ("classification_result", "translated_text", "intent"), ("classification",)),
+        PipelineStep("rag_prefetch", _rag_prefetch, ("intent",), ("rag_by_category",)),
+        PipelineStep(
+            "report", _report,
+            ("cleaned_text", "text_for_analysis", "intent", "classification", "input_lang", "rag_by_category"),
+            ("report_done",),
+            # 출력이 완료 플래그뿐이라 R4 행이 삭제/반려돼도 건너뛰게 됨 → 항상 다시 생성
+            checkpoint=False,
+        ),
+        PipelineStep("finalize", _finalize, ("report_done", "cta_level"), checkpoint=False),
+    ]
+
+    try:
+        checkpoints = _Checkpoints(consultation_id, resume) if PIPELINE_CHECKPOINTS else None
+        summary = await _run_step_graph(consultation_id, steps, {"original_text": original_text}, checkpoints)
+        await _log_agent(
+            consultation_id, "pipeline", {"resume": resume},
+            {"step_ms": summary["timings"], "serial_ms": summary["serial_ms"],
+             "halted": summary["halted"], "skipped": summary["skipped"],
+             "restored": summary["restored"]},
+            summary["wall_ms"], "success",
         )
 
     except Exception as e:
-        logger.error(f"[Pipeline:{consultation_id[:8]}] FAILED: {str(e)}", exc_info=True)
+        logger.error(f"[Pipeline:{tag}] FAILED: {str(e)}", exc_info=True)
         await _update_consultation(consultation_id, {
             "status": "report_failed",
             "error_message": str(e),
@@ -362,8 +628,14 @@ async def _generate_all_reports(
     cta_signals: list | None = None,
     speaker_segments: list | None = None,
     input_lang: str = "ja",
+    rag_results: list[dict] | None = None,
+    mark_ready: bool = True,
+    raise_errors: bool = False,
 ):
-    """R1→R2→R3→R4 순차 생성. R1 실패 시 R4만 생성 (graceful degradation)."""
+    """R1→R2→R3→R4 순차 생성. R1 실패 시 R4만 생성 (graceful degradation).
+    rag_results: 미리 검색한 결과 (run_pipeline의 선검색). 없으면 여기서 검색
+    mark_ready: False면 report_ready 상태 갱신은 호출자가 담당 (CTA 완료 대기)
+    raise_errors: R4 실패를 그대로 전파 (run_pipeline — 실패로 기록되어 재시도 시 이 스텝부터 재실행)"""
     db = get_supabase()
 
     await _update_consultation(consultation_id, {"status": "report_generating"})
@@ -371,17 +643,18 @@ async def _generate_all_reports(
     # ========================================
     # Step 6: RAG 검색 (1회, R1~R4 공유)
     # ========================================
-    logger.info(f"[Pipeline:{consultation_id[:8]}] Step 6: RAG search start")
-    start = time.time()
-    keywords = intent.get("keywords", [])
-    rag_results = await search_relevant_faq(keywords, classification)
-    duration = int((time.time() - start) * 1000)
-    logger.info(f"[Pipeline:{consultation_id[:8]}] Step 6: RAG done ({duration}ms, {len(rag_results)} results)")
-
-    await _log_agent(
-        consultation_id, "rag_agent", {"keywords": keywords, "category": classification},
-        {"result_count": len(rag_results)}, duration, "success",
-    )
+    if rag_results is None:
+        logger.info(f"[Pipeline:{consultation_id[:8]}] Step 6: RAG search start")
+        start = time.time()
+        keywords = intent.get("keywords", [])
+        rag_results = await search_relevant_faq(keywords, classification)
+        duration = int((time.time() - start) * 1000)
+        logger.info(f"[Pipeline:{consultation_id[:8]}] Step 6: RAG done ({duration}ms, {len(rag_results)} results)")
+
+        await _log_agent(
+            consultation_id, "rag_agent", {"keywords": keywords, "category": classification},
+            {"result_count": len(rag_results)}, duration, "success",
+        )
 
     # [R1-R3 비활성화] 28일 R4 테스트 후 활성화 예정
     # r1_data = None
@@ -503,11 +776,14 @@ async def _generate_all_reports(
     except Exception as e:
         logger.error(f"[Pipeline:{consultation_id[:8]}] R4 failed: {str(e)}", exc_info=True)
         await _log_agent(consultation_id, "r4_writer", None, None, 0, "failed", str(e))
+        if raise_errors:
+            raise
 
     # ========================================
     # Step 8: consultation status 업데이트
     # ========================================
-    await _update_consultation(consultation_id, {"status": "report_ready"})
+    if mark_ready:
+        await _update_consultation(consultation_id, {"status": "report_ready"})
 
 
 async def regenerate_report(report_id: str, direction: str):
@@ -1,11 +1,852 @@
 import asyncio
+import json
 import logging
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timezone
 
-from services.gemini_client import get_query_embedding
+import numpy as np
+
+from config import (
+    FAQ_INDEX_ENABLED,
+    FAQ_INDEX_REFRESH_SEC,
+    FAQ_INDEX_FULL_RELOAD_SEC,
+    FAQ_ANN_DIR,
+    FAQ_ANN_BUCKET,
+    FAQ_ANN_NPROBE,
+    FAQ_ANN_RERANK,
+    FAQ_HYBRID_ENABLED,
+    FAQ_RRF_K,
+    FAQ_BM25_MIN_TERMS,
+    EMBEDDING_DIM,
+    FAQ_CACHE_TTL_SEC,
+    FAQ_CACHE_MAX_ENTRIES,
+)
+from agents.answer_cache import answer_cache
+from services.faq_ann import IvfSegment, load_snapshot, download_snapshot
+from services.faq_bm25 import Bm25Index
+from services.gemini_client import get_query_embedding, embedding_column
 from services.supabase_client import get_supabase
 
 logger = logging.getLogger(__name__)
 
+# ============================================
+# 인메모리 FAQ 벡터 인덱스
+# 카테고리별 정규화된 float32 행렬 + 메타데이터 → 내적 = 코사인 유사도
+# ANN 스냅샷이 있으면 스냅샷 구간은 IVF(mmap), 이후 추가분은 전수 검색
+# ============================================
+
+FAQ_META_COLUMNS = (
+    "id, category, question, answer, procedure_name, "
+    "youtube_url, youtube_title, youtube_video_id, source_type, created_at"
+)
+_PAGE_SIZE = 500  # 임베딩 포함 행이 크므로 페이지를 작게
+_DUP_WATERMARK_SKEW_SEC = 300  # 앱 서버와 DB 시계 차이 여유 (중복 표시 워터마크 초기값)
+
+
+def parse_embedding(raw) -> np.ndarray | None:
+    """PostgREST는 vector 컬럼을 "[0.1,0.2,...]" 문자열로 반환"""
+    if raw is None:
+        return None
+    values = json.loads(raw) if isinstance(raw, str) else raw
+    vec = np.asarray(values, dtype=np.float32)
+    return vec if vec.ndim == 1 else None
+
+
+def _embedding_select(dims: int) -> str:
+    """EMBEDDING_DIM 컬럼을 항상 "embedding" 키로 받도록 PostgREST 별칭 사용"""
+    column = embedding_column(dims)
+    return "embedding" if column == "embedding" else f"embedding:{column}"
+
+
+def fetch_faq_rows(created_after: str | None = None, dims: int = EMBEDDING_DIM) -> list[dict]:
+    """faq_vectors를 임베딩 포함 페이지 단위로 조회 (created_at 순).
+    created_after는 경계 포함(gte) — 워터마크와 같은 created_at으로 나중에 커밋된 행을 놓치지 않도록.
+    경계 행은 다시 조회되므로 호출자가 id로 중복 제거 (_merge_rows)"""
+    db = get_supabase()
+    rows: list[dict] = []
+    offset = 0
+    while True:
+        query = (
+            db.table("faq_vectors")
+            .select(f"{FAQ_META_COLUMNS}, {_embedding_select(dims)}")
+            .is_("duplicate_of", "null")  # 중복 정리된 행 제외 (migration 013)
+        )
+        if created_after:
+            query = query.gte("created_at", created_after)
+        page = (
+            query.order("created_at")
+            .order("id")
+            .range(offset, offset + _PAGE_SIZE - 1)
+            .execute()
+        )
+        batch = page.data or []
+        rows.extend(batch)
+        if len(batch) < _PAGE_SIZE:
+            break
+        offset += _PAGE_SIZE
+    return rows
+
+
+def fetch_faq_rows_by_id(ids: list[str], dims: int = EMBEDDING_DIM) -> list[dict]:
+    db = get_supabase()
+    rows: list[dict] = []
+    for i in range(0, len(ids), 100):
+        chunk = ids[i:i + 100]
+        result = (
+            db.table("faq_vectors")
+            .select(f"{FAQ_META_COLUMNS}, {_embedding_select(dims)}")
+            .in_("id", chunk)
+            .is_("duplicate_of", "null")
+            .execute()
+        )
+        rows.extend(result.data or [])
+    return rows
+
+
+def fetch_duplicate_ids(marked_after: str) -> list[dict]:
+    """marked_after(경계 포함) 이후 duplicate_of가 기록된 행 (id/duplicate_marked_at만, migration 017)"""
+    db = get_supabase()
+    rows: list[dict] = []
+    offset = 0
+    while True:
+        page = (
+            db.table("faq_vectors")
+            .select("id, duplicate_marked_at")
+            .not_.is_("duplicate_of", "null")
+            .gte("duplicate_marked_at", marked_after)
+            .order("duplicate_marked_at")
+            .order("id")
+            .range(offset, offset + 999)
+            .execute()
+        )
+        batch = page.data or []
+        rows.extend(batch)
+        if len(batch) < 1000:
+            break
+        offset += 1000
+    return rows
+
+
+def _fetch_live_ids() -> list[dict]:
+    """스냅샷 대조용 id/category/created_at 목록 (임베딩 제외라 가벼움)"""
+    db = get_supabase()
+    rows: list[dict] = []
+    offset = 0
+    while True:
+        page = (
+            db.table("faq_vectors")
+            .select("id, category, created_at")
+            .is_("duplicate_of", "null")
+            .order("created_at")
+            .order("id")
+            .range(offset, offset + 999)
+            .execute()
+        )
+        batch = page.data or []
+        rows.extend(batch)
+        if len(batch) < 1000:
+            break
+        offset += 1000
+    return rows
+
+
+def _open_ann_snapshot() -> tuple[dict[str, IvfSegment], dict] | None:
+    """로컬 스냅샷을 mmap으로 열기. 없고 버킷이 설정돼 있으면 먼저 다운로드."""
+    if not FAQ_ANN_DIR:
+        return None
+    snapshot = load_snapshot(FAQ_ANN_DIR)
+    if snapshot is None and FAQ_ANN_BUCKET:
+        try:
+            os.makedirs(FAQ_ANN_DIR, exist_ok=True)
+            download_snapshot(FAQ_ANN_DIR, FAQ_ANN_BUCKET)
+            snapshot = load_snapshot(FAQ_ANN_DIR)
+        except Exception as e:
+            logger.warning(f"[RAG Index] ANN snapshot download failed: {e}")
+    elif snapshot is None and os.getenv("K_SERVICE"):
+        # Cloud Run 이미지에는 data/faq_ann이 포함되지 않음 (gitignore) → 버킷 없이는 항상 전수 검색
+        logger.warning("[RAG Index] FAQ_ANN_BUCKET not set on Cloud Run, no ANN snapshot available (loading all rows from Supabase)")
+    if snapshot is not None and snapshot[1].get("dim") != EMBEDDING_DIM:
+        logger.warning(
+            f"[RAG Index] ANN snapshot {snapshot[1].get('version')} dim={snapshot[1].get('dim')} "
+            f"!= EMBEDDING_DIM={EMBEDDING_DIM}, ignoring snapshot"
+        )
+        return None
+    return snapshot
+
+
+# ============================================
+# 검색 결과 TTL 캐시
+# 같은 시술에 대한 연속 턴 / 리포트 재생성은 (키워드, 카테고리, 최신 메시지)가 거의 같음
+# → 임베딩·DB 호출 없이 반환. faq_vectors가 바뀌면 (삭제 API, 수집, 인덱스 갱신) 전체 무효화
+# ============================================
+
+_WS_RE = re.compile(r"\s+")
+
+
+def _normalize_text(text: str | None) -> str:
+    return _WS_RE.sub(" ", unicodedata.normalize("NFKC", text or "")).strip().lower()
+
+
+class _RetrievalCache:
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[float, list[dict]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(keywords, category, latest_message, match_threshold, match_count) -> tuple:
+        normalized = tuple(sorted({_normalize_text(k) for k in keywords or [] if k and k.strip()}))
+        return (
+            category, normalized, _normalize_text(latest_message),
+            round(match_threshold, 4), match_count, EMBEDDING_DIM, FAQ_HYBRID_ENABLED,
+        )
+
+    def get(self, key: tuple) -> list[dict] | None:
+        if self.ttl <= 0:
+            return None
+        entry = self._entries.get(key)
+        if entry is None or time.time() - entry[0] > self.ttl:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # 호출자가 결과 dict를 수정해도 캐시가 오염되지 않도록 복사본 반환
+        return [dict(faq) for faq in entry[1]]
+
+    def put(self, key: tuple, results: list[dict]):
+        if self.ttl <= 0:
+            return
+        self._entries[key] = (time.time(), [dict(faq) for faq in results])
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self, reason: str):
+        if self._entries:
+            logger.info(f"[RAG Cache] Invalidated {len(self._entries)} entries ({reason})")
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+_retrieval_cache = _RetrievalCache(FAQ_CACHE_TTL_SEC, FAQ_CACHE_MAX_ENTRIES)
+
+
+def invalidate_faq_cache(reason: str = "faq_vectors changed"):
+    """faq_vectors 변경 시 검색 결과 캐시 + 시맨틱 답변 캐시 비우기 (삭제 API, 수집 API에서 호출)"""
+    _retrieval_cache.clear(reason)
+    answer_cache.clear(reason)
+
+
+def get_faq_cache_stats() -> dict:
+    return _retrieval_cache.stats()
+
+
+def get_rag_stats() -> dict:
+    """인메모리 인덱스 + 검색 캐시 + 추측 검색 상태 (/health/rag)"""
+    return {
+        "index": _faq_index.stats(),
+        "cache": _retrieval_cache.stats(),
+        "speculation": _speculation_stats.stats(),
+        "answer_cache": answer_cache.stats(),
+    }
+
+
+class _CategoryIndex:
+    """한 카테고리의 검색 대상.
+    - ann: 스냅샷 IVF 세그먼트 (mmap, 불변). tombstones로 삭제/재분류 행 제외
+    - matrix/meta: 스냅샷 이후 추가된 행 (전수 검색)
+    - lexical: ann + 전수 구간 전체에 대한 BM25 (삭제 행은 검색 시 제외)
+    """
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        meta: list[dict],
+        ann: IvfSegment | None = None,
+        tombstones: frozenset[str] = frozenset(),
+        lexical: Bm25Index | None = None,
+    ):
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self.meta = meta
+        self.ann = ann
+        self.tombstones = tombstones
+        self.lexical = lexical
+        self.row_of = {m["id"]: row for row, m in enumerate(meta)}
+
+    def __len__(self) -> int:
+        ann_count = len(self.ann) - len(self.tombstones) if self.ann is not None else 0
+        return ann_count + len(self.meta)
+
+    def vector(self, faq_id: str) -> np.ndarray | None:
+        """정규화된 벡터 조회 (전수 구간 → ANN 구간 순)"""
+        row = self.row_of.get(faq_id)
+        if row is not None:
+            return self.matrix[row]
+        if self.ann is not None and faq_id not in self.tombstones:
+            row = self.ann.row_of.get(faq_id)
+            if row is not None:
+                return np.asarray(self.ann.vectors[row])
+        return None
+
+    def build_lexical(self) -> Bm25Index:
+        ann_meta = [m for m in self.ann.meta if m["id"] not in self.tombstones] if self.ann is not None else []
+        return Bm25Index(ann_meta + self.meta)
+
+
+class FaqVectorIndex:
+    """faq_vectors 전체를 메모리에 올려 search_faq_multi RPC 없이 top-k 검색.
+
+    - 시작 시 ANN 스냅샷을 mmap하고 스냅샷 이후 변경분만 조회 (없으면 전체 페이지 로드)
+    - 이후 created_at 워터마크 기준 증분 갱신 (백그라운드)
+      + duplicate_marked_at 워터마크 이후 중복 표시된 행 제거 (compact_faq_vectors --apply 반영)
+    - 더미 임베딩(0벡터)으로 삽입된 행은 보류했다가 임베딩 완료 후 편입
+    - 삭제/재분류 반영을 위해 주기적으로 전체 재로드
+    """
+
+    def __init__(self):
+        self._categories: dict[str, _CategoryIndex] = {}
+        self._ids: set[str] = set()
+        self._pending_ids: set[str] = set()
+        # 로드/갱신이 await 중일 때 remove()된 id — 교체 직후 다시 적용 (이전 상태로 덮어써 되살아나지 않도록)
+        self._removed_during_build: set[str] = set()
+        self._watermark: str | None = None
+        self._dup_watermark: str | None = None
+        self._snapshot_version: str | None = None
+        self._loaded_at = 0.0
+        self._refreshed_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded_at > 0
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "snapshot": self._snapshot_version,
+            "categories": {cat: len(idx) for cat, idx in self._categories.items()},
+            "pending": len(self._pending_ids),
+            "watermark": self._watermark,
+        }
+
+    # ---------- 로드 / 갱신 ----------
+
+    def _merge_rows(
+        self,
+        rows: list[dict],
+        base: dict[str, _CategoryIndex],
+        ids: set[str],
+        pending: set[str],
+    ) -> dict[str, _CategoryIndex]:
+        """행을 카테고리별 전수 검색 구간에 추가한 새 인덱스 dict 반환 (기존 객체는 불변)"""
+        vectors: dict[str, list[np.ndarray]] = {}
+        metas: dict[str, list[dict]] = {}
+
+        for row in rows:
+            faq_id = row["id"]
+            if faq_id in ids:
+                continue
+            vec = parse_embedding(row.pop("embedding", None))
+            norm = float(np.linalg.norm(vec)) if vec is not None else 0.0
+            if norm == 0.0:
+                # 임베딩 전 더미 벡터 → 다음 갱신 때 다시 확인
+                pending.add(faq_id)
+                continue
+            pending.discard(faq_id)
+            ids.add(faq_id)
+            row.pop("created_at", None)
+            category = row.get("category")
+            vectors.setdefault(category, []).append(vec / norm)
+            metas.setdefault(category, []).append(row)
+
+        merged = dict(base)
+        for category, vecs in vectors.items():
+            new_matrix = np.vstack(vecs)
+            existing = merged.get(category)
+            if existing is None:
+                merged[category] = _CategoryIndex(new_matrix, metas[category])
+                continue
+            if len(existing.meta):
+                new_matrix = np.vstack([existing.matrix, new_matrix])
+            merged[category] = _CategoryIndex(
+                new_matrix, existing.meta + metas[category], existing.ann, existing.tombstones,
+            )
+        return merged
+
+    async def _with_lexical(self, categories: dict[str, _CategoryIndex]) -> dict[str, _CategoryIndex]:
+        """새로 만들어진(행이 바뀐) 카테고리만 BM25 인덱스 빌드 — 스레드에서"""
+        if not FAQ_HYBRID_ENABLED:
+            return categories
+        for category, idx in categories.items():
+            if idx.lexical is None:
+                idx.lexical = await asyncio.to_thread(idx.build_lexical)
+        return categories
+
+    async def load(self):
+        """전체 로드 (시작 시 + 주기적 재로드)"""
+        async with self._lock:
+            start = time.time()
+            self._removed_during_build = set()
+            # 로드 도중 중복 표시된 행도 다음 갱신에서 잡히도록 시작 시각 기준 (시계 오차 여유 포함)
+            dup_watermark = datetime.fromtimestamp(start - _DUP_WATERMARK_SKEW_SEC, timezone.utc).isoformat()
+            snapshot = await asyncio.to_thread(_open_ann_snapshot)
+            if snapshot is not None:
+                await self._load_with_snapshot(*snapshot)
+            else:
+                rows = await asyncio.to_thread(fetch_faq_rows, None)
+                ids: set[str] = set()
+                pending: set[str] = set()
+                self._categories = await self._with_lexical(self._merge_rows(rows, {}, ids, pending))
+                self._ids = ids
+                self._pending_ids = pending
+                self._watermark = rows[-1]["created_at"] if rows else None
+                self._snapshot_version = None
+
+            self._dup_watermark = dup_watermark
+            self._loaded_at = self._refreshed_at = time.time()
+            self._apply_late_removals()
+            invalidate_faq_cache("index reloaded")
+            duration = int((time.time() - start) * 1000)
+            logger.info(
+                f"[RAG Index] Loaded {len(self._ids)} vectors "
+                f"({', '.join(f'{c}={len(i)}' for c, i in self._categories.items())}, "
+                f"snapshot={self._snapshot_version}, pending={len(self._pending_ids)}) in {duration}ms"
+            )
+
+    async def load_rows(self, rows: list[dict]):
+        """DB 대신 주어진 행(임베딩 포함)으로 로드 — 오프라인 벤치마크용 (scripts.bench_retrieval)"""
+        async with self._lock:
+            ids: set[str] = set()
+            pending: set[str] = set()
+            self._categories = await self._with_lexical(self._merge_rows(rows, {}, ids, pending))
+            self._ids = ids
+            self._pending_ids = pending
+            self._watermark = None
+            self._snapshot_version = None
+            self._loaded_at = self._refreshed_at = time.time()
+
+    async def _load_with_snapshot(self, segments: dict[str, IvfSegment], manifest: dict):
+        """스냅샷을 기준으로 현재 DB와 대조: 사라진/재분류된 행은 tombstone, 신규 행만 조회"""
+        live = await asyncio.to_thread(_fetch_live_ids)
+        live_category = {r["id"]: r["category"] for r in live}
+
+        snapshot_category = {}
+        categories = {}
+        for category, seg in segments.items():
+            tombstones = set()
+            for faq_id in seg.ids:
+                if live_category.get(faq_id) == category:
+                    snapshot_category[faq_id] = category
+                else:
+                    tombstones.add(faq_id)
+            dim = seg.vectors.shape[1]
+            categories[category] = _CategoryIndex(
+                np.empty((0, dim), dtype=np.float32), [], seg, frozenset(tombstones),
+            )
+
+        missing = [faq_id for faq_id in live_category if faq_id not in snapshot_category]
+        rows = await asyncio.to_thread(fetch_faq_rows_by_id, missing) if missing else []
+
+        ids = set(snapshot_category)
+        pending: set[str] = set()
+        self._categories = await self._with_lexical(self._merge_rows(rows, categories, ids, pending))
+        self._ids = ids
+        self._pending_ids = pending
+        self._watermark = live[-1]["created_at"] if live else manifest.get("watermark")
+        self._snapshot_version = manifest.get("version")
+
+    async def refresh(self):
+        """created_at 워터마크 이후(경계 포함) 신규 행 + 보류 행만 가져와 병합 (이미 있는 id는 건너뜀)"""
+        if not self.ready or time.time() - self._loaded_at > FAQ_INDEX_FULL_RELOAD_SEC:
+            await self.load()
+            return
+
+        async with self._lock:
+            self._removed_during_build = set()
+            rows = await asyncio.to_thread(fetch_faq_rows, self._watermark)
+            if rows:
+                self._watermark = rows[-1]["created_at"]
+            if self._pending_ids:
+                rows += await asyncio.to_thread(fetch_faq_rows_by_id, list(self._pending_ids))
+
+            ids = set(self._ids)
+            pending = set(self._pending_ids)
+            before = len(ids)
+            merged = self._merge_rows(rows, self._categories, ids, pending)
+            self._categories = await self._with_lexical(merged)
+            self._ids = ids
+            self._pending_ids = pending
+            self._refreshed_at = time.time()
+            self._apply_late_removals()
+            if len(ids) != before:
+                # 별도 프로세스의 수집 스크립트가 추가한 행도 여기서 반영됨
+                invalidate_faq_cache("index refreshed")
+                logger.info(f"[RAG Index] Refreshed: +{len(ids) - before} vectors (total {len(ids)})")
+
+            # 워터마크 이후 중복 표시된 행 제거 (경계 포함 조회 — remove는 이미 없는 id를 무시)
+            if self._dup_watermark:
+                duplicates = await asyncio.to_thread(fetch_duplicate_ids, self._dup_watermark)
+                if duplicates:
+                    self._dup_watermark = duplicates[-1]["duplicate_marked_at"]
+                    self._pending_ids -= {d["id"] for d in duplicates}
+                    self.remove([d["id"] for d in duplicates])
+
+    def schedule_refresh(self):
+        """갱신 주기가 지났으면 백그라운드로 증분 갱신 (검색은 블로킹하지 않음)"""
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        if time.time() - self._refreshed_at < FAQ_INDEX_REFRESH_SEC:
+            return
+        self._refreshed_at = time.time()  # 실패 시에도 연속 재시도 방지
+        self._refresh_task = asyncio.create_task(self._safe_refresh())
+
+    async def _safe_refresh(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"[RAG Index] Refresh failed: {e}")
+
+    def _apply_late_removals(self):
+        """로드/갱신의 await 사이에 들어온 remove()를 새 상태에 다시 적용 (교체 직후, 동기 구간에서 호출)"""
+        late = self._removed_during_build
+        if late:
+            self.remove(list(late))
+        self._removed_during_build = set()
+
+    def remove(self, faq_ids: list[str]):
+        """삭제된 벡터를 인덱스에서 즉시 제거 (락 없이 호출됨 — 진행 중인 로드/갱신은 교체 후 다시 적용)"""
+        self._removed_during_build.update(faq_ids)
+        self._pending_ids -= set(faq_ids)
+        targets = set(faq_ids) & self._ids
+        if not targets:
+            return
+        categories = {}
+        for category, idx in self._categories.items():
+            tombstones = idx.tombstones
+            if idx.ann is not None:
+                tombstones = tombstones | (targets & set(idx.ann.ids))
+            keep = [i for i, m in enumerate(idx.meta) if m["id"] not in targets]
+            if len(keep) == len(idx.meta) and tombstones is idx.tombstones:
+                categories[category] = idx
+            else:
+                # BM25는 재빌드하지 않음 — 삭제 행은 lexical_search에서 self._ids로 걸러짐
+                categories[category] = _CategoryIndex(
+                    idx.matrix[keep], [idx.meta[i] for i in keep], idx.ann, frozenset(tombstones),
+                    idx.lexical,
+                )
+        self._categories = categories
+        self._ids = self._ids - targets
+        invalidate_faq_cache("vectors removed")
+        logger.info(f"[RAG Index] Removed {len(targets)} vectors")
+
+    # ---------- 검색 ----------
+
+    def search(
+        self,
+        query_embedding: list[float],
+        category: str,
+        match_threshold: float,
+        match_count: int,
+    ) -> list[dict]:
+        """search_faq RPC와 동일한 의미: similarity > threshold, 유사도 내림차순 top-k"""
+        idx = self._categories.get(category)
+        if idx is None or not len(idx) or match_count <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm == 0.0:
+            return []
+        query = query / norm
+
+        candidates: list[tuple[float, dict]] = []
+
+        if idx.ann is not None:
+            rows, scores = idx.ann.search(
+                query, match_count + len(idx.tombstones), FAQ_ANN_NPROBE, FAQ_ANN_RERANK,
+            )
+            for row, score in zip(rows, scores):
+                meta = idx.ann.meta[row]
+                if meta["id"] not in idx.tombstones:
+                    candidates.append((float(score), meta))
+
+        if len(idx.meta):
+            scores = idx.matrix @ query
+            k = min(match_count, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            candidates.extend((float(scores[i]), idx.meta[i]) for i in top)
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        results = []
+        for similarity, meta in candidates[:match_count]:
+            if similarity <= match_threshold:
+                break
+            results.append({**meta, "similarity": similarity})
+        return results
+
+    def lexical_search(self, text: str, category: str, match_count: int) -> list[dict]:
+        """BM25 top-k. 결과에 bm25 점수 / bm25_terms(매칭 근거, Bm25Index.search) 포함 (similarity는 없음)."""
+        idx = self._categories.get(category)
+        if idx is None or idx.lexical is None or match_count <= 0:
+            return []
+        # 삭제된 행이 상위를 차지할 수 있으므로 여유 있게 조회 후 필터
+        hits = idx.lexical.search(text, match_count * 2)
+        results = []
+        for doc, score, evidence in hits:
+            meta = idx.lexical.meta[doc]
+            if meta["id"] in self._ids and meta["id"] not in idx.tombstones:
+                results.append({**meta, "bm25": score, "bm25_terms": evidence})
+                if len(results) >= match_count:
+                    break
+        return results
+
+    def vector(self, faq_id: str, category: str) -> np.ndarray | None:
+        """인덱스에 있는 행의 정규화된 벡터 (없으면 None)"""
+        idx = self._categories.get(category)
+        return idx.vector(faq_id) if idx is not None else None
+
+    def similarity(self, faq_id: str, category: str, query_embedding: list[float]) -> float:
+        """인덱스에 있는 행과 쿼리의 코사인 유사도 (없으면 0)"""
+        idx = self._categories.get(category)
+        vec = idx.vector(faq_id) if idx is not None else None
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if vec is None or norm == 0.0:
+            return 0.0
+        return float(vec @ query) / norm
+
+
+_faq_index = FaqVectorIndex()
+
+
+def get_faq_index() -> FaqVectorIndex | None:
+    """검색 가능한 인메모리 인덱스. 비활성화/로드 전이면 None."""
+    if not FAQ_INDEX_ENABLED or not _faq_index.ready:
+        return None
+    _faq_index.schedule_refresh()
+    return _faq_index
+
+
+async def warm_faq_index():
+    """앱 시작 시 인덱스 로드. 실패해도 RPC 폴백으로 동작."""
+    if not FAQ_INDEX_ENABLED:
+        return
+    try:
+        await _faq_index.load()
+    except Exception as e:
+        logger.warning(f"[RAG Index] Initial load failed, using search_faq_multi RPC: {e}")
+
+
+def rpc_search_faq(
+    focus_embedding: list[float] | None,
+    context_embedding: list[float] | None,
+    category: str,
+    match_threshold: float,
+    match_count: int,
+) -> list[dict]:
+    """search_faq_multi RPC (migration 011) — 포커스/컨텍스트 검색 + 메타데이터를 한 번에.
+    결과는 중복 제거 후 유사도 내림차순, matched_by에 어느 쿼리로 찾았는지 표시.
+    축소 차원(EMBEDDING_DIM < 768)은 search_faq_multi_dim (migration 012)."""
+    db = get_supabase()
+    rpc_name = "search_faq_multi" if embedding_column() == "embedding" else "search_faq_multi_dim"
+    result = db.rpc(rpc_name, {
+        "target_category": category,
+        "focus_embedding": focus_embedding,
+        "context_embedding": context_embedding,
+        "match_threshold": match_threshold,
+        "match_count": match_count,
+    }).execute()
+    return result.data or []
+
+
+# ============================================
+# 추측 검색 — 라우팅과 병렬로 최신 메시지 임베딩(+ RPC 경로는 카테고리별 포커스 검색)을 먼저 시작
+# medical/consultation으로 라우팅되면 search_relevant_faq(speculative=...)에서 재사용, 아니면 폐기
+# ============================================
+_SPECULATION_CATEGORIES = ("dermatology", "plastic_surgery")
+
+
+class _SpeculationStats:
+    def __init__(self):
+        self.started = 0
+        self.used = 0
+        self.ready = 0  # 사용 시점에 이미 완료 — 임베딩/검색 대기 전부 절약
+        self.discarded = 0
+        self.mismatched = 0
+        self.failed = 0
+        self.saved_ms = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "started": self.started,
+            "used": self.used,
+            "ready_at_use": self.ready,
+            "discarded": self.discarded,
+            "mismatched": self.mismatched,
+            "failed": self.failed,
+            "payoff_rate": round(self.used / self.started, 3) if self.started else 0.0,
+            "avg_saved_ms": round(self.saved_ms / self.used, 1) if self.used else 0.0,
+        }
+
+
+_speculation_stats = _SpeculationStats()
+
+
+class SpeculativeRetrieval:
+    """한 턴의 추측 검색 핸들. 생성 즉시 백그라운드로 시작된다 (이벤트 루프 안에서 생성할 것)."""
+
+    def __init__(self, latest_message: str, match_threshold: float, match_count: int):
+        self.message = latest_message
+        self.match_threshold = match_threshold
+        self.match_count = match_count
+        self.started_at = time.perf_counter()
+        self.finished_at: float | None = None
+        self.settled = False
+        self._embedding = asyncio.create_task(get_query_embedding(latest_message))
+        self._task = asyncio.create_task(self._run())
+        # 폐기된 턴의 실패가 "exception was never retrieved"로 남지 않도록
+        for task in (self._embedding, self._task):
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        _speculation_stats.started += 1
+
+    async def embedding(self) -> list[float]:
+        """최신 메시지 임베딩 (시맨틱 답변 캐시 조회에도 사용 — 별도 API 호출 없음)"""
+        return await asyncio.shield(self._embedding)
+
+    async def _run(self) -> tuple[list[float], dict[str, list[dict]] | None]:
+        focus_emb = await asyncio.shield(self._embedding)
+        by_category = None  # 로컬 인덱스 검색은 충분히 빠름 — 임베딩만 재사용
+        if get_faq_index() is None:
+            results = await asyncio.gather(*[
+                asyncio.to_thread(rpc_search_faq, focus_emb, None, category, self.match_threshold, self.match_count)
+                for category in _SPECULATION_CATEGORIES
+            ])
+            by_category = dict(zip(_SPECULATION_CATEGORIES, results))
+        self.finished_at = time.perf_counter()
+        return focus_emb, by_category
+
+    def discard(self):
+        """greeting/general 등 RAG가 필요 없는 턴 — 진행 중이면 취소"""
+        if self.settled:
+            return
+        self.settled = True
+        self._task.cancel()
+        self._embedding.cancel()
+        _speculation_stats.discarded += 1
+
+    async def consume(
+        self, latest_message: str | None, category: str, match_threshold: float, match_count: int,
+    ) -> tuple[list[float], list[dict] | None] | None:
+        """(포커스 임베딩, 해당 카테고리 포커스 검색 결과 | None). 쿼리가 다르거나 실패하면 None."""
+        if self.settled:
+            return None
+        self.settled = True
+        if _normalize_text(latest_message) != _normalize_text(self.message):
+            self._task.cancel()
+            self._embedding.cancel()
+            _speculation_stats.mismatched += 1
+            return None
+
+        was_ready = self._task.done()
+        wait_start = time.perf_counter()
+        try:
+            focus_emb, by_category = await self._task
+        except Exception as e:
+            _speculation_stats.failed += 1
+            logger.warning(f"[RAG] speculative retrieval failed: {e}")
+            return None
+        waited = time.perf_counter() - wait_start
+
+        focus_results = None
+        if by_category is not None and (match_threshold, match_count) == (self.match_threshold, self.match_count):
+            focus_results = [dict(faq) for faq in by_category.get(category, [])]
+
+        # 라우팅과 겹쳐 실행된 시간 = 응답 경로에서 빠진 시간
+        saved_ms = (min(self.finished_at, wait_start) - self.started_at) * 1000
+        _speculation_stats.used += 1
+        _speculation_stats.ready += int(was_ready)
+        _speculation_stats.saved_ms += saved_ms
+        logger.info(
+            f"[RAG] speculative reuse: {'ready' if was_ready else f'waited {waited * 1000:.0f}ms'}, "
+            f"saved {saved_ms:.0f}ms, focus results={'-' if focus_results is None else len(focus_results)}"
+        )
+        return focus_emb, focus_results
+
+
+def _hybrid_search(
+    index: FaqVectorIndex,
+    embeddings: list[tuple[str, list[float]]],
+    lexical_text: str,
+    category: str,
+    match_threshold: float,
+    match_count: int,
+) -> list[dict]:
+    """벡터(포커스/컨텍스트) + BM25 순위를 RRF로 결합: score = Σ 1 / (k + rank).
+
+    후보는 목록별 match_count*2개씩 가져오고, 결합 상위 match_count개만 반환한다.
+    BM25에서만 나온 행은 어휘 근거로 거른다 — 질의 토큰이 FAQ_BM25_MIN_TERMS 이상 겹쳐야 유지
+    (CJK bigram 하나만 겹친 무관한 행 방지). 벡터 임계값으로 거르지 않는 이유: 벡터 후보가 이미
+    임계값 이상 행을 모두 담으므로, 임베딩이 놓친 시술명 매칭을 더하는 BM25의 역할이 사라짐.
+    유지한 행은 정렬/MMR용으로 임베딩 유사도를 직접 계산해 similarity를 채운다.
+    """
+    pool = match_count * 2
+    ranked_lists = [
+        (label, index.search(emb, category, match_threshold, pool))
+        for label, emb in embeddings
+    ]
+    ranked_lists.append(("bm25", index.lexical_search(lexical_text, category, pool)))
+
+    fused: dict[str, dict] = {}
+    for label, results in ranked_lists:
+        for rank, faq in enumerate(results, 1):
+            entry = fused.get(faq["id"])
+            if entry is None:
+                entry = fused[faq["id"]] = {**faq, "rrf_score": 0.0}
+            entry["rrf_score"] += 1.0 / (FAQ_RRF_K + rank)
+            if "similarity" in faq:
+                entry["similarity"] = max(entry.get("similarity", 0.0), faq["similarity"])
+            if "bm25" in faq:
+                entry["bm25"] = faq["bm25"]
+        logger.info(f"[RAG] {label} search: {len(results)} results (hybrid)")
+
+    lexical_only = dropped = 0
+    for faq_id, faq in list(fused.items()):
+        if "similarity" in faq:
+            continue
+        if faq.get("bm25_terms", 0) < FAQ_BM25_MIN_TERMS:
+            del fused[faq_id]
+            dropped += 1
+            continue
+        faq["similarity"] = max(
+            (index.similarity(faq_id, category, emb) for _, emb in embeddings),
+            default=0.0,
+        )
+        lexical_only += 1
+
+    merged = sorted(fused.values(), key=lambda x: x["rrf_score"], reverse=True)[:match_count]
+    logger.info(
+        f"[RAG] hybrid fused: {len(merged)} results "
+        f"({lexical_only} BM25-only kept, {dropped} weak lexical matches dropped)"
+    )
+    return merged
+
 
 async def search_relevant_faq(
     keywords: list[str],
@@ -13,17 +854,52 @@ async def search_relevant_faq(
     match_threshold: float = 0.65,
     match_count: int = 8,
     latest_message: str = None,
+    speculative: SpeculativeRetrieval | None = None,
 ) -> list[dict]:
-    """벡터 검색. latest_message가 있으면 듀얼 검색 (포커스 + 컨텍스트) 후 병합."""
-    db = get_supabase()
+    """벡터 검색. latest_message가 있으면 듀얼 검색 (포커스 + 컨텍스트) 후 병합.
+    인메모리 인덱스가 준비되어 있으면 로컬 검색 (+ BM25 하이브리드), 아니면 search_faq_multi RPC.
+    같은 입력은 TTL 캐시에서 반환 (임베딩/DB 호출 없음).
+    speculative가 있으면 라우팅 중 미리 계산한 포커스 임베딩/검색 결과를 재사용."""
+    cache_key = _RetrievalCache.make_key(keywords, category, latest_message, match_threshold, match_count)
+    cached = _retrieval_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"[RAG] cache hit: {len(cached)} results")
+        if speculative is not None:
+            speculative.discard()
+        return cached
+
+    results = await _search_relevant_faq(
+        keywords, category, match_threshold, match_count, latest_message, speculative,
+    )
+    _retrieval_cache.put(cache_key, results)
+    return results
 
+
+async def _search_relevant_faq(
+    keywords: list[str],
+    category: str,
+    match_threshold: float,
+    match_count: int,
+    latest_message: str | None,
+    speculative: SpeculativeRetrieval | None = None,
+) -> list[dict]:
     query_text = " ".join(keywords) if keywords else ""
 
     # 임베딩 생성 — 두 쿼리를 병렬로
     has_focus = bool(latest_message and latest_message.strip())
     has_context = bool(query_text.strip())
 
-    if has_focus and has_context:
+    reused = None
+    if speculative is not None:
+        reused = await speculative.consume(latest_message, category, match_threshold, match_count) if has_focus else None
+        if reused is None:
+            speculative.discard()
+
+    focus_results = None
+    if reused is not None:
+        focus_emb, focus_results = reused
+        context_emb = await get_query_embedding(query_text) if has_context else None
+    elif has_focus and has_context:
         focus_emb, context_emb = await asyncio.gather(
             get_query_embedding(latest_message),
             get_query_embedding(query_text),
@@ -37,88 +913,95 @@ async def search_relevant_faq(
     else:
         return []
 
-    # DB 검색 — 병렬
-    search_tasks = []
-    search_labels = []
+    return await retrieve_faq(
+        focus_emb, context_emb, category, match_threshold, match_count,
+        lexical_text=f"{latest_message or ''} {query_text}",
+        index=get_faq_index(),
+        focus_results=focus_results,
+    )
 
-    if focus_emb:
-        search_tasks.append(
-            asyncio.to_thread(
-                lambda emb=focus_emb: db.rpc("search_faq", {
-                    "query_embedding": emb,
-                    "target_category": category,
-                    "match_threshold": match_threshold,
-                    "match_count": match_count,
-                }).execute()
-            )
-        )
-        search_labels.append("focus")
 
+async def retrieve_faq(
+    focus_emb: list[float] | None,
+    context_emb: list[float] | None,
+    category: str,
+    match_threshold: float,
+    match_count: int,
+    lexical_text: str = "",
+    index: FaqVectorIndex | None = None,
+    hybrid: bool = FAQ_HYBRID_ENABLED,
+    focus_results: list[dict] | None = None,
+) -> list[dict]:
+    """임베딩 이후 단계: 검색 → 병합 → 출처 태깅.
+    index가 None이면 search_faq_multi RPC. 오프라인 벤치마크(scripts.bench_retrieval)에서도 사용.
+    focus_results: RPC 경로에서 포커스 검색 결과를 이미 가진 경우(추측 검색) — 컨텍스트만 조회해 병합."""
+    embeddings = []
+    if focus_emb:
+        embeddings.append(("focus", focus_emb))
     if context_emb:
-        search_tasks.append(
-            asyncio.to_thread(
-                lambda emb=context_emb: db.rpc("search_faq", {
-                    "query_embedding": emb,
-                    "target_category": category,
-                    "match_threshold": match_threshold,
-                    "match_count": match_count,
-                }).execute()
-            )
+        embeddings.append(("context", context_emb))
+
+    if index is not None and hybrid:
+        merged = _hybrid_search(index, embeddings, lexical_text, category, match_threshold, match_count)
+    elif index is not None:
+        # 로컬 인덱스 — 네트워크 왕복 없음
+        search_results = [
+            index.search(emb, category, match_threshold, match_count)
+            for _, emb in embeddings
+        ]
+
+        # 결과 병합 — 포커스 검색 결과 우선
+        seen_ids = set()
+        merged = []
+        for (label, _), results in zip(embeddings, search_results):
+            if results:
+                for faq in results:
+                    faq_id = faq["id"]
+                    if faq_id not in seen_ids:
+                        seen_ids.add(faq_id)
+                        merged.append(faq)
+                logger.info(f"[RAG] {label} search: {len(results)} results (local)")
+
+        # similarity 순으로 정렬, 상위 match_count개만
+        merged.sort(key=lambda x: x.get("similarity", 0), reverse=True)
+        merged = merged[:match_count]
+    elif focus_results is not None:
+        # 추측 검색의 포커스 결과 + 컨텍스트 RPC — search_faq_multi와 같은 규칙으로 병합 (id별 최고 유사도)
+        context_results = await asyncio.to_thread(
+            rpc_search_faq, None, context_emb, category, match_threshold, match_count,
+        ) if context_emb else []
+        best: dict[str, dict] = {}
+        for faq in focus_results + context_results:
+            current = best.get(faq["id"])
+            if current is None or faq.get("similarity", 0) > current.get("similarity", 0):
+                best[faq["id"]] = faq
+        merged = sorted(best.values(), key=lambda x: x.get("similarity", 0), reverse=True)[:match_count]
+        logger.info(f"[RAG] rpc search: {len(merged)} results (speculative focus {len(focus_results)})")
+    else:
+        # DB 검색 — 포커스/컨텍스트를 RPC 1회로 (병합/정렬/메타데이터는 DB에서)
+        merged = await asyncio.to_thread(
+            rpc_search_faq, focus_emb, context_emb, category, match_threshold, match_count,
         )
-        search_labels.append("context")
-
-    search_results = await asyncio.gather(*search_tasks)
-
-    # 결과 병합 — 포커스 검색 결과 우선
-    seen_ids = set()
-    merged = []
-    for label, result in zip(search_labels, search_results):
-        if result.data:
-            for faq in result.data:
-                faq_id = faq["id"]
-                if faq_id not in seen_ids:
-                    seen_ids.add(faq_id)
-                    merged.append(faq)
-            logger.info(f"[RAG] {label} search: {len(result.data)} results")
-
-    # similarity 순으로 정렬, 상위 match_count개만
-    merged.sort(key=lambda x: x.get("similarity", 0), reverse=True)
-    merged = merged[:match_count]
+        logger.info(f"[RAG] rpc search: {len(merged)} results")
 
     if not merged:
         return []
 
-    # RPC 결과에 youtube_title, youtube_video_id가 없을 수 있으므로
-    # id 목록으로 추가 정보 조회
-    faq_ids = [faq["id"] for faq in merged]
-    extra_result = db.table("faq_vectors").select(
-        "id, youtube_title, youtube_video_id, youtube_url"
-    ).in_("id", faq_ids).execute()
-
-    extra_map = {}
-    if extra_result.data:
-        for row in extra_result.data:
-            extra_map[row["id"]] = row
-
     # source_type 태깅: PubMed vs YouTube 구분
+    # RPC/인덱스 결과에 저장된 source_type 사용 (migration 011 이전 스냅샷은 URL로 판별)
     tagged_results = []
     for faq in merged:
-        faq_id = faq["id"]
-        extra = extra_map.get(faq_id, {})
-
-        # RPC에 없는 필드를 추가 조회에서 병합
-        if "youtube_title" not in faq:
-            faq["youtube_title"] = extra.get("youtube_title", "")
-        if "youtube_video_id" not in faq:
-            faq["youtube_video_id"] = extra.get("youtube_video_id", "")
-
-        url = faq.get("youtube_url", "") or ""
-        if "pubmed.ncbi.nlm.nih.gov" in url:
-            faq["source_type"] = "pubmed"
+        faq.setdefault("youtube_title", "")
+        faq.setdefault("youtube_video_id", "")
+
+        source_type = faq.get("source_type")
+        if not source_type:
+            url = faq.get("youtube_url", "") or ""
+            source_type = "pubmed" if "pubmed.ncbi.nlm.nih.gov" in url else "youtube"
+        faq["source_type"] = source_type
+        if source_type == "pubmed":
             faq["paper_title"] = faq.get("youtube_title", "")
             faq["pmid"] = faq.get("youtube_video_id", "")
-        else:
-            faq["source_type"] = "youtube"
         tagged_results.append(faq)
 
     return tagged_results
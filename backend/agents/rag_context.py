@@ -0,0 +1,164 @@
+"""
+RAG 참고자료 컨텍스트 조립 — search_relevant_faq 이후 공통 단계.
+
+1) MMR(maximal marginal relevance) 재정렬: 관련도(similarity)와 이미 고른 참고자료와의 중복도를 함께 고려
+   중복도는 인메모리 인덱스가 있으면 임베딩 코사인, 없으면 BM25 토큰 자카드
+2) 에이전트별 토큰 예산 안에서 순서대로 채우고, 남은 예산에 맞게 답변을 문장 단위로 자름
+
+프롬프트에 실제로 들어간 항목만 반환하므로 rag_references도 그 목록으로 만든다.
+"""
+import logging
+import re
+
+import numpy as np
+
+from config import RAG_CONTEXT_BUDGETS, RAG_MMR_LAMBDA
+from services.faq_bm25 import tokenize
+
+logger = logging.getLogger(__name__)
+
+_CJK_RE = re.compile(r"[ᄀ-ᇿ぀-ヿ㄰-㆏㐀-䶿一-鿿가-힯]")
+# 일본어/전각 문장부호 뒤에는 공백이 없음 → 공백 조건은 ASCII 부호에만
+_SENTENCE_END_RE = re.compile(r"[。．！？]|[.!?](?=\s|$)|다\.|요\.")
+_MIN_SNIPPET_TOKENS = 40  # 이보다 적게 남으면 다음 항목을 넣지 않음
+
+
+def estimate_tokens(text: str) -> int:
+    """Gemini 토큰 수 근사: 한글/가나/한자 1자 ≈ 1토큰, 그 외 4자 ≈ 1토큰"""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """max_tokens 이내로 자르기. 가능하면 마지막 문장 끝에서, 아니면 글자 단위 + "…" """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    used = 0.0
+    cut = 0
+    for i, ch in enumerate(text):
+        used += 1.0 if _CJK_RE.match(ch) else 0.25
+        if used > max_tokens - 1:
+            break
+        cut = i + 1
+    head = text[:cut]
+    ends = [m.end() for m in _SENTENCE_END_RE.finditer(head)]
+    if ends and ends[-1] >= cut // 2:
+        return head[:ends[-1]]
+    return head.rstrip() + "…"
+
+
+def format_snippet(index: int, faq: dict, style: str, answer: str | None = None) -> str:
+    q = faq.get("question", "")
+    a = faq.get("answer", "") if answer is None else answer
+    if style == "compact":
+        return f"[{index}] Q:{q} A:{a}"
+    return f"[참고{index}] 시술: {faq.get('procedure_name', '')}\nQ: {q}\nA: {a}"
+
+
+def format_rag_context(results: list[dict], style: str = "full") -> str:
+    """예산/재정렬 없이 전체를 붙인 컨텍스트 (벤치마크 기준선)"""
+    sep = "\n" if style == "compact" else "\n\n"
+    return sep.join(format_snippet(i, faq, style) for i, faq in enumerate(results, 1))
+
+
+# ============================================
+# MMR
+# ============================================
+
+def _pairwise_similarity(results: list[dict]) -> np.ndarray:
+    """결과 간 유사도 행렬. 인메모리 인덱스 벡터 우선, 없는 항목은 토큰 자카드."""
+    from agents.rag_agent import get_faq_index
+
+    n = len(results)
+    index = get_faq_index()
+    vectors = []
+    if index is not None:
+        vectors = [index.vector(faq.get("id"), faq.get("category")) for faq in results]
+    if vectors and all(v is not None for v in vectors):
+        matrix = np.vstack(vectors)
+        return matrix @ matrix.T
+
+    token_sets = [
+        set(tokenize(f"{faq.get('procedure_name') or ''} {faq.get('question') or ''} {faq.get('answer') or ''}"))
+        for faq in results
+    ]
+    sims = np.eye(n, dtype=np.float32)
+    for i in range(n):
+        for j in range(i + 1, n):
+            union = len(token_sets[i] | token_sets[j])
+            sims[i, j] = sims[j, i] = len(token_sets[i] & token_sets[j]) / union if union else 0.0
+    return sims
+
+
+def mmr_rerank(results: list[dict], lambda_: float = RAG_MMR_LAMBDA) -> list[dict]:
+    """MMR 순서로 재정렬: argmax λ·sim(q, d) − (1−λ)·max sim(d, 선택됨)"""
+    if len(results) <= 2:
+        return list(results)
+    relevance = np.asarray([faq.get("similarity", 0.0) for faq in results], dtype=np.float32)
+    pairwise = _pairwise_similarity(results)
+
+    selected: list[int] = []
+    remaining = list(range(len(results)))
+    while remaining:
+        if selected:
+            redundancy = pairwise[np.ix_(remaining, selected)].max(axis=1)
+        else:
+            redundancy = np.zeros(len(remaining), dtype=np.float32)
+        scores = lambda_ * relevance[remaining] - (1 - lambda_) * redundancy
+        best = remaining[int(np.argmax(scores))]
+        selected.append(best)
+        remaining.remove(best)
+    return [results[i] for i in selected]
+
+
+# ============================================
+# 예산 기반 조립
+# ============================================
+
+def assemble_rag_context(
+    results: list[dict],
+    agent: str,
+    style: str = "full",
+    max_items: int | None = None,
+) -> tuple[str, list[dict]]:
+    """MMR 재정렬 후 에이전트 토큰 예산(RAG_CONTEXT_BUDGETS[agent]) 안에서 참고자료 블록 생성.
+    Returns: (컨텍스트 텍스트, 실제로 포함된 결과 목록)"""
+    if not results:
+        return "", []
+
+    budget = RAG_CONTEXT_BUDGETS.get(agent, RAG_CONTEXT_BUDGETS["default"])
+    ordered = mmr_rerank(results)
+    if max_items:
+        ordered = ordered[:max_items]
+
+    sep = "\n" if style == "compact" else "\n\n"
+    snippets: list[str] = []
+    selected: list[dict] = []
+    remaining = budget
+    for pos, faq in enumerate(ordered):
+        if remaining < _MIN_SNIPPET_TOKENS:
+            break
+        # compact(음성): 남은 예산을 남은 슬롯에 균등 분배 — 첫 항목이 예산을 독점하지 않도록
+        allowance = remaining // (len(ordered) - pos) if style == "compact" else remaining
+        idx = len(selected) + 1
+        full = format_snippet(idx, faq, style)
+        cost = estimate_tokens(full) + (estimate_tokens(sep) if snippets else 0)
+        if cost <= allowance:
+            snippet = full
+        else:
+            # 질문/시술명은 유지하고 답변만 남은 예산에 맞게 자름
+            overhead = estimate_tokens(format_snippet(idx, faq, style, answer=""))
+            answer_budget = allowance - overhead - 1
+            if answer_budget < _MIN_SNIPPET_TOKENS // 2:
+                break
+            snippet = format_snippet(idx, faq, style, answer=truncate_to_tokens(faq.get("answer", ""), answer_budget))
+            cost = estimate_tokens(snippet) + (estimate_tokens(sep) if snippets else 0)
+        snippets.append(snippet)
+        selected.append(faq)
+        remaining -= cost
+
+    logger.info(
+        f"[RAGContext] {agent}: {len(selected)}/{len(results)} refs, "
+        f"{budget - remaining}/{budget} tokens"
+    )
+    return sep.join(snippets), selected
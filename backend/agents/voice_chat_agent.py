@@ -8,7 +8,8 @@ import asyncio
 import logging
 
 from services.gemini_client import generate_text, get_query_embedding
-from services.supabase_client import get_supabase
+from agents.rag_agent import get_faq_index, rpc_search_faq
+from agents.rag_context import assemble_rag_context
 
 logger = logging.getLogger(__name__)
 
@@ -75,15 +76,8 @@ async def run_voice_chat(
 
     rag_results = await rag_task
 
-    # RAG 컨텍스트 (최대 3개, 간결하게)
-    rag_context = ""
-    if rag_results:
-        lines = []
-        for i, faq in enumerate(rag_results[:3], 1):
-            q = faq.get("question", "")[:60]
-            a = faq.get("answer", "")[:120]
-            lines.append(f"[{i}] Q:{q} A:{a}")
-        rag_context = "\n".join(lines)
+    # RAG 컨텍스트 (최대 3개, 음성용 작은 예산 — 답변은 문장 단위로 자름)
+    rag_context, rag_results = assemble_rag_context(rag_results or [], "voice", style="compact", max_items=3)
 
     system = SYSTEM_JA if language == "ja" else SYSTEM_KO
 
@@ -141,29 +135,24 @@ async def _quick_rag_search(message: str) -> list[dict]:
     """메시지 직접 임베딩으로 RAG 검색 (키워드 추출 LLM 호출 생략)."""
     try:
         embedding = await get_query_embedding(message)
-        db = get_supabase()
+
+        # 인메모리 인덱스가 있으면 로컬 검색
+        index = get_faq_index()
+        if index is not None:
+            all_results = (
+                index.search(embedding, "dermatology", 0.60, 3)
+                + index.search(embedding, "plastic_surgery", 0.60, 3)
+            )
+            all_results.sort(key=lambda x: x.get("similarity", 0), reverse=True)
+            return all_results[:3]
 
         # 두 카테고리 모두 검색 (라우팅 없이)
-        derm_task = asyncio.to_thread(
-            lambda: db.rpc("search_faq", {
-                "query_embedding": embedding,
-                "target_category": "dermatology",
-                "match_threshold": 0.60,
-                "match_count": 3,
-            }).execute()
-        )
-        plast_task = asyncio.to_thread(
-            lambda: db.rpc("search_faq", {
-                "query_embedding": embedding,
-                "target_category": "plastic_surgery",
-                "match_threshold": 0.60,
-                "match_count": 3,
-            }).execute()
-        )
+        derm_task = asyncio.to_thread(rpc_search_faq, embedding, None, "dermatology", 0.60, 3)
+        plast_task = asyncio.to_thread(rpc_search_faq, embedding, None, "plastic_surgery", 0.60, 3)
 
         derm_result, plast_result = await asyncio.gather(derm_task, plast_task)
 
-        all_results = (derm_result.data or []) + (plast_result.data or [])
+        all_results = derm_result + plast_result
         # 유사도 순 정렬, 상위 3개
         all_results.sort(key=lambda x: x.get("similarity", 0), reverse=True)
         return all_results[:3]
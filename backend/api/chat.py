@@ -1,14 +1,23 @@
+import asyncio
+import hashlib
 import logging
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timezone
 from typing import Optional
 
 from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
 from pydantic import BaseModel
+from config import CHAT_VOICE_MODE, CHAT_VOICE_FAST_QUEUE_DEPTH
 from models.schemas import ChatStartRequest, ChatMessageRequest, ChatEndRequest, ChatVoiceMessageRequest
 from services.supabase_client import get_supabase
+from services.chat_persistence import chat_persistence
+from services.job_queue import enqueue, current_attempt
 from agents.chat_agent import get_greeting, run_chat_rag  # noqa: F401 — 레거시 호환
-from agents.chat_router import run_multi_agent_chat
+from agents.chat_router import run_multi_agent_chat, _detect_email
+from agents.voice_chat_agent import run_voice_chat
+from agents.conversation_summary import needs_update, update_summary
 from agents.chat_to_consultation import convert_chat_to_consultation
 from agents.pipeline import run_pipeline
 
@@ -18,7 +27,7 @@ router = APIRouter(prefix="/api/chat", tags=["chat"])
 
 
 # ============================================
-# Background task: 파이프라인 실행 + 자동 승인
+# 작업 큐 핸들러 (worker.py): 파이프라인 실행 + 자동 승인 / 이메일 발송
 # ============================================
 async def _run_pipeline_and_auto_approve(
     consultation_id: str, session_id: str
@@ -27,7 +36,8 @@ async def _run_pipeline_and_auto_approve(
     db = get_supabase()
 
     try:
-        await run_pipeline(consultation_id)
+        # 큐 재시도일 때만 체크포인트 재사용
+        await run_pipeline(consultation_id, resume=current_attempt() > 1)
 
         # 파이프라인 완료 후 리포트 확인
         report_result = (
@@ -68,6 +78,154 @@ async def _run_pipeline_and_auto_approve(
             f"[Chat] Pipeline failed for consultation {consultation_id[:8]}: {e}",
             exc_info=True,
         )
+        raise  # 작업 큐 재시도
+
+
+async def _run_pipeline_and_email(consultation_id: str, session_id: str):
+    """관리자 send-email 작업 — R4가 아직 없으면 파이프라인 실행 (발송은 _send_pending_report_email).
+    /end의 chat_pipeline과 같은 키(pipeline:{id})라 그 작업이 진행 중이면 이 작업은 적재되지 않고,
+    그 작업이 끝날 때 예약된 이메일을 발송한다"""
+    db = get_supabase()
+    r = (
+        db.table("reports")
+        .select("id, access_token")
+        .eq("consultation_id", consultation_id)
+        .eq("report_type", "r4")
+        .limit(1)
+        .execute()
+    )
+    if not (r.data and r.data[0].get("access_token")):
+        await run_pipeline(consultation_id, resume=True)
+
+
+async def _send_pending_report_email(consultation_id: str) -> bool:
+    """consultations.pending_report_email(migration 018)에 예약된 R4 이메일 발송.
+    pipeline:{id} 작업 종료 시(worker.py)와 send-email 요청 직후에 호출 — 예약을 RPC로 가져가고 비우므로
+    동시에 불려도 한 번만 발송 (발송 실패 시 예약 복구 후 예외 → 작업 재시도). Returns: 발송 여부"""
+    from services.email_service import send_report_email
+
+    db = get_supabase()
+    r = (
+        db.table("reports")
+        .select("id, access_token, status")
+        .eq("consultation_id", consultation_id)
+        .eq("report_type", "r4")
+        .limit(1)
+        .execute()
+    )
+    if not (r.data and r.data[0].get("access_token")):
+        return False  # 리포트 생성 전 — 예약은 남겨 두고 다음 파이프라인 완료 때 발송
+
+    pending = db.rpc("take_pending_report_email", {"p_consultation_id": consultation_id}).execute().data
+    if not pending:
+        return False
+
+    rpt = r.data[0]
+    try:
+        await send_report_email(
+            to_email=pending["email"],
+            customer_name=pending.get("customer_name") or "お客様",
+            access_token=rpt["access_token"],
+        )
+        db.table("reports").update({
+            "status": "sent",
+            "email_sent_at": datetime.now(timezone.utc).isoformat(),
+        }).eq("id", rpt["id"]).execute()
+    except Exception:
+        db.rpc("restore_pending_report_email", {
+            "p_consultation_id": consultation_id, "p_pending": pending,
+        }).execute()
+        raise
+    logger.info(f"[Admin] Email sent for session {(pending.get('session_id') or consultation_id)[:8]}")
+    return True
+
+
+# ============================================
+# 세션별 턴 직렬화 + 중복 요청 합류
+# - 같은 세션의 턴은 하나씩 처리 (다음 턴은 앞 턴의 응답이 이력에 들어간 뒤 실행)
+# - 같은 키의 요청이 처리 중이면 새 파이프라인을 띄우지 않고 그 결과를 기다림
+#   키: idempotency_key (완료 후 _DEDUP_TTL_SEC 동안 결과 재사용) / 없으면 내용 해시 (처리 중일 때만)
+# - 세션별 마지막 턴 (순번, 처리한 쪽 writer) 기록 — WebSocket 연결이 다른 경로(REST, 다른 연결)의 턴 이후
+#   메모리 이력을 다시 읽도록 (api/chat_ws.py). 프로세스 단위라 다른 인스턴스의 턴은 알 수 없음
+# ============================================
+_DEDUP_TTL_SEC = 120
+_WRITER_MAX_SESSIONS = 10000
+
+
+class _SessionTurnGate:
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._users: dict[str, int] = {}  # 세션별 lock 대기/보유 수 (0이면 lock 정리)
+        self._inflight: dict[tuple[str, str], asyncio.Task] = {}
+        self._completed: dict[tuple[str, str], tuple[float, dict]] = {}
+        self._last_turn: OrderedDict[str, tuple[int, str]] = OrderedDict()  # 세션 → (순번, writer) (LRU)
+        self._turn_seq = 0
+
+    async def _serialized(self, session_id: str, fn, writer: str):
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        self._users[session_id] = self._users.get(session_id, 0) + 1
+        try:
+            async with lock:
+                try:
+                    return await fn()
+                finally:
+                    self._turn_seq += 1
+                    self._last_turn[session_id] = (self._turn_seq, writer)
+                    self._last_turn.move_to_end(session_id)
+                    while len(self._last_turn) > _WRITER_MAX_SESSIONS:
+                        self._last_turn.popitem(last=False)
+        finally:
+            self._users[session_id] -= 1
+            if not self._users[session_id]:
+                del self._users[session_id]
+                del self._locks[session_id]
+
+    def _finish(self, ck: tuple[str, str], task: asyncio.Task, remember: bool):
+        self._inflight.pop(ck, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        if remember:
+            now = time.time()
+            self._completed[ck] = (now, task.result())
+            for k in [k for k, (ts, _) in self._completed.items() if now - ts > self.ttl]:
+                del self._completed[k]
+
+    def last_turn(self, session_id: str) -> tuple[int, str] | None:
+        """세션의 마지막 턴 (순번, writer). 기록 없으면 None — 게이트 안(fn)에서 보면 직전 턴 기준"""
+        return self._last_turn.get(session_id)
+
+    async def run(self, session_id: str, key: str, fn, remember: bool, writer: str = "http") -> dict:
+        ck = (session_id, key)
+        done = self._completed.get(ck)
+        if done and time.time() - done[0] <= self.ttl:
+            logger.info(f"[Chat] duplicate request replayed (session {session_id[:8]})")
+            return done[1]
+
+        task = self._inflight.get(ck)
+        if task is not None:
+            logger.info(f"[Chat] duplicate request joined in-flight turn (session {session_id[:8]})")
+        else:
+            # 요청이 끊겨도 턴은 끝까지 실행되도록 별도 task + shield
+            task = asyncio.create_task(self._serialized(session_id, fn, writer))
+            self._inflight[ck] = task
+            task.add_done_callback(lambda t: self._finish(ck, t, remember))
+        return await asyncio.shield(task)
+
+    @property
+    def depth(self) -> int:
+        """처리 중인 턴 수 (모든 세션)"""
+        return len(self._inflight)
+
+
+_turn_gate = _SessionTurnGate(_DEDUP_TTL_SEC)
+
+
+def _turn_key(idempotency_key: str | None, payload: str) -> tuple[str, bool]:
+    """(게이트 키, 완료 후 결과 재사용 여부)"""
+    if idempotency_key:
+        return f"key:{idempotency_key}", True
+    return f"auto:{hashlib.sha1(payload.encode()).hexdigest()}", False
 
 
 # ============================================
@@ -113,14 +271,21 @@ async def start_chat(data: ChatStartRequest):
 # POST /api/chat/message — 메시지 전송 + AI 응답
 # ============================================
 @router.post("/message")
-async def send_message(data: ChatMessageRequest):
-    """사용자 메시지를 저장하고 AI 응답을 생성"""
+async def send_message(data: ChatMessageRequest, background_tasks: BackgroundTasks):
+    """사용자 메시지를 저장하고 AI 응답을 생성 (세션별 직렬화, 중복 요청은 처리 중인 턴에 합류)"""
+    key, remember = _turn_key(data.idempotency_key, data.content)
+    return await _turn_gate.run(
+        data.session_id, key, lambda: _process_message(data, background_tasks), remember,
+    )
+
+
+async def _process_message(data: ChatMessageRequest, background_tasks: BackgroundTasks) -> dict:
     db = get_supabase()
 
     # 세션 확인
     session_result = (
         db.table("chat_sessions")
-        .select("id, language, status")
+        .select("id, language, status, conversation_summary, summary_until")
         .eq("id", data.session_id)
         .single()
         .execute()
@@ -134,29 +299,29 @@ async def send_message(data: ChatMessageRequest):
 
     language = session.get("language", "ja")
 
-    # 사용자 메시지 저장
-    db.table("chat_messages").insert({
-        "session_id": data.session_id,
-        "role": "user",
-        "content": data.content,
-    }).execute()
-
-    # 이전 메시지 로드 (최근 20개)
+    # 이전 메시지 로드 (직전 턴의 대기 중 쓰기를 먼저 마침 — 보통 즉시 반환)
+    # 최근 19개 + 이번 사용자 메시지 = 20개 (최신순으로 가져와 시간순으로 뒤집음, 더 오래된 내용은 롤링 요약)
+    await chat_persistence.drain(data.session_id)
     history_result = (
         db.table("chat_messages")
-        .select("role, content")
+        .select("role, content, created_at")
         .eq("session_id", data.session_id)
-        .order("created_at")
-        .limit(20)
+        .order("created_at", desc=True)
+        .limit(19)
         .execute()
     )
-    messages = history_result.data or []
+
+    # 사용자 메시지 저장 (응답 경로 밖에서 순서대로 기록)
+    user_row = chat_persistence.add_message(data.session_id, "user", data.content)
+    messages = list(reversed(history_result.data or [])) + [
+        {"role": "user", "content": data.content, "created_at": user_row["created_at"]}
+    ]
 
     # 멀티에이전트 응답 생성
     agent_type = "general"
     try:
         result = await run_multi_agent_chat(
-            messages, language, session_id=data.session_id
+            messages, language, session_id=data.session_id, summary=session
         )
         response_text = result["response"]
         rag_references = result["rag_references"]
@@ -164,12 +329,7 @@ async def send_message(data: ChatMessageRequest):
         # CTA 레벨을 chat_sessions에 저장
         cta_level = result.get("cta_level")
         if cta_level:
-            try:
-                db.table("chat_sessions").update(
-                    {"cta_level": cta_level}
-                ).eq("id", data.session_id).execute()
-            except Exception:
-                pass  # CTA 저장 실패는 무시
+            chat_persistence.update_session(data.session_id, {"cta_level": cta_level})
     except Exception as e:
         logger.error(f"[Chat] Multi-agent failed: {e}", exc_info=True)
         # 폴백 응답
@@ -185,13 +345,12 @@ async def send_message(data: ChatMessageRequest):
             )
         rag_references = []
 
-    # AI 응답 저장
-    db.table("chat_messages").insert({
-        "session_id": data.session_id,
-        "role": "assistant",
-        "content": response_text,
-        "rag_references": rag_references if rag_references else None,
-    }).execute()
+    # AI 응답 저장 (응답 반환 후 기록)
+    chat_persistence.add_message(data.session_id, "assistant", response_text, rag_references)
+
+    # 롤링 요약 갱신 (요약 밖 메시지가 충분히 쌓였을 때만, 응답 후 백그라운드)
+    if needs_update(messages, session):
+        background_tasks.add_task(update_summary, data.session_id, language)
 
     # 메시지 수 확인 (리포트 생성 가능 여부)
     user_msg_count = sum(1 for m in messages if m["role"] == "user")
@@ -211,6 +370,17 @@ async def send_message(data: ChatMessageRequest):
 _TTS_MAX_CHARS = 200  # TTS용 텍스트 최대 길이
 
 
+def _select_voice_mode(requested: str | None, messages: list[dict], consent_state: dict) -> str:
+    """fast(voice_chat_agent 1회 호출) | full(멀티에이전트).
+    이메일 동의 흐름(동의 대기 중 / 이메일 포함)은 멀티에이전트만 처리하므로 항상 full."""
+    if consent_state.get("email_consent_status") == "pending" or _detect_email(messages):
+        return "full"
+    mode = requested if requested in ("fast", "full") else CHAT_VOICE_MODE
+    if mode == "auto":
+        mode = "fast" if _turn_gate.depth >= CHAT_VOICE_FAST_QUEUE_DEPTH else "full"
+    return mode
+
+
 def _truncate_for_tts(text: str, max_chars: int = _TTS_MAX_CHARS) -> str:
     """TTS용 텍스트를 문장 단위로 자름."""
     if len(text) <= max_chars:
@@ -224,8 +394,15 @@ def _truncate_for_tts(text: str, max_chars: int = _TTS_MAX_CHARS) -> str:
 
 
 @router.post("/voice-message")
-async def send_voice_message(data: ChatVoiceMessageRequest):
+async def send_voice_message(data: ChatVoiceMessageRequest, background_tasks: BackgroundTasks):
     """음성 메시지: STT → 멀티에이전트 RAG 챗봇 (TTS 별도, 텍스트 즉시 반환)"""
+    key, remember = _turn_key(data.idempotency_key, data.audio_base64)
+    return await _turn_gate.run(
+        data.session_id, key, lambda: _process_voice_message(data, background_tasks), remember,
+    )
+
+
+async def _process_voice_message(data: ChatVoiceMessageRequest, background_tasks: BackgroundTasks) -> dict:
     from services.gemini_client import speech_to_text
 
     db = get_supabase()
@@ -233,7 +410,7 @@ async def send_voice_message(data: ChatVoiceMessageRequest):
     # 세션 확인
     session_result = (
         db.table("chat_sessions")
-        .select("id, language, status")
+        .select("id, language, status, conversation_summary, summary_until, pending_email, email_consent_status")
         .eq("id", data.session_id)
         .single()
         .execute()
@@ -270,42 +447,46 @@ async def send_voice_message(data: ChatVoiceMessageRequest):
             "audio_format": None,
         }
 
-    # 2. 사용자 메시지 저장
-    db.table("chat_messages").insert({
-        "session_id": data.session_id,
-        "role": "user",
-        "content": transcribed,
-    }).execute()
-
-    # 3. 히스토리 로드 + 멀티에이전트 RAG 챗봇 (텍스트 /message 와 동일 파이프라인)
+    # 2. 히스토리 로드 + 사용자 메시지 저장 예약 (텍스트 /message 와 동일)
+    await chat_persistence.drain(data.session_id)
     history_result = (
         db.table("chat_messages")
-        .select("role, content")
+        .select("role, content, created_at")
         .eq("session_id", data.session_id)
-        .order("created_at")
-        .limit(20)
+        .order("created_at", desc=True)
+        .limit(19)
         .execute()
     )
-    messages = history_result.data or []
+    user_row = chat_persistence.add_message(data.session_id, "user", transcribed)
+    messages = list(reversed(history_result.data or [])) + [
+        {"role": "user", "content": transcribed, "created_at": user_row["created_at"]}
+    ]
+
+    # 3. 응답 생성 — fast: 경량 음성 에이전트(LLM 1회), full: 멀티에이전트 (텍스트 /message 와 동일 파이프라인)
+    consent_state = {
+        "pending_email": session.get("pending_email"),
+        "email_consent_status": session.get("email_consent_status"),
+    }
+    voice_mode = _select_voice_mode(data.voice_mode, messages, consent_state)
+    logger.info(f"[Voice] mode={voice_mode} (in-flight turns {_turn_gate.depth}, session {data.session_id[:8]})")
 
     agent_type = "general"
     try:
-        result = await run_multi_agent_chat(
-            messages, language, session_id=data.session_id
-        )
+        if voice_mode == "fast":
+            result = await run_voice_chat(messages, language)
+        else:
+            result = await run_multi_agent_chat(
+                messages, language, session_id=data.session_id,
+                consent_state=consent_state, summary=session,
+            )
         response_text = result["response"]
         rag_references = result["rag_references"]
         agent_type = result["agent_type"]
         cta_level = result.get("cta_level")
         if cta_level:
-            try:
-                db.table("chat_sessions").update(
-                    {"cta_level": cta_level}
-                ).eq("id", data.session_id).execute()
-            except Exception:
-                pass
+            chat_persistence.update_session(data.session_id, {"cta_level": cta_level})
     except Exception as e:
-        logger.error(f"[Voice] Multi-agent failed: {e}", exc_info=True)
+        logger.error(f"[Voice] {voice_mode} chat failed: {e}", exc_info=True)
         response_text = (
             "申し訳ございません。一時的にエラーが発生しました。もう一度お試しいただけますか？"
             if language == "ja"
@@ -313,13 +494,11 @@ async def send_voice_message(data: ChatVoiceMessageRequest):
         )
         rag_references = []
 
-    # 4. AI 응답 저장
-    db.table("chat_messages").insert({
-        "session_id": data.session_id,
-        "role": "assistant",
-        "content": response_text,
-        "rag_references": rag_references if rag_references else None,
-    }).execute()
+    # 4. AI 응답 저장 (응답 반환 후 기록)
+    chat_persistence.add_message(data.session_id, "assistant", response_text, rag_references)
+
+    if needs_update(messages, session):
+        background_tasks.add_task(update_summary, data.session_id, language)
 
     # 5. 리포트 생성 가능 여부
     user_msg_count = sum(1 for m in messages if m["role"] == "user")
@@ -332,6 +511,7 @@ async def send_voice_message(data: ChatVoiceMessageRequest):
         "rag_references": rag_references,
         "can_generate_report": can_generate_report,
         "agent_type": agent_type,
+        "voice_mode": voice_mode,
         "audio_base64": None,
         "audio_format": None,
     }
@@ -412,11 +592,7 @@ async def confirm_email(data: ConfirmEmailRequest):
             "다른 궁금한 점이 있으시면 편하게 말씀해 주세요!"
         )
 
-    db.table("chat_messages").insert({
-        "session_id": data.session_id,
-        "role": "assistant",
-        "content": confirm_msg,
-    }).execute()
+    chat_persistence.add_message(data.session_id, "assistant", confirm_msg)
 
     logger.info(f"[Chat] Email consent confirmed: {data.email} for session {data.session_id[:8]}")
 
@@ -430,7 +606,7 @@ async def confirm_email(data: ConfirmEmailRequest):
 # POST /api/chat/end — 세션 종료 + 리포트 생성
 # ============================================
 @router.post("/end")
-async def end_chat(data: ChatEndRequest, background_tasks: BackgroundTasks):
+async def end_chat(data: ChatEndRequest):
     """채팅 종료 후 상담 레코드 생성 + 파이프라인 트리거"""
     db = get_supabase()
 
@@ -478,9 +654,11 @@ async def end_chat(data: ChatEndRequest, background_tasks: BackgroundTasks):
         "status": "processing",
     }).eq("id", consultation_id).execute()
 
-    # 백그라운드에서 파이프라인 실행 + 자동 승인
-    background_tasks.add_task(
-        _run_pipeline_and_auto_approve, consultation_id, data.session_id
+    # 파이프라인 실행 + 자동 승인 (작업 큐 → worker.py)
+    enqueue(
+        "chat_pipeline",
+        {"consultation_id": consultation_id, "session_id": data.session_id},
+        dedup_key=f"pipeline:{consultation_id}",
     )
 
     return {
@@ -508,7 +686,8 @@ async def get_chat_history(session_id: str):
     if not session_result.data:
         raise HTTPException(status_code=404, detail="Chat session not found")
 
-    # 메시지 목록
+    # 메시지 목록 (대기 중인 쓰기 반영 후)
+    await chat_persistence.drain(session_id)
     msg_result = (
         db.table("chat_messages")
         .select("*")
@@ -668,8 +847,9 @@ async def admin_list_sessions(
 
     offset = (page - 1) * per_page
 
+    # message_count는 chat_messages 트리거로 유지됨 (migration 010)
     query = db.table("chat_sessions").select(
-        "id, visitor_id, language, status, consultation_id, report_id, cta_level, customer_email, customer_name, created_at, updated_at",
+        "id, visitor_id, language, status, consultation_id, report_id, cta_level, customer_email, customer_name, message_count, created_at, updated_at",
         count="exact",
     )
 
@@ -682,27 +862,9 @@ async def admin_list_sessions(
         .execute()
     )
 
-    # 각 세션에 메시지 수 추가
     sessions = result.data or []
-    session_ids = [s["id"] for s in sessions]
-
-    if session_ids:
-        msg_counts_result = (
-            db.table("chat_messages")
-            .select("session_id")
-            .in_("session_id", session_ids)
-            .execute()
-        )
-        msg_count_map: dict[str, int] = {}
-        for msg in (msg_counts_result.data or []):
-            sid = msg["session_id"]
-            msg_count_map[sid] = msg_count_map.get(sid, 0) + 1
-
-        for session in sessions:
-            session["message_count"] = msg_count_map.get(session["id"], 0)
-    else:
-        for session in sessions:
-            session["message_count"] = 0
+    for session in sessions:
+        session["message_count"] = session.get("message_count") or 0
 
     return {
         "sessions": sessions,
@@ -731,7 +893,8 @@ async def admin_session_detail(session_id: str):
 
     session = session_result.data
 
-    # 메시지 목록
+    # 메시지 목록 (대기 중인 쓰기 반영 후)
+    await chat_persistence.drain(session_id)
     msg_result = (
         db.table("chat_messages")
         .select("*")
@@ -848,7 +1011,6 @@ async def admin_transfer_to_consultation(session_id: str, data: TransferRequest)
 async def admin_send_email(
     session_id: str,
     data: AdminSendEmailRequest,
-    background_tasks: BackgroundTasks,
 ):
     """세션 기반 리포트 생성 + 이메일 발송 (관리자용)"""
     from services.email_service import send_report_email
@@ -914,34 +1076,27 @@ async def admin_send_email(
             "email": data.email,
         }
     else:
-        # 리포트 없으면 파이프라인 실행 후 이메일 발송 (백그라운드)
-        async def _pipeline_and_email():
-            try:
-                await run_pipeline(consultation_id)
-                r = (
-                    db.table("reports")
-                    .select("id, access_token")
-                    .eq("consultation_id", consultation_id)
-                    .eq("report_type", "r4")
-                    .limit(1)
-                    .execute()
-                )
-                if r.data and r.data[0].get("access_token"):
-                    rpt = r.data[0]
-                    await send_report_email(
-                        to_email=data.email,
-                        customer_name=data.customer_name or "お客様",
-                        access_token=rpt["access_token"],
-                    )
-                    db.table("reports").update({
-                        "status": "sent",
-                        "email_sent_at": datetime.now(timezone.utc).isoformat(),
-                    }).eq("id", rpt["id"]).execute()
-                    logger.info(f"[Admin] Email sent for session {session_id[:8]}")
-            except Exception as e:
-                logger.error(f"[Admin] Pipeline+email failed: {e}", exc_info=True)
-
-        background_tasks.add_task(_pipeline_and_email)
+        # 리포트 없으면 이메일을 예약하고 파이프라인 실행 (작업 큐 → worker.py)
+        # /end의 chat_pipeline과 같은 키 — 진행 중이면 그 작업에 합류하고, 그 작업이 끝날 때 예약된 이메일 발송
+        db.table("consultations").update({
+            "pending_report_email": {
+                "email": data.email,
+                "customer_name": data.customer_name or "",
+                "session_id": session_id,
+            },
+        }).eq("id", consultation_id).execute()
+        enqueue(
+            "pipeline_email",
+            {"consultation_id": consultation_id, "session_id": session_id},
+            dedup_key=f"pipeline:{consultation_id}",
+        )
+        # 합류한 작업이 예약 확인을 이미 지난 경우 대비 — 그 사이 리포트가 생성됐으면 바로 발송
+        if await _send_pending_report_email(consultation_id):
+            return {
+                "status": "sent",
+                "consultation_id": consultation_id,
+                "email": data.email,
+            }
         return {
             "status": "processing",
             "consultation_id": consultation_id,
@@ -0,0 +1,319 @@
+"""
+WebSocket 채팅 — /ws/chat
+
+연결 동안 세션 상태(최근 메시지 창, 롤링 요약, 언어, 이메일 동의 상태)를 서버 메모리에 유지해
+HTTP /api/chat/message가 턴마다 하던 세션 검증 · 이력 재조회 · 동의 상태 조회를 없앤다.
+턴은 HTTP 경로와 같은 세션별 게이트(api.chat._turn_gate)로 직렬화 — 같은 세션의 REST/WS 턴이 겹치지 않고,
+다른 경로(다른 탭의 REST 턴, WS 끊김 후 REST 폴백, 다른 연결)가 그 사이 턴을 처리했으면 메모리 상태를 DB에서 다시 읽는다.
+DB 쓰기(메시지 저장, cta_level)는 세션별 순서 보장 큐(services/chat_persistence)로 응답 경로 밖에서 처리한다.
+
+프로토콜 (JSON 텍스트 프레임)
+  client → server
+    {"type": "start", "language": "ja"}                  새 세션 (인사말 반환)
+    {"type": "resume", "session_id": "..."}              기존 세션 이어가기 (연결 시 1회 조회)
+    {"type": "message", "content": "..."}
+    {"type": "voice", "audio_base64": "...", "mime_type": "audio/webm", "enable_tts": true}
+    {"type": "ping"}
+  server → client
+    {"type": "session", "session_id", "language", "greeting"}
+    {"type": "transcript", "text"}                       음성 STT 결과
+    {"type": "delta", "text"}                            응답 문장 단위 청크
+    {"type": "done", "content", "rag_references", "agent_type", "can_generate_report"}
+    {"type": "audio", "seq", "audio_base64", "audio_format", "final"}   문장 단위 TTS (voice + enable_tts)
+    {"type": "error", "detail"} / {"type": "pong"}
+"""
+import asyncio
+import logging
+import re
+import uuid
+from collections import deque
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+
+from services.supabase_client import get_supabase
+from services.chat_persistence import chat_persistence
+from agents.chat_agent import get_greeting
+from agents.chat_router import run_multi_agent_chat
+from agents.conversation_summary import needs_update, update_summary
+from api.chat import _truncate_for_tts, _turn_gate
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["chat"])
+
+_WINDOW = 20  # 에이전트에 넘기는 최근 메시지 수 (HTTP 경로와 동일)
+_SENTENCE_RE = re.compile(r"[^。．.！!？?\n]+[。．.！!？?\n]*")
+
+
+def split_sentences(text: str) -> list[str]:
+    """응답 스트리밍/TTS용 문장 분할 (구분자 유지)"""
+    return [s for s in _SENTENCE_RE.findall(text) if s.strip()] or ([text] if text else [])
+
+
+# ============================================
+# 세션 상태 조회 (연결 시 / 다른 writer의 턴 이후)
+# ============================================
+async def _fetch_session_state(session_id: str) -> tuple[dict, list[dict]] | None:
+    """(세션 행, 최근 메시지 창). 세션이 없으면 None"""
+    db = get_supabase()
+    await chat_persistence.drain(session_id)  # 대기 쓰기 반영 후 이력 조회
+    session_result, history_result = await asyncio.gather(
+        asyncio.to_thread(lambda: db.table("chat_sessions")
+                          .select("id, language, status, pending_email, email_consent_status, "
+                                  "conversation_summary, summary_until")
+                          .eq("id", session_id).limit(1).execute()),
+        asyncio.to_thread(lambda: db.table("chat_messages")
+                          .select("role, content, created_at")
+                          .eq("session_id", session_id)
+                          .order("created_at", desc=True)
+                          .limit(_WINDOW).execute()),
+    )
+    if not session_result.data:
+        return None
+    return session_result.data[0], list(reversed(history_result.data or []))
+
+
+def _consent_of(session: dict) -> dict:
+    return {
+        "pending_email": session.get("pending_email"),
+        "email_consent_status": session.get("email_consent_status"),
+    }
+
+
+def _summary_of(session: dict) -> dict:
+    return {
+        "conversation_summary": session.get("conversation_summary"),
+        "summary_until": session.get("summary_until"),
+    }
+
+
+# ============================================
+# 연결 상태
+# ============================================
+class ChatConnection:
+    def __init__(self, ws: WebSocket, session_id: str, language: str, messages: list[dict], consent: dict,
+                 summary: dict | None = None):
+        self.ws = ws
+        self.session_id = session_id
+        self.language = language
+        self.messages: deque[dict] = deque(messages, maxlen=_WINDOW)
+        self.consent = consent  # {"pending_email", "email_consent_status"} — run_multi_agent_chat이 갱신
+        self.summary = summary or {}  # {"conversation_summary", "summary_until"} — 백그라운드 갱신 후 교체
+        self._summary_task: asyncio.Task | None = None
+        self.user_msg_count = sum(1 for m in messages if m["role"] == "user")
+        self.writer_id = f"ws:{uuid.uuid4().hex[:12]}"
+        self._synced_turn = _turn_gate.last_turn(session_id)  # 메모리 상태가 반영한 마지막 게이트 턴
+
+    @classmethod
+    async def start(cls, ws: WebSocket, language: str) -> "ChatConnection":
+        db = get_supabase()
+        visitor_id = f"visitor_{uuid.uuid4().hex[:12]}"
+        session = (await asyncio.to_thread(lambda: db.table("chat_sessions").insert({
+            "visitor_id": visitor_id,
+            "language": language,
+            "status": "active",
+        }).execute())).data[0]
+
+        greeting = get_greeting(language)
+        conn = cls(ws, session["id"], language, [{"role": "assistant", "content": greeting}],
+                   {"pending_email": None, "email_consent_status": None})
+        chat_persistence.add_message(conn.session_id, "assistant", greeting)
+        await ws.send_json({
+            "type": "session", "session_id": conn.session_id, "visitor_id": visitor_id,
+            "language": language, "greeting": greeting,
+        })
+        return conn
+
+    @classmethod
+    async def resume(cls, ws: WebSocket, session_id: str) -> "ChatConnection | None":
+        synced = _turn_gate.last_turn(session_id)  # 조회 전 기준 — 조회 중 끝난 턴은 다음 턴에서 다시 읽음
+        state = await _fetch_session_state(session_id)
+        if state is None:
+            await ws.send_json({"type": "error", "detail": "Chat session not found"})
+            return None
+        session, messages = state
+        if session["status"] != "active":
+            await ws.send_json({"type": "error", "detail": "Chat session is not active"})
+            return None
+
+        conn = cls(ws, session_id, session.get("language") or "ja", messages, _consent_of(session),
+                   _summary_of(session))
+        conn._synced_turn = synced
+        await ws.send_json({"type": "session", "session_id": session_id, "language": conn.language, "greeting": None})
+        return conn
+
+    async def _reload(self):
+        """다른 writer의 턴 이후 — 최근 메시지 창 / 이메일 동의 상태 / 요약을 DB에서 다시 읽음 (게이트 안에서 호출)"""
+        state = await _fetch_session_state(self.session_id)
+        if state is None:
+            return
+        session, messages = state
+        self.messages = deque(messages, maxlen=_WINDOW)
+        self.consent.clear()
+        self.consent.update(_consent_of(session))
+        self.summary = _summary_of(session)
+        self.user_msg_count = sum(1 for m in messages if m["role"] == "user")
+        logger.info(f"[ChatWS] session {self.session_id[:8]} reloaded after a turn from another writer")
+
+    # ------------------------------------------
+    # 턴 처리
+    # ------------------------------------------
+    async def handle_text(self, content: str, with_tts: bool = False):
+        # 프레임마다 고유 키 — 합류/재사용 없이 같은 세션의 다른 턴과 직렬화만
+        result = await _turn_gate.run(
+            self.session_id, f"ws:{uuid.uuid4().hex}", lambda: self._run_turn(content), False,
+            writer=self.writer_id,
+        )
+        response_text = result["response"]
+        rag_references = result["rag_references"]
+        self._maybe_refresh_summary()
+
+        # TTS는 첫 문장부터 병렬로 시작하고, 텍스트 청크를 먼저 전송
+        sentences = split_sentences(response_text)
+        tts_task = asyncio.create_task(self._stream_audio(response_text)) if with_tts else None
+        for sentence in sentences:
+            await self.ws.send_json({"type": "delta", "text": sentence})
+        await self.ws.send_json({
+            "type": "done",
+            "content": response_text,
+            "rag_references": rag_references,
+            "agent_type": result["agent_type"],
+            "can_generate_report": self.user_msg_count >= 5,
+        })
+        if tts_task:
+            await tts_task
+
+    async def _run_turn(self, content: str) -> dict:
+        """메시지 저장 예약 + 멀티에이전트 응답 생성 (게이트 안에서 실행 — 연결이 끊겨도 끝까지 실행)"""
+        last = _turn_gate.last_turn(self.session_id)
+        if last is not None and last != self._synced_turn and last[1] != self.writer_id:
+            await self._reload()
+        self._synced_turn = last
+
+        user_row = chat_persistence.add_message(self.session_id, "user", content)
+        self.messages.append({"role": "user", "content": content, "created_at": user_row["created_at"]})
+        self.user_msg_count += 1
+
+        agent_type = "general"
+        try:
+            result = await run_multi_agent_chat(
+                list(self.messages), self.language,
+                session_id=self.session_id, consent_state=self.consent, summary=self.summary,
+            )
+            response_text = result["response"]
+            rag_references = result["rag_references"]
+            agent_type = result["agent_type"]
+            if result.get("cta_level"):
+                chat_persistence.update_session(self.session_id, {"cta_level": result["cta_level"]})
+        except Exception as e:
+            logger.error(f"[ChatWS] Multi-agent failed: {e}", exc_info=True)
+            response_text = (
+                "申し訳ございません。一時的にエラーが発生しました。もう一度お試しいただけますか？"
+                if self.language == "ja"
+                else "죄송합니다. 일시적인 오류가 발생했습니다. 다시 시도해 주시겠어요?"
+            )
+            rag_references = []
+
+        assistant_row = chat_persistence.add_message(self.session_id, "assistant", response_text, rag_references)
+        self.messages.append({"role": "assistant", "content": response_text, "created_at": assistant_row["created_at"]})
+        return {"response": response_text, "rag_references": rag_references, "agent_type": agent_type}
+
+    async def handle_voice(self, audio_base64: str, mime_type: str, enable_tts: bool):
+        from services.gemini_client import speech_to_text
+
+        try:
+            transcribed = await speech_to_text(audio_base64, mime_type, self.language)
+        except Exception as e:
+            logger.error(f"[ChatWS] STT failed: {e}", exc_info=True)
+            await self.ws.send_json({"type": "error", "detail": "Speech recognition failed. Please try text input."})
+            return
+
+        await self.ws.send_json({"type": "transcript", "text": transcribed or ""})
+        if not transcribed or not transcribed.strip():
+            await self.ws.send_json({
+                "type": "done",
+                "content": (
+                    "音声を認識できませんでした。もう一度お試しいただくか、テキストで入力してください。"
+                    if self.language == "ja"
+                    else "음성을 인식하지 못했습니다. 다시 시도하거나 텍스트로 입력해 주세요."
+                ),
+                "rag_references": [],
+                "agent_type": "general",
+                "can_generate_report": False,
+            })
+            return
+        await self.handle_text(transcribed, with_tts=enable_tts)
+
+    def _maybe_refresh_summary(self):
+        """요약 밖 메시지가 쌓였으면 백그라운드로 요약 갱신 (연결당 1개씩)"""
+        if self._summary_task and not self._summary_task.done():
+            return
+        if not needs_update(list(self.messages), self.summary):
+            return
+
+        async def _refresh():
+            await asyncio.sleep(0)  # 응답 프레임 전송을 먼저
+            updated = await update_summary(self.session_id, self.language)
+            if updated:
+                self.summary = updated
+
+        self._summary_task = asyncio.create_task(_refresh())
+
+    async def _stream_audio(self, response_text: str):
+        """문장 단위 TTS를 동시에 합성하고 순서대로 전송 — 첫 문장 오디오가 전체 합성을 기다리지 않음"""
+        from services.gemini_client import text_to_speech
+
+        chunks = split_sentences(_truncate_for_tts(response_text))
+        tasks = [asyncio.create_task(text_to_speech(chunk, self.language)) for chunk in chunks]
+        for seq, task in enumerate(tasks):
+            audio = await task
+            if audio:
+                await self.ws.send_json({
+                    "type": "audio", "seq": seq, "audio_base64": audio, "audio_format": "mp3",
+                    "final": seq == len(tasks) - 1,
+                })
+
+    async def close(self):
+        # 메시지 쓰기는 chat_persistence가 연결과 무관하게 마저 처리 (종료 시 main.py에서 flush)
+        if self._summary_task and not self._summary_task.done():
+            await self._summary_task
+
+
+@router.websocket("/ws/chat")
+async def chat_websocket(ws: WebSocket):
+    await ws.accept()
+    conn: ChatConnection | None = None
+    try:
+        first = await ws.receive_json()
+        if first.get("type") == "resume" and first.get("session_id"):
+            conn = await ChatConnection.resume(ws, first["session_id"])
+        elif first.get("type") == "start":
+            conn = await ChatConnection.start(ws, first.get("language") or "ja")
+        else:
+            await ws.send_json({"type": "error", "detail": "First frame must be start or resume"})
+        if conn is None:
+            await ws.close(code=4400)
+            return
+        logger.info(f"[ChatWS] connected session {conn.session_id[:8]} ({len(conn.messages)} messages)")
+
+        while True:
+            frame = await ws.receive_json()
+            kind = frame.get("type")
+            if kind == "message" and (frame.get("content") or "").strip():
+                await conn.handle_text(frame["content"])
+            elif kind == "voice" and frame.get("audio_base64"):
+                await conn.handle_voice(
+                    frame["audio_base64"], frame.get("mime_type", "audio/webm"), frame.get("enable_tts", True),
+                )
+            elif kind == "ping":
+                await ws.send_json({"type": "pong"})
+            else:
+                await ws.send_json({"type": "error", "detail": f"Unsupported frame: {kind}"})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"[ChatWS] connection error: {e}", exc_info=True)
+    finally:
+        if conn is not None:
+            await conn.close()
+            logger.info(f"[ChatWS] disconnected session {conn.session_id[:8]}")
@@ -1,20 +1,8 @@
-import asyncio
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query
 from typing import Optional
 from models.schemas import ConsultationCreate, ConsultationBulkCreate, ClassifyRequest, CTAUpdateRequest, GenerateReportsRequest, ConsultationUpdateRequest
 from services.supabase_client import get_supabase
-from agents.pipeline import run_pipeline, resume_pipeline
-
-
-async def _run_pipelines_parallel(consultation_ids: list[str], concurrency: int = 5):
-    """파이프라인을 동시성 제한하여 병렬 실행"""
-    semaphore = asyncio.Semaphore(concurrency)
-
-    async def _run_one(cid: str):
-        async with semaphore:
-            await run_pipeline(cid)
-
-    await asyncio.gather(*[_run_one(cid) for cid in consultation_ids], return_exceptions=True)
+from services.job_queue import enqueue
 
 router = APIRouter(prefix="/api/consultations", tags=["consultations"])
 
@@ -68,7 +56,7 @@ async def create_consultations_bulk(data: ConsultationBulkCreate):
 
 
 @router.post("/generate-reports")
-async def generate_reports(data: GenerateReportsRequest, background_tasks: BackgroundTasks):
+async def generate_reports(data: GenerateReportsRequest):
     """선택한 상담건에 대해 AI 리포트 생성 파이프라인 실행"""
     if len(data.consultation_ids) == 0:
         raise HTTPException(status_code=400, detail="생성할 상담 ID가 없습니다")
@@ -102,9 +90,9 @@ async def generate_reports(data: GenerateReportsRequest, background_tasks: Backg
                 "reason": "이미 처리 중이거나 완료된 상담입니다",
             })
 
-    # 병렬 실행 (최대 5건 동시)
-    if triggered_ids:
-        background_tasks.add_task(_run_pipelines_parallel, triggered_ids, 5)
+    # 작업 큐에 적재 (동시 실행 수는 worker.py의 JOB_WORKER_CONCURRENCY)
+    for cid in triggered_ids:
+        enqueue("pipeline", {"consultation_id": cid}, dedup_key=f"pipeline:{cid}")
 
     return {
         "triggered": len(triggered_ids),
@@ -181,7 +169,6 @@ async def update_consultation(consultation_id: str, data: ConsultationUpdateRequ
 async def classify_consultation(
     consultation_id: str,
     data: ClassifyRequest,
-    background_tasks: BackgroundTasks,
 ):
     db = get_supabase()
 
@@ -194,7 +181,11 @@ async def classify_consultation(
         raise HTTPException(status_code=400, detail="Consultation is not pending classification")
 
     # 수동 분류 후 파이프라인 재개
-    background_tasks.add_task(resume_pipeline, consultation_id, data.classification)
+    enqueue(
+        "resume_pipeline",
+        {"consultation_id": consultation_id, "classification": data.classification},
+        dedup_key=f"pipeline:{consultation_id}",
+    )
 
     return {"id": consultation_id, "status": "report_generating"}
 
@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from typing import List, Optional
 from pydantic import BaseModel
-from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query
 from models.schemas import ReportEditRequest, ReportRegenerateRequest, BulkApproveRequest
 
 
@@ -10,7 +10,7 @@ class DeleteReportsRequest(BaseModel):
 from services.supabase_client import get_supabase
 from services.email_service import send_report_email
 from agents.korean_translator import translate_report_to_korean
-from agents.pipeline import regenerate_report
+from services.job_queue import enqueue
 
 router = APIRouter(prefix="/api/reports", tags=["reports"])
 
@@ -230,7 +230,6 @@ async def reject_report(report_id: str):
 async def regenerate_report_endpoint(
     report_id: str,
     data: ReportRegenerateRequest,
-    background_tasks: BackgroundTasks,
 ):
     """관리자 피드백 기반 리포트 재생성"""
     db = get_supabase()
@@ -262,7 +261,11 @@ async def regenerate_report_endpoint(
         {"status": "report_generating"}
     ).eq("id", report.data["consultation_id"]).execute()
 
-    background_tasks.add_task(regenerate_report, report_id, data.direction.strip())
+    enqueue(
+        "regenerate_report",
+        {"report_id": report_id, "direction": data.direction.strip()},
+        dedup_key=f"regenerate:{report_id}",
+    )
 
     return {
         "id": report_id,
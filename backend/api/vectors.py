@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
 from typing import List, Optional
 from services.supabase_client import get_supabase
+from agents.rag_agent import get_faq_index, invalidate_faq_cache
 
 router = APIRouter(prefix="/api/vectors", tags=["vectors"])
 
@@ -10,6 +11,14 @@ class BulkDeleteRequest(BaseModel):
     ids: List[str]
 
 
+def _evict_from_index(ids: List[str]):
+    """삭제된 벡터를 인메모리 RAG 인덱스 / 검색 결과 캐시에서도 제거"""
+    index = get_faq_index()
+    if index is not None:
+        index.remove(ids)
+    invalidate_faq_cache("vectors deleted")
+
+
 @router.get("")
 async def list_vectors(
     page: int = Query(1, ge=1),
@@ -53,6 +62,7 @@ async def delete_vector(vector_id: str):
         raise HTTPException(status_code=404, detail="벡터를 찾을 수 없습니다")
 
     db.table("faq_vectors").delete().eq("id", vector_id).execute()
+    _evict_from_index([vector_id])
     return {"deleted": True, "id": vector_id}
 
 
@@ -65,4 +75,5 @@ async def bulk_delete_vectors(data: BulkDeleteRequest):
 
     db = get_supabase()
     db.table("faq_vectors").delete().in_("id", data.ids).execute()
+    _evict_from_index(data.ids)
     return {"deleted": len(data.ids), "ids": data.ids}
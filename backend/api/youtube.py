@@ -3,7 +3,8 @@ from fastapi import APIRouter, HTTPException
 from models.schemas import YouTubeAddRequest
 from services.supabase_client import get_supabase
 from services.youtube_service import extract_video_id, fetch_transcript
-from services.gemini_client import generate_json, get_embedding
+from services.gemini_client import generate_json, get_embedding, embedding_columns
+from agents.rag_agent import invalidate_faq_cache
 
 router = APIRouter(prefix="/api/youtube", tags=["youtube"])
 
@@ -108,12 +109,14 @@ JSON 배열로 반환:
                 "question": faq["question"],
                 "answer": faq["answer"],
                 "procedure_name": faq.get("procedure_name", ""),
-                "embedding": embedding,
+                **embedding_columns(embedding),
                 "youtube_video_id": video_id,
                 "youtube_url": f"https://youtube.com/watch?v={video_id}",
             }).execute()
 
         db.table("youtube_sources").update({"status": "embedded"}).eq("id", source["id"]).execute()
+        if faqs:
+            invalidate_faq_cache("youtube ingestion")
 
         results.append({
             "video_id": video_id,
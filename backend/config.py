@@ -12,6 +12,99 @@ GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD", "")
 JWT_SECRET = os.getenv("JWT_SECRET", "medihim-ippeo-jwt-secret-key-2026")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
+# Supabase(PostgREST) HTTP 커넥션 풀 — 채팅/파이프라인/관리자 호출이 공유
+SUPABASE_HTTP2 = os.getenv("SUPABASE_HTTP2", "true").lower() == "true"
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "50"))
+SUPABASE_MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "20"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+SUPABASE_REQUEST_TIMEOUT = float(os.getenv("SUPABASE_REQUEST_TIMEOUT", "30"))
+SUPABASE_POOL_TIMEOUT = float(os.getenv("SUPABASE_POOL_TIMEOUT", "10"))
+
+# FAQ 벡터 인메모리 인덱스 (RAG 검색용, 비활성화 시 search_faq_multi RPC 사용)
+FAQ_INDEX_ENABLED = os.getenv("FAQ_INDEX_ENABLED", "true").lower() == "true"
+FAQ_INDEX_REFRESH_SEC = int(os.getenv("FAQ_INDEX_REFRESH_SEC", "300"))
+FAQ_INDEX_FULL_RELOAD_SEC = int(os.getenv("FAQ_INDEX_FULL_RELOAD_SEC", "21600"))
+
+# FAQ ANN(IVF) 스냅샷 — scripts/build_faq_ann_index.py로 빌드, 시작 시 mmap 로드
+FAQ_ANN_DIR = os.getenv("FAQ_ANN_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "faq_ann"))
+FAQ_ANN_BUCKET = os.getenv("FAQ_ANN_BUCKET", "")  # 설정 시 Supabase Storage에서 최신 스냅샷 다운로드 (운영 필수: FAQ_ANN_DIR 기본값은 gitignore라 배포 이미지에 없음)
+FAQ_ANN_NPROBE = int(os.getenv("FAQ_ANN_NPROBE", "12"))
+FAQ_ANN_QUANT = os.getenv("FAQ_ANN_QUANT", "int8")  # none | float16 | int8 (스캔용 codes, 빌드 시 적용)
+FAQ_ANN_RERANK = int(os.getenv("FAQ_ANN_RERANK", "4"))  # 양자화 스냅샷: k·rerank개 후보를 float32로 재채점
+
+# search_relevant_faq 결과 TTL 캐시 (faq_vectors 변경 시 무효화, 0이면 비활성화)
+FAQ_CACHE_TTL_SEC = int(os.getenv("FAQ_CACHE_TTL_SEC", "600"))
+FAQ_CACHE_MAX_ENTRIES = int(os.getenv("FAQ_CACHE_MAX_ENTRIES", "1024"))
+
+# 임베딩 차원 (gemini-embedding-001 Matryoshka) — 768: embedding, 512/256: embedding_512/embedding_256 컬럼
+# 문서 임베딩은 항상 768로 생성하고 축소 컬럼은 앞부분을 잘라 정규화해 함께 저장 (migration 012)
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "768"))
+EMBEDDING_REDUCED_DIMS = (512, 256)
+
+# 하이브리드 검색 — BM25(시술명/질문/답변) + 벡터 결과를 RRF로 결합 (인메모리 인덱스 사용 시)
+FAQ_HYBRID_ENABLED = os.getenv("FAQ_HYBRID_ENABLED", "true").lower() == "true"
+FAQ_RRF_K = int(os.getenv("FAQ_RRF_K", "60"))
+# BM25에서만 나온 행의 최소 매칭 근거 (겹친 질의 토큰 수, 라틴 단어는 2) — 2: CJK bigram 하나만 겹친 행 제외
+FAQ_BM25_MIN_TERMS = int(os.getenv("FAQ_BM25_MIN_TERMS", "2"))
+
+# RAG 컨텍스트 조립 (agents/rag_context.py) — MMR 재정렬 후 에이전트별 토큰 예산 안에서 참고자료 선택
+RAG_MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))  # 1.0 = 관련도만, 낮을수록 다양성 우선
+RAG_CONTEXT_BUDGETS = {
+    "medical": int(os.getenv("RAG_BUDGET_MEDICAL", "900")),
+    "consultation": int(os.getenv("RAG_BUDGET_CONSULTATION", "700")),
+    "chat": int(os.getenv("RAG_BUDGET_CHAT", "900")),
+    "voice": int(os.getenv("RAG_BUDGET_VOICE", "200")),
+    "default": int(os.getenv("RAG_BUDGET_DEFAULT", "800")),
+}
+
+# 챗봇 라우터 — combined: 의도 분류 + 키워드 추출을 한 번의 호출로, split: 두 호출 병렬 (scripts/ab_chat_router.py로 비교)
+CHAT_ROUTER_MODE = os.getenv("CHAT_ROUTER_MODE", "combined")
+# 규칙/어휘 fast-path 라우터 — on: 확실한 턴은 LLM 없이 판정, shadow: 판정만 기록(LLM 결과 사용), off
+# on일 때 fast-path 턴의 AUDIT_RATE 비율을 백그라운드로 LLM 라우터와 비교 (/health/router 일치율)
+CHAT_FAST_ROUTER = os.getenv("CHAT_FAST_ROUTER", "on")
+CHAT_FAST_ROUTER_AUDIT_RATE = float(os.getenv("CHAT_FAST_ROUTER_AUDIT_RATE", "0.1"))
+
+# 챗봇 에이전트(medical/consultation) RAG 검색 파라미터 — 후보 수는 assemble_rag_context가 예산 안에서 줄임
+CHAT_RAG_MATCH_THRESHOLD = float(os.getenv("CHAT_RAG_MATCH_THRESHOLD", "0.55"))
+CHAT_RAG_MATCH_COUNT = int(os.getenv("CHAT_RAG_MATCH_COUNT", "8"))
+# LLM 라우팅과 병렬로 최신 메시지 임베딩(+ RPC 경로는 카테고리별 포커스 검색)을 미리 시작 (/health/rag speculation)
+CHAT_SPECULATIVE_RAG = os.getenv("CHAT_SPECULATIVE_RAG", "true").lower() == "true"
+# 시맨틱 답변 캐시 (agents/answer_cache.py) — 이력/요약 없이 답한 첫 턴 질문의 답변을 임베딩 유사도로 재사용
+# TTL 0이면 비활성화, faq_vectors 변경 시 검색 캐시와 함께 무효화
+CHAT_ANSWER_CACHE_TTL_SEC = int(os.getenv("CHAT_ANSWER_CACHE_TTL_SEC", "3600"))
+CHAT_ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_ANSWER_CACHE_MAX_ENTRIES", "2000"))
+CHAT_ANSWER_CACHE_THRESHOLD = float(os.getenv("CHAT_ANSWER_CACHE_THRESHOLD", "0.95"))
+# 롤링 대화 요약 (agents/conversation_summary.py, migration 014) — 요약 밖 메시지가 KEEP + 사용자 N턴분 쌓이면
+# 백그라운드로 오래된 메시지를 chat_sessions.conversation_summary에 접음 (최근 KEEP개는 항상 원문 유지)
+# 에이전트 프롬프트의 대화 이력 = 요약 + 최근 메시지, HISTORY_TOKEN_BUDGET 안에서 최신부터 채움
+CHAT_SUMMARY_EVERY_TURNS = int(os.getenv("CHAT_SUMMARY_EVERY_TURNS", "3"))
+CHAT_SUMMARY_KEEP_MESSAGES = int(os.getenv("CHAT_SUMMARY_KEEP_MESSAGES", "6"))
+CHAT_SUMMARY_MAX_CHARS = int(os.getenv("CHAT_SUMMARY_MAX_CHARS", "600"))
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1200"))
+# 채팅 저장 (services/chat_persistence.py) — 응답 반환 후 세션별 순서 보장 큐로 쓰기 (연속 insert는 한 번에)
+# 실패 시 지수 백오프 재시도, 종료 시 SHUTDOWN_TIMEOUT 안에서 남은 쓰기 flush (/health/persistence)
+# 큐는 프로세스 메모리 — 인스턴스가 강제 종료되면 대기 쓰기 유실 (API 배포는 --no-cpu-throttling 필수)
+CHAT_PERSIST_BATCH_SIZE = int(os.getenv("CHAT_PERSIST_BATCH_SIZE", "20"))
+CHAT_PERSIST_MAX_RETRIES = int(os.getenv("CHAT_PERSIST_MAX_RETRIES", "3"))
+CHAT_PERSIST_SHUTDOWN_TIMEOUT_SEC = float(os.getenv("CHAT_PERSIST_SHUTDOWN_TIMEOUT_SEC", "10"))
+# 음성 메시지 모드 — fast: voice_chat_agent 1회 호출, full: 멀티에이전트, auto: 처리 중인 턴이 QUEUE_DEPTH 이상이면 fast
+# 요청의 voice_mode가 우선 (scripts/bench_voice_modes.py로 STT→응답 지연 비교)
+CHAT_VOICE_MODE = os.getenv("CHAT_VOICE_MODE", "auto")
+CHAT_VOICE_FAST_QUEUE_DEPTH = int(os.getenv("CHAT_VOICE_FAST_QUEUE_DEPTH", "4"))
+# 파이프라인 작업 큐 (services/job_queue.py, migration 015) — API는 pipeline_jobs에 적재만, 처리는 worker.py
+# 임대 LEASE_SEC 동안 점유 (처리 중 LEASE/3마다 연장), 실패 시 RETRY_BASE × 2^(시도-1)초 뒤 재시도
+# JOB_WORKER_IN_API=true: 별도 워커 없이 API 프로세스에서 함께 처리 (로컬 개발용)
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+JOB_LEASE_SEC = int(os.getenv("JOB_LEASE_SEC", "300"))
+JOB_POLL_INTERVAL_SEC = float(os.getenv("JOB_POLL_INTERVAL_SEC", "2"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SEC = int(os.getenv("JOB_RETRY_BASE_SEC", "30"))
+JOB_WORKER_IN_API = os.getenv("JOB_WORKER_IN_API", "false").lower() == "true"
+# 파이프라인 스텝 체크포인트 (agents/pipeline.py, migration 016) — 스텝 입력 내용 해시 + 출력 저장
+# 재실행(resume) 시 입력이 같은 스텝은 저장된 출력 사용 → 실패한 뒤쪽 스텝만 다시 실행 (작업 큐 재시도는 항상 resume)
+PIPELINE_CHECKPOINTS = os.getenv("PIPELINE_CHECKPOINTS", "true").lower() == "true"
+
 # PubMed / NCBI
 NCBI_API_KEY = os.getenv("NCBI_API_KEY", "")
 NCBI_EMAIL = os.getenv("NCBI_EMAIL", "bsyoo1974@gamil.com")
@@ -24,6 +24,7 @@ from api.public_report import router as public_report_router
 from api.admin import router as admin_router
 from api.vectors import router as vectors_router
 from api.chat import router as chat_router
+from api.chat_ws import router as chat_ws_router
 from api.hospital import router as hospital_router
 
 app = FastAPI(
@@ -62,9 +63,39 @@ app.include_router(public_report_router)
 app.include_router(admin_router)
 app.include_router(vectors_router)
 app.include_router(chat_router)
+app.include_router(chat_ws_router)
 app.include_router(hospital_router)
 
 
+@app.on_event("startup")
+async def startup():
+    # FAQ 벡터 인메모리 인덱스 로드 (백그라운드, 로드 전에는 RPC 폴백)
+    import asyncio
+    from agents.rag_agent import warm_faq_index
+    asyncio.create_task(warm_faq_index())
+
+    # 로컬 개발: 별도 워커 없이 파이프라인 작업을 API 프로세스에서 처리
+    from config import JOB_WORKER_IN_API
+    if JOB_WORKER_IN_API:
+        from services.job_queue import JobWorker
+        from worker import JOB_HANDLERS
+        app.state.job_worker = JobWorker(JOB_HANDLERS)
+        app.state.job_worker_task = asyncio.create_task(app.state.job_worker.run())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    # 응답 후 대기 중인 채팅 메시지/세션 쓰기 flush
+    from services.chat_persistence import chat_persistence
+    await chat_persistence.flush()
+
+    # 프로세스 내 워커: 진행 중 작업 반납
+    worker = getattr(app.state, "job_worker", None)
+    if worker:
+        worker.stop()
+        await app.state.job_worker_task
+
+
 @app.get("/")
 async def root():
     return {"service": "ARUMI API", "status": "running"}
@@ -73,3 +104,38 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/health/db-pool")
+async def health_db_pool():
+    from services.supabase_client import get_pool_stats
+    return get_pool_stats()
+
+
+@app.get("/health/rag")
+async def health_rag():
+    from agents.rag_agent import get_rag_stats
+    return get_rag_stats()
+
+
+@app.get("/health/router")
+async def health_router():
+    from agents.chat_router import get_router_stats
+    return get_router_stats()
+
+
+@app.get("/health/persistence")
+async def health_persistence():
+    from services.chat_persistence import chat_persistence
+    return chat_persistence.stats()
+
+
+@app.get("/health/jobs")
+async def health_jobs():
+    import asyncio
+    from services.job_queue import queue_stats
+    stats = {"queue": await asyncio.to_thread(queue_stats)}
+    worker = getattr(app.state, "job_worker", None)
+    if worker:
+        stats["worker"] = worker.stats()
+    return stats
@@ -115,6 +115,8 @@ class ChatStartRequest(BaseModel):
 class ChatMessageRequest(BaseModel):
     session_id: str
     content: str
+    # 재시도/중복 전송 시 같은 값을 보내면 처리 중이거나 직전에 끝난 같은 턴의 결과를 그대로 받음
+    idempotency_key: Optional[str] = None
 
 
 class ChatVoiceMessageRequest(BaseModel):
@@ -122,6 +124,8 @@ class ChatVoiceMessageRequest(BaseModel):
     audio_base64: str
     mime_type: str = "audio/webm"
     enable_tts: bool = True
+    idempotency_key: Optional[str] = None
+    voice_mode: Optional[str] = None  # "fast" | "full" — 없으면 서버 설정(CHAT_VOICE_MODE)
 
 
 class ChatEndRequest(BaseModel):
@@ -0,0 +1,251 @@
+"""
+챗봇 라우터 A/B 하네스 — split(route_message + extract_keywords_from_messages 병렬 2회 호출)
+vs combined(route_and_extract 1회 호출).
+
+1) record : chat_messages의 실제 대화를 사용자 턴 단위로 잘라 JSONL로 저장 (턴 = 해당 사용자 메시지까지의 이력)
+     라벨이 필요하면 turns.jsonl 각 줄에 "expected": {"intent", "category", "cta_level", "keywords"}를 직접 추가
+2) run    : 같은 턴을 두 방식으로 재생 (턴마다 실행 순서를 번갈아 캐시/워밍업 편향 제거)
+     지표: 라벨 정확도(있을 때) / 두 방식 일치율(intent·category·cta) / 키워드 자카드(split 기준)
+           라우팅 단계 지연 p50/p95 (split은 병렬 2회의 wall time)
+           쿼터: 턴당 요청 수, 입력/출력 토큰(추정)
+     fast-path(fast_route) 커버리지와 split 결과 대비 일치율도 함께 출력 (규칙/어휘 튜닝용, LLM 호출 없음)
+
+사용법:
+  cd backend
+  python -m scripts.ab_chat_router record --max-sessions 100
+  python -m scripts.ab_chat_router run
+  python -m scripts.ab_chat_router run --limit 200 --concurrency 4 --json ab.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+from agents.chat_agent import build_keyword_prompt, parse_keywords
+from agents.chat_router import build_route_prompt, fast_route, parse_route_result
+from agents.rag_context import estimate_tokens
+from services.gemini_client import generate_json
+from services.supabase_client import get_supabase
+
+_DEFAULT_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "router_ab", "turns.jsonl",
+)
+_ROUTER_MODEL = "gemini-2.5-flash-lite"
+_FIELDS = ("intent", "category", "cta_level")
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _jaccard(a: list[str], b: list[str]) -> float:
+    sa, sb = set(a or []), set(b or [])
+    if not sa and not sb:
+        return 1.0
+    return len(sa & sb) / len(sa | sb)
+
+
+# ============================================
+# 1) 대화 기록 → 턴
+# ============================================
+def record_turns(path: str, max_sessions: int, per_session: int):
+    print(f"\n{'=' * 50}")
+    print(f"  라우터 A/B 턴 기록 (세션 최대 {max_sessions}개)")
+    print(f"{'=' * 50}")
+    db = get_supabase()
+    sessions = (
+        db.table("chat_sessions")
+        .select("id, language")
+        .order("created_at", desc=True)
+        .limit(max_sessions)
+        .execute()
+    ).data or []
+
+    turns = []
+    for session in sessions:
+        messages = (
+            db.table("chat_messages")
+            .select("role, content")
+            .eq("session_id", session["id"])
+            .order("created_at")
+            .execute()
+        ).data or []
+        user_idx = [i for i, m in enumerate(messages) if m["role"] == "user"]
+        for n, i in enumerate(user_idx[:per_session]):
+            turns.append({
+                "tid": f"{session['id'][:8]}:{n + 1}",
+                "language": session.get("language") or "ja",
+                # 운영과 같이 해당 시점까지 최근 20개
+                "messages": [{"role": m["role"], "content": m["content"]} for m in messages[max(0, i - 19):i + 1]],
+            })
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for turn in turns:
+            f.write(json.dumps(turn, ensure_ascii=False) + "\n")
+    print(f"  {len(sessions)}세션 → {len(turns)}턴 저장 → {path}")
+    print(f"{'=' * 50}\n")
+
+
+def load_turns(path: str, limit: int = 0) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        turns = [json.loads(line) for line in f if line.strip()]
+    return turns[:limit] if limit else turns
+
+
+# ============================================
+# 2) 재생
+# ============================================
+async def _call(prompt: str) -> tuple[object, dict]:
+    """generate_json 1회 — (파싱 결과, 쿼터 사용량)"""
+    raw = await generate_json(prompt, model_name=_ROUTER_MODEL)
+    return json.loads(raw), {"requests": 1, "input_tokens": estimate_tokens(prompt), "output_tokens": estimate_tokens(raw)}
+
+
+async def _run_split(messages: list[dict], language: str) -> dict:
+    route_prompt = build_route_prompt(messages, language)
+    keyword_prompt = build_keyword_prompt(messages)
+    start = time.perf_counter()
+    (route_data, route_usage), (kw_data, kw_usage) = await asyncio.gather(_call(route_prompt), _call(keyword_prompt))
+    latency = (time.perf_counter() - start) * 1000
+    result = parse_route_result(route_data)
+    result["keywords"] = parse_keywords(kw_data)
+    usage = {k: route_usage[k] + kw_usage[k] for k in route_usage}
+    return {"result": result, "latency_ms": latency, **usage}
+
+
+async def _run_combined(messages: list[dict], language: str) -> dict:
+    prompt = build_route_prompt(messages, language, with_keywords=True)
+    start = time.perf_counter()
+    data, usage = await _call(prompt)
+    latency = (time.perf_counter() - start) * 1000
+    result = parse_route_result(data)
+    result["keywords_missing"] = "keywords" not in result
+    result.setdefault("keywords", [])
+    return {"result": result, "latency_ms": latency, **usage}
+
+
+async def _replay(turn: dict, order: int, sem: asyncio.Semaphore) -> dict | None:
+    runners = [("split", _run_split), ("combined", _run_combined)]
+    if order % 2:
+        runners.reverse()
+    out = {"tid": turn["tid"], "expected": turn.get("expected"), "fast": fast_route(turn["messages"])}
+    async with sem:
+        for name, runner in runners:
+            try:
+                out[name] = await runner(turn["messages"], turn["language"])
+            except Exception as e:
+                print(f"    -> {turn['tid']} {name} 실패: {str(e)[:80]}")
+                return None
+    return out
+
+
+def _summarize(name: str, runs: list[dict]) -> dict:
+    n = max(len(runs), 1)
+    side = [r[name] for r in runs]
+    report = {
+        "turns": len(runs),
+        "p50_ms": round(_percentile([s["latency_ms"] for s in side], 50), 1),
+        "p95_ms": round(_percentile([s["latency_ms"] for s in side], 95), 1),
+        "requests_per_turn": round(sum(s["requests"] for s in side) / n, 2),
+        "input_tokens_per_turn": round(sum(s["input_tokens"] for s in side) / n, 1),
+        "output_tokens_per_turn": round(sum(s["output_tokens"] for s in side) / n, 1),
+    }
+    labeled = [r for r in runs if r.get("expected")]
+    for field in _FIELDS:
+        hits = [r[name]["result"][field] == r["expected"][field] for r in labeled if field in r["expected"]]
+        report[f"{field}_acc"] = round(sum(hits) / len(hits), 3) if hits else None
+    kw = [_jaccard(r[name]["result"]["keywords"], r["expected"]["keywords"]) for r in labeled if "keywords" in r["expected"]]
+    report["keywords_jaccard"] = round(sum(kw) / len(kw), 3) if kw else None
+    return report
+
+
+async def run_ab(path: str, limit: int, concurrency: int) -> dict:
+    turns = load_turns(path, limit)
+    sem = asyncio.Semaphore(concurrency)
+
+    print(f"\n{'=' * 72}")
+    print(f"  라우터 A/B: {len(turns)}턴, 동시성 {concurrency}, 모델 {_ROUTER_MODEL}")
+    print(f"{'=' * 72}")
+    start = time.time()
+    runs = [r for r in await asyncio.gather(*[_replay(t, i, sem) for i, t in enumerate(turns)]) if r]
+    print(f"  재생 완료: {len(runs)}/{len(turns)}턴 ({time.time() - start:.1f}s)")
+
+    n = max(len(runs), 1)
+    agreement = {
+        field: round(sum(r["split"]["result"][field] == r["combined"]["result"][field] for r in runs) / n, 3)
+        for field in _FIELDS
+    }
+    # 키워드는 RAG 검색 단계에서만 쓰이므로 consultation/medical로 라우팅된 턴만 비교
+    rag_turns = [r for r in runs if r["split"]["result"]["intent"] in ("consultation", "medical")]
+    agreement["keywords_jaccard"] = round(
+        sum(_jaccard(r["split"]["result"]["keywords"], r["combined"]["result"]["keywords"]) for r in rag_turns)
+        / max(len(rag_turns), 1), 3,
+    )
+    agreement["combined_keywords_missing"] = sum(r["combined"]["result"]["keywords_missing"] for r in runs)
+
+    fast_runs = [r for r in runs if r["fast"]]
+    fast = {
+        "coverage": round(len(fast_runs) / n, 3),
+        **{f"{field}_agree": round(sum(r["fast"][field] == r["split"]["result"][field] for r in fast_runs)
+                                   / max(len(fast_runs), 1), 3) for field in _FIELDS},
+    }
+
+    report = {
+        "turns": len(runs),
+        "labeled": sum(1 for r in runs if r.get("expected")),
+        "fast_path": fast,
+        "split": _summarize("split", runs),
+        "combined": _summarize("combined", runs),
+        "agreement": agreement,
+    }
+
+    print(f"\n  {'mode':<10}{'p50 ms':>9}{'p95 ms':>9}{'req/turn':>10}{'in tok':>9}{'out tok':>9}"
+          f"{'intent':>9}{'category':>10}{'cta':>7}{'kw J':>7}")
+    for name in ("split", "combined"):
+        r = report[name]
+        acc = [r[f"{f}_acc"] for f in _FIELDS] + [r["keywords_jaccard"]]
+        acc_text = "".join(f"{'-' if v is None else f'{v:.3f}':>{w}}" for v, w in zip(acc, (9, 10, 7, 7)))
+        print(f"  {name:<10}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['requests_per_turn']:>10.2f}"
+              f"{r['input_tokens_per_turn']:>9.1f}{r['output_tokens_per_turn']:>9.1f}{acc_text}")
+    print(f"\n  라벨 {report['labeled']}턴 (정확도 열은 라벨이 있을 때만)")
+    print(f"  split ↔ combined 일치율: intent {agreement['intent']:.3f}, category {agreement['category']:.3f}, "
+          f"cta {agreement['cta_level']:.3f}, 키워드 자카드 {agreement['keywords_jaccard']:.3f} "
+          f"(RAG 턴 {len(rag_turns)}개), combined 키워드 누락 {agreement['combined_keywords_missing']}건")
+    print(f"  fast-path 커버리지 {fast['coverage']:.3f} — split 대비 intent {fast['intent_agree']:.3f}, "
+          f"category {fast['category_agree']:.3f}, cta {fast['cta_level_agree']:.3f}")
+    print(f"{'=' * 72}\n")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="챗봇 라우터 split vs combined A/B")
+    parser.add_argument("--file", type=str, default=_DEFAULT_FILE, help="턴 JSONL 경로")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="chat_messages → 턴 JSONL")
+    rec.add_argument("--max-sessions", type=int, default=100)
+    rec.add_argument("--per-session", type=int, default=10, help="세션당 최대 사용자 턴 수")
+
+    run = sub.add_parser("run", help="두 방식 재생 + 비교")
+    run.add_argument("--limit", type=int, default=0, help="재생할 턴 수 (0 = 전체)")
+    run.add_argument("--concurrency", type=int, default=4)
+    run.add_argument("--json", type=str, default="", help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record_turns(args.file, args.max_sessions, args.per_session)
+    else:
+        report = asyncio.run(run_ab(args.file, args.limit, args.concurrency))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"결과 저장: {args.json}")
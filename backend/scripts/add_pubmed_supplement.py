@@ -18,6 +18,7 @@ from google.genai import types
 
 from config import GEMINI_API_KEY, NCBI_API_KEY, NCBI_EMAIL, NCBI_TOOL
 from services.supabase_client import get_supabase
+from services.gemini_client import embedding_columns
 
 
 def _safe_print(msg: str):
@@ -378,7 +379,7 @@ def main():
                 "youtube_video_id": pmid,
                 "youtube_title": article["title"][:200],
                 "youtube_url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
-                "embedding": embeddings[j].values,
+                **embedding_columns(embeddings[j].values),
             })
 
         try:
@@ -0,0 +1,143 @@
+"""
+FAQ ANN 인덱스 recall@k / 지연시간 벤치마크.
+
+최신 ANN 스냅샷을 mmap으로 열고, nprobe 값별로 IVF 검색 결과를
+같은 스냅샷에 대한 전수(exact) 코사인 검색과 비교한다.
+이어서 스캔용 양자화(none / float16 / int8)별 메모리, recall@k(재채점 전/후), 지연시간을 비교한다.
+쿼리는 --queries 파일(한 줄에 하나, Gemini 쿼리 임베딩) 또는
+코퍼스 벡터에 노이즈를 섞은 합성 쿼리를 사용한다.
+
+사용법:
+  cd backend
+  python -m scripts.bench_faq_ann                             # 합성 쿼리 200개, k=8
+  python -m scripts.bench_faq_ann --queries queries.txt --k 8
+  python -m scripts.bench_faq_ann --nprobe 1,4,8,12,16,32
+  python -m scripts.bench_faq_ann --quant-nprobe 12 --rerank 4
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+from config import FAQ_ANN_DIR, FAQ_ANN_NPROBE, FAQ_ANN_RERANK
+from services.faq_ann import QUANTIZATION_MODES, IvfSegment, load_snapshot, quantize
+
+
+def _synthetic_queries(vectors: np.ndarray, count: int, noise: float, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    base = np.asarray(vectors[rng.choice(len(vectors), min(count, len(vectors)), replace=False)])
+    queries = base + rng.normal(0, noise, base.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+async def _embed_queries(path: str) -> np.ndarray:
+    from services.gemini_client import get_query_embedding
+
+    with open(path, encoding="utf-8") as f:
+        texts = [line.strip() for line in f if line.strip()]
+    embeddings = await asyncio.gather(*[get_query_embedding(t) for t in texts])
+    queries = np.asarray(embeddings, dtype=np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def _exact_topk(vectors: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = vectors @ query
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _bench_quantization(seg: IvfSegment, queries: np.ndarray, exact_ids: list[set], k: int, nprobe: int, rerank: int):
+    """같은 IVF 레이아웃에서 스캔용 codes만 바꿔 비교 (기준: float32 전수 검색 결과)"""
+    vectors = np.ascontiguousarray(seg.vectors, dtype=np.float32)
+    total = sum(len(t) for t in exact_ids)
+
+    print(f"\n  양자화 비교 (nprobe={nprobe}, rerank={rerank})")
+    print(f"  {'quant':<10}{'scan MB':>10}{'B/vec':>8}{'recall':>10}{'+rerank':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for mode in QUANTIZATION_MODES:
+        codes, scales = quantize(vectors, mode)
+        variant = IvfSegment(vectors, seg.centroids, seg.offsets, seg.meta, codes, scales)
+        scan_bytes = (codes.nbytes + (scales.nbytes if scales is not None else 0)) if codes is not None else vectors.nbytes
+
+        raw_hits = 0
+        hits = 0
+        latencies = []
+        for q, truth in zip(queries, exact_ids):
+            rows, _ = variant.search(q, k, nprobe, rerank=0)
+            raw_hits += len(truth & set(rows.tolist()))
+            start = time.perf_counter()
+            rows, _ = variant.search(q, k, nprobe, rerank=rerank)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len(truth & set(rows.tolist()))
+        print(f"  {mode:<10}{scan_bytes / 1e6:>10.2f}{scan_bytes / max(len(vectors), 1):>8.0f}"
+              f"{raw_hits / total:>10.3f}{hits / total:>10.3f}"
+              f"{np.percentile(latencies, 50):>10.3f}{np.percentile(latencies, 95):>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FAQ ANN recall/latency 벤치마크")
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--queries", type=str, default="", help="쿼리 텍스트 파일 (없으면 합성 쿼리)")
+    parser.add_argument("--count", type=int, default=200, help="합성 쿼리 수 (카테고리별)")
+    parser.add_argument("--noise", type=float, default=0.03, help="합성 쿼리 노이즈 표준편차")
+    parser.add_argument("--nprobe", type=str, default="1,2,4,8,12,16,32")
+    parser.add_argument("--quant-nprobe", type=int, default=FAQ_ANN_NPROBE, help="양자화 비교 시 nprobe")
+    parser.add_argument("--rerank", type=int, default=FAQ_ANN_RERANK, help="양자화 재채점 배수")
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    snapshot = load_snapshot(FAQ_ANN_DIR)
+    if snapshot is None:
+        print(f"스냅샷 없음: {FAQ_ANN_DIR} — scripts.build_faq_ann_index를 먼저 실행하세요.")
+        return
+    segments, manifest = snapshot
+    print(f"\n스냅샷 {manifest['version']} mmap 로드: {(time.perf_counter() - t) * 1000:.1f}ms")
+
+    text_queries = asyncio.run(_embed_queries(args.queries)) if args.queries else None
+    nprobes = [int(x) for x in args.nprobe.split(",")]
+
+    for category, seg in segments.items():
+        vectors = np.asarray(seg.vectors)
+        queries = text_queries if text_queries is not None else _synthetic_queries(vectors, args.count, args.noise)
+
+        print(f"\n{'=' * 64}")
+        print(f"  [{category}] {len(seg)}행, nlist={seg.nlist}, 쿼리 {len(queries)}개, k={args.k}")
+        print(f"{'=' * 64}")
+        print(f"  {'mode':<14}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}{'scanned':>10}")
+
+        exact_ids = []
+        latencies = []
+        for q in queries:
+            start = time.perf_counter()
+            exact_ids.append(set(_exact_topk(vectors, q, args.k).tolist()))
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"  {'exact':<14}{1.0:>10.3f}{np.percentile(latencies, 50):>10.3f}"
+              f"{np.percentile(latencies, 95):>10.3f}{1.0:>10.2f}")
+
+        sizes = np.diff(seg.offsets)
+        for nprobe in nprobes:
+            if nprobe > seg.nlist:
+                continue
+            hits = 0
+            latencies = []
+            scanned = []
+            for q, truth in zip(queries, exact_ids):
+                start = time.perf_counter()
+                rows, _ = seg.search(q, args.k, nprobe)
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits += len(truth & set(rows.tolist()))
+                probe = np.argpartition(-(seg.centroids @ q), nprobe - 1)[:nprobe]
+                scanned.append(sizes[probe].sum() / len(seg))
+            recall = hits / sum(len(t) for t in exact_ids)
+            print(f"  {'nprobe=' + str(nprobe):<14}{recall:>10.3f}{np.percentile(latencies, 50):>10.3f}"
+                  f"{np.percentile(latencies, 95):>10.3f}{np.mean(scanned):>10.2f}")
+
+        _bench_quantization(seg, queries, exact_ids, args.k, args.quant_nprobe, args.rerank)
+
+
+if __name__ == "__main__":
+    main()
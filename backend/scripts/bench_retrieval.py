@@ -0,0 +1,329 @@
+"""
+RAG 검색 오프라인 벤치마크 / 평가 하네스.
+
+1) snapshot : faq_vectors(EMBEDDING_DIM 컬럼)를 로컬 파일로 저장 — 이후 평가는 DB 없이 재현 가능
+2) queries  : 실제 운영 데이터로 라벨된 쿼리셋 생성 (쿼리 임베딩까지 저장 → 재생 시 API 호출 없음)
+     - chat         : assistant 메시지의 rag_references(faq_id) = 정답, 직전 사용자 메시지 = latest_message,
+                      키워드는 그 시점까지의 대화로 extract_keywords_from_messages 재실행 (--no-llm이면 세션 intent 키워드)
+     - consultation : intent_extraction.keywords로 검색, mentioned_procedures와 시술명이 일치하는 FAQ = 정답
+   정답은 운영 결과/시술명 기반의 silver 라벨이므로 필요하면 queries.jsonl의 relevant_ids를 직접 수정해 사용.
+3) run      : 스냅샷으로 인메모리 인덱스를 만들고 search_relevant_faq와 같은 병합 로직(retrieve_faq)으로
+              threshold × match_count × mode 조합을 재생
+     mode: dual(포커스+컨텍스트 벡터) / focus / context / hybrid(dual + BM25 RRF)
+     지표: recall@k, MRR, 결과 수, 검색 지연 p50/p95(임베딩 API 제외), 참고자료 컨텍스트 토큰(추정)
+
+사용법:
+  cd backend
+  python -m scripts.bench_retrieval snapshot
+  python -m scripts.bench_retrieval queries --max-sessions 200 --max-consultations 200
+  python -m scripts.bench_retrieval run
+  python -m scripts.bench_retrieval run --thresholds 0.55,0.65 --counts 5,8 --modes dual,hybrid --json bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+
+import numpy as np
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+from config import EMBEDDING_DIM
+from agents.rag_agent import FaqVectorIndex, fetch_faq_rows, parse_embedding, retrieve_faq
+from agents.rag_context import estimate_tokens, format_rag_context
+from services.gemini_client import get_query_embedding
+from services.supabase_client import get_supabase
+
+_DEFAULT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "retrieval_bench")
+_MODES = ("dual", "focus", "context", "hybrid")
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", "", unicodedata.normalize("NFKC", text or "")).lower()
+
+
+# ============================================
+# 1) 스냅샷
+# ============================================
+def save_faq_snapshot(out_dir: str):
+    print(f"\n{'=' * 50}")
+    print(f"  faq_vectors 스냅샷 (dim={EMBEDDING_DIM})")
+    print(f"{'=' * 50}")
+    start = time.time()
+    rows = fetch_faq_rows()
+    vectors = []
+    meta = []
+    for row in rows:
+        vec = parse_embedding(row.pop("embedding", None))
+        if vec is None or not np.any(vec):
+            continue
+        row.pop("created_at", None)
+        vectors.append(vec)
+        meta.append(row)
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "faq_snapshot.npy"), np.vstack(vectors).astype(np.float32))
+    with open(os.path.join(out_dir, "faq_snapshot.meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"dim": EMBEDDING_DIM, "saved_at": time.time(), "rows": meta}, f, ensure_ascii=False)
+    print(f"  {len(meta)}행 저장 → {out_dir} ({time.time() - start:.1f}s)")
+    print(f"{'=' * 50}\n")
+
+
+def load_faq_snapshot(out_dir: str) -> tuple[list[dict], int]:
+    """(임베딩 포함 행 목록, dim) — FaqVectorIndex.load_rows 입력 형식"""
+    vectors = np.load(os.path.join(out_dir, "faq_snapshot.npy"))
+    with open(os.path.join(out_dir, "faq_snapshot.meta.json"), encoding="utf-8") as f:
+        snap = json.load(f)
+    rows = [{**meta, "embedding": vec} for meta, vec in zip(snap["rows"], vectors)]
+    return rows, snap["dim"]
+
+
+# ============================================
+# 2) 라벨 쿼리셋
+# ============================================
+async def _chat_queries(max_sessions: int, per_session: int, use_llm: bool) -> list[dict]:
+    from agents.chat_agent import extract_keywords_from_messages
+
+    db = get_supabase()
+    sessions = (
+        db.table("chat_sessions")
+        .select("id, language, classification, intent_extraction")
+        .in_("classification", ["dermatology", "plastic_surgery"])
+        .order("created_at", desc=True)
+        .limit(max_sessions)
+        .execute()
+    ).data or []
+
+    queries = []
+    for session in sessions:
+        messages = (
+            db.table("chat_messages")
+            .select("role, content, rag_references")
+            .eq("session_id", session["id"])
+            .order("created_at")
+            .execute()
+        ).data or []
+
+        taken = 0
+        for i, msg in enumerate(messages):
+            refs = msg.get("rag_references") or []
+            if msg["role"] != "assistant" or not refs or taken >= per_session:
+                continue
+            history = messages[:i]
+            latest = next((m["content"] for m in reversed(history) if m["role"] == "user"), "")
+            if not latest:
+                continue
+            if use_llm:
+                keywords = await extract_keywords_from_messages(history, session.get("language") or "ja")
+            else:
+                keywords = (session.get("intent_extraction") or {}).get("keywords", [])
+            queries.append({
+                "qid": f"chat:{session['id'][:8]}:{i}",
+                "source": "chat",
+                "category": session["classification"],
+                "keywords": keywords,
+                "latest_message": latest,
+                "relevant_ids": [r["faq_id"] for r in refs if r.get("faq_id")],
+            })
+            taken += 1
+    return queries
+
+
+def _consultation_queries(max_consultations: int, snapshot_rows: list[dict]) -> list[dict]:
+    db = get_supabase()
+    consultations = (
+        db.table("consultations")
+        .select("id, classification, intent_extraction")
+        .in_("classification", ["dermatology", "plastic_surgery"])
+        .not_.is_("intent_extraction", "null")
+        .order("created_at", desc=True)
+        .limit(max_consultations)
+        .execute()
+    ).data or []
+
+    by_category: dict[str, list[tuple[str, str]]] = {}
+    for row in snapshot_rows:
+        by_category.setdefault(row["category"], []).append((row["id"], _normalize(row.get("procedure_name"))))
+
+    queries = []
+    for c in consultations:
+        intent = c.get("intent_extraction") or {}
+        keywords = intent.get("keywords") or []
+        procedures = [_normalize(p) for p in intent.get("mentioned_procedures") or [] if p]
+        if not keywords or not procedures:
+            continue
+        relevant = [
+            faq_id for faq_id, proc in by_category.get(c["classification"], [])
+            if proc and any(p in proc or proc in p for p in procedures)
+        ][:20]
+        if not relevant:
+            continue
+        queries.append({
+            "qid": f"consultation:{c['id'][:8]}",
+            "source": "consultation",
+            "category": c["classification"],
+            "keywords": keywords,
+            "latest_message": None,
+            "relevant_ids": relevant,
+        })
+    return queries
+
+
+async def build_queries(out_dir: str, max_sessions: int, per_session: int, max_consultations: int, use_llm: bool):
+    print(f"\n{'=' * 50}")
+    print("  라벨 쿼리셋 생성")
+    print(f"{'=' * 50}")
+    snapshot_rows, dim = load_faq_snapshot(out_dir)
+    queries = await _chat_queries(max_sessions, per_session, use_llm)
+    print(f"  chat: {len(queries)}건")
+    consultation = _consultation_queries(max_consultations, snapshot_rows)
+    print(f"  consultation: {len(consultation)}건")
+    queries += consultation
+
+    # 쿼리 임베딩 저장 — run 단계는 API 호출 없이 재생
+    sem = asyncio.Semaphore(8)
+
+    async def _embed(text: str | None):
+        if not text or not text.strip():
+            return None
+        async with sem:
+            return await get_query_embedding(text, dims=dim)
+
+    for q in queries:
+        q["focus_embedding"], q["context_embedding"] = await asyncio.gather(
+            _embed(q["latest_message"]), _embed(" ".join(q["keywords"])),
+        )
+
+    path = os.path.join(out_dir, "queries.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for q in queries:
+            f.write(json.dumps(q, ensure_ascii=False) + "\n")
+    print(f"  저장: {path} ({len(queries)}건)")
+    print(f"{'=' * 50}\n")
+
+
+# ============================================
+# 3) 재생 / 평가
+# ============================================
+async def _run_config(index, queries, threshold: float, count: int, mode: str) -> dict:
+    recalls = []
+    reciprocal_ranks = []
+    latencies = []
+    result_counts = []
+    tokens = []
+    for q in queries:
+        focus = q["focus_embedding"] if mode in ("dual", "focus", "hybrid") else None
+        context = q["context_embedding"] if mode in ("dual", "context", "hybrid") else None
+        if focus is None and context is None:
+            continue
+        lexical = f"{q['latest_message'] or ''} {' '.join(q['keywords'])}"
+
+        start = time.perf_counter()
+        results = await retrieve_faq(
+            focus, context, q["category"], threshold, count,
+            lexical_text=lexical, index=index, hybrid=mode == "hybrid",
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        relevant = set(q["relevant_ids"])
+        ranked = [faq["id"] for faq in results]
+        recalls.append(len(relevant & set(ranked)) / len(relevant))
+        first = next((i for i, faq_id in enumerate(ranked, 1) if faq_id in relevant), None)
+        reciprocal_ranks.append(1.0 / first if first else 0.0)
+        result_counts.append(len(results))
+        tokens.append(estimate_tokens(format_rag_context(results)))
+
+    n = max(len(recalls), 1)
+    return {
+        "threshold": threshold,
+        "match_count": count,
+        "mode": mode,
+        "queries": len(recalls),
+        "recall_at_k": round(sum(recalls) / n, 4),
+        "mrr": round(sum(reciprocal_ranks) / n, 4),
+        "avg_results": round(sum(result_counts) / n, 2),
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "avg_context_tokens": round(sum(tokens) / n, 1),
+    }
+
+
+async def run_benchmark(out_dir: str, thresholds: list[float], counts: list[int], modes: list[str], source: str) -> list[dict]:
+    rows, dim = load_faq_snapshot(out_dir)
+    with open(os.path.join(out_dir, "queries.jsonl"), encoding="utf-8") as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+    queries = [q for q in queries if q["relevant_ids"] and (source == "all" or q["source"] == source)]
+
+    index = FaqVectorIndex()
+    await index.load_rows(rows)
+
+    print(f"\n{'=' * 96}")
+    print(f"  검색 벤치마크: 스냅샷 {len(rows)}행 (dim={dim}), 쿼리 {len(queries)}건 ({source})")
+    print(f"{'=' * 96}")
+    print(f"  {'mode':<9}{'thr':>6}{'k':>4}{'n':>6}{'recall@k':>10}{'MRR':>8}{'results':>9}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'ctx tokens':>12}")
+
+    reports = []
+    for mode in modes:
+        for threshold in thresholds:
+            for count in counts:
+                r = await _run_config(index, queries, threshold, count, mode)
+                reports.append(r)
+                print(f"  {mode:<9}{threshold:>6.2f}{count:>4}{r['queries']:>6}{r['recall_at_k']:>10.3f}"
+                      f"{r['mrr']:>8.3f}{r['avg_results']:>9.2f}{r['p50_ms']:>9.3f}{r['p95_ms']:>9.3f}"
+                      f"{r['avg_context_tokens']:>12.1f}")
+    print()
+    return reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RAG 검색 오프라인 벤치마크")
+    parser.add_argument("--dir", type=str, default=_DEFAULT_DIR, help="스냅샷/쿼리셋 디렉터리")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("snapshot", help="faq_vectors 로컬 스냅샷 저장")
+
+    q = sub.add_parser("queries", help="라벨 쿼리셋 생성")
+    q.add_argument("--max-sessions", type=int, default=200)
+    q.add_argument("--per-session", type=int, default=3, help="세션당 최대 쿼리 수")
+    q.add_argument("--max-consultations", type=int, default=200)
+    q.add_argument("--no-llm", action="store_true", help="키워드 재추출 없이 세션 intent 키워드 사용")
+
+    r = sub.add_parser("run", help="스냅샷 + 쿼리셋 재생")
+    r.add_argument("--thresholds", type=str, default="0.55,0.65")
+    r.add_argument("--counts", type=str, default="5,8")
+    r.add_argument("--modes", type=str, default=",".join(_MODES))
+    r.add_argument("--source", choices=("all", "chat", "consultation"), default="all")
+    r.add_argument("--json", type=str, default="", help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        save_faq_snapshot(args.dir)
+    elif args.command == "queries":
+        asyncio.run(build_queries(
+            args.dir, args.max_sessions, args.per_session, args.max_consultations, not args.no_llm,
+        ))
+    else:
+        reports = asyncio.run(run_benchmark(
+            args.dir,
+            [float(x) for x in args.thresholds.split(",")],
+            [int(x) for x in args.counts.split(",")],
+            [m for m in args.modes.split(",") if m in _MODES],
+            args.source,
+        ))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(reports, f, ensure_ascii=False, indent=2)
+            print(f"결과 저장: {args.json}")
@@ -0,0 +1,130 @@
+"""
+Supabase HTTP 커넥션 풀 벤치마크.
+
+동시 채팅 세션 N개가 한 턴마다 수행하는 DB 읽기 패턴
+(세션 확인 → 최근 메시지 로드 → 동의 상태 확인)을 asyncio.to_thread로 재현하여
+라이브러리 기본 클라이언트와 튜닝된 공유 풀(HTTP/2, keep-alive, 커넥션 제한)을 비교한다.
+쓰기 없이 기존 세션을 읽기만 하므로 운영 DB에서도 실행 가능.
+
+사용법:
+  cd backend
+  python -m scripts.bench_supabase_pool                      # 50세션 × 5턴
+  python -m scripts.bench_supabase_pool --sessions 50 --turns 10
+  python -m scripts.bench_supabase_pool --json bench_pool.json
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+from services.supabase_client import create_supabase_client, get_pool_stats
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def _chat_turn_reads(db, session_id: str):
+    """send_message 한 턴에서 발생하는 읽기 쿼리 3개"""
+    db.table("chat_sessions").select("id, language, status").eq("id", session_id).limit(1).execute()
+    db.table("chat_messages").select("role, content").eq("session_id", session_id).order(
+        "created_at", desc=True
+    ).limit(20).execute()
+    db.table("chat_sessions").select("pending_email, email_consent_status").eq("id", session_id).limit(1).execute()
+
+
+async def _run(db, session_ids: list[str], sessions: int, turns: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+
+    async def _visitor(idx: int):
+        nonlocal errors
+        sid = session_ids[idx % len(session_ids)]
+        for _ in range(turns):
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(_chat_turn_reads, db, sid)
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                errors += 1
+                print(f"  [ERROR] {str(e)[:100]}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*[_visitor(i) for i in range(sessions)])
+    elapsed = time.perf_counter() - start
+
+    requests = len(latencies) * 3
+    return {
+        "turns": len(latencies),
+        "requests": requests,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 2),
+        "requests_per_s": round(requests / elapsed, 1) if elapsed else 0,
+        "turn_p50_ms": round(_percentile(latencies, 50), 1),
+        "turn_p95_ms": round(_percentile(latencies, 95), 1),
+        "turn_mean_ms": round(statistics.mean(latencies), 1) if latencies else 0,
+    }
+
+
+def _print_result(label: str, result: dict):
+    print(f"\n  [{label}]")
+    for key, value in result.items():
+        print(f"    {key}: {value}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Supabase 커넥션 풀 벤치마크")
+    parser.add_argument("--sessions", type=int, default=50, help="동시 채팅 세션 수")
+    parser.add_argument("--turns", type=int, default=5, help="세션당 턴 수")
+    parser.add_argument("--json", type=str, default="", help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    # 스레드 풀이 동시 세션 수보다 작으면 풀이 아닌 스레드가 병목이 되므로 맞춰줌
+    from concurrent.futures import ThreadPoolExecutor
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.sessions))
+
+    baseline_db = create_supabase_client(tuned=False)
+    tuned_db = create_supabase_client(tuned=True)
+
+    rows = baseline_db.table("chat_sessions").select("id").order("created_at", desc=True).limit(args.sessions).execute()
+    session_ids = [r["id"] for r in (rows.data or [])]
+    if not session_ids:
+        print("chat_sessions가 비어 있습니다. 세션을 먼저 생성하세요.")
+        return
+
+    print(f"\n{'=' * 50}")
+    print(f"  Supabase 풀 벤치마크: {args.sessions}세션 × {args.turns}턴")
+    print(f"{'=' * 50}")
+
+    # 워밍업 (TLS 핸드셰이크 제외)
+    await asyncio.to_thread(_chat_turn_reads, baseline_db, session_ids[0])
+    await asyncio.to_thread(_chat_turn_reads, tuned_db, session_ids[0])
+
+    before = await _run(baseline_db, session_ids, args.sessions, args.turns)
+    _print_result("기본 클라이언트 (before)", before)
+
+    after = await _run(tuned_db, session_ids, args.sessions, args.turns)
+    after["pool"] = get_pool_stats()
+    _print_result("튜닝된 공유 풀 (after)", after)
+
+    if before["requests_per_s"]:
+        gain = (after["requests_per_s"] / before["requests_per_s"] - 1) * 100
+        print(f"\n  처리량 변화: {gain:+.1f}%")
+    print(f"{'=' * 50}\n")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"before": before, "after": after, "sessions": args.sessions, "turns": args.turns}, f, indent=2)
+        print(f"결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,220 @@
+"""
+음성 모드 벤치마크 — fast(voice_chat_agent.run_voice_chat, LLM 1회) vs full(run_multi_agent_chat).
+
+/api/chat/voice-message와 같은 순서로 STT → 응답 생성을 실행하고 구간별 지연을 기록한다.
+  - 입력: --audio-dir의 녹음 파일(.webm/.mp3/.wav/.m4a/.ogg), 없으면 발화 문장을 TTS로 합성해 사용
+          (합성 결과는 data/voice_bench/에 캐시)
+  - 클립마다 두 모드를 번갈아 먼저 실행 (워밍업/캐시 편향 제거), STT도 모드마다 다시 수행
+  - 세션 없이 실행 (DB 쓰기/이메일 동의 흐름 없음)
+  - 지표: STT / 응답 / 전체(STT→응답) p50·p95, 응답 길이, 참고자료 수
+
+사용법:
+  cd backend
+  python -m scripts.bench_voice_modes                         # 기본 일본어 발화 10개 × 1회
+  python -m scripts.bench_voice_modes --repeat 3 --language ko --phrases phrases_ko.txt
+  python -m scripts.bench_voice_modes --audio-dir recordings/ --json bench_voice.json
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+from agents.chat_agent import get_greeting
+from agents.chat_router import run_multi_agent_chat
+from agents.voice_chat_agent import run_voice_chat
+from services.gemini_client import speech_to_text, text_to_speech
+
+_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "voice_bench")
+_MIME_TYPES = {
+    ".webm": "audio/webm",
+    ".mp3": "audio/mp3",
+    ".wav": "audio/wav",
+    ".m4a": "audio/mp4",
+    ".ogg": "audio/ogg",
+}
+_DEFAULT_PHRASES = {
+    "ja": [
+        "二重整形のダウンタイムはどれくらいですか？",
+        "鼻の整形をしたいのですが、腫れはいつまで続きますか？",
+        "ボトックスの効果はどのくらい持ちますか？",
+        "ヒアルロン酸注射の副作用が心配です。",
+        "シミ取りレーザーは何回くらい必要ですか？",
+        "脂肪吸引のあと、仕事はいつから復帰できますか？",
+        "肌のたるみが気になるんですが、どんな施術がありますか？",
+        "韓国で手術を受ける場合、何日くらい滞在が必要ですか？",
+        "ニキビ跡をきれいにしたいです。",
+        "費用はだいたいどれくらいかかりますか？",
+    ],
+    "ko": [
+        "쌍꺼풀 수술 다운타임은 얼마나 되나요?",
+        "코 성형 후 붓기는 언제까지 가나요?",
+        "보톡스 효과는 얼마나 지속되나요?",
+        "필러 부작용이 걱정돼요.",
+        "기미 레이저는 몇 번 정도 받아야 하나요?",
+    ],
+}
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+# ============================================
+# 입력 클립
+# ============================================
+def load_audio_dir(path: str) -> list[dict]:
+    import base64
+
+    clips = []
+    for name in sorted(os.listdir(path)):
+        ext = os.path.splitext(name)[1].lower()
+        if ext not in _MIME_TYPES:
+            continue
+        with open(os.path.join(path, name), "rb") as f:
+            clips.append({
+                "name": name,
+                "audio_base64": base64.b64encode(f.read()).decode(),
+                "mime_type": _MIME_TYPES[ext],
+                "text": None,
+            })
+    return clips
+
+
+async def synthesize_clips(phrases: list[str], language: str) -> list[dict]:
+    """발화 문장 → TTS mp3 (캐시 재사용)"""
+    os.makedirs(_CACHE_DIR, exist_ok=True)
+    clips = []
+    for phrase in phrases:
+        digest = hashlib.sha1(f"{language}:{phrase}".encode()).hexdigest()[:12]
+        cache_path = os.path.join(_CACHE_DIR, f"{language}_{digest}.b64")
+        if os.path.exists(cache_path):
+            with open(cache_path, encoding="utf-8") as f:
+                audio = f.read()
+        else:
+            audio = await text_to_speech(phrase, language)
+            if not audio:
+                print(f"    -> TTS 실패, 건너뜀: {phrase}")
+                continue
+            with open(cache_path, "w", encoding="utf-8") as f:
+                f.write(audio)
+        clips.append({"name": phrase[:20], "audio_base64": audio, "mime_type": "audio/mp3", "text": phrase})
+    return clips
+
+
+# ============================================
+# 측정
+# ============================================
+async def _run_mode(mode: str, clip: dict, language: str) -> dict:
+    start = time.perf_counter()
+    transcribed = await speech_to_text(clip["audio_base64"], clip["mime_type"], language)
+    stt_ms = (time.perf_counter() - start) * 1000
+
+    messages = [
+        {"role": "assistant", "content": get_greeting(language)},
+        {"role": "user", "content": transcribed or ""},
+    ]
+    start = time.perf_counter()
+    if mode == "fast":
+        result = await run_voice_chat(messages, language)
+    else:
+        result = await run_multi_agent_chat(messages, language)
+    response_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        "stt_ms": stt_ms,
+        "response_ms": response_ms,
+        "total_ms": stt_ms + response_ms,
+        "transcribed": transcribed,
+        "response_chars": len(result["response"]),
+        "refs": len(result["rag_references"]),
+        "agent_type": result["agent_type"],
+    }
+
+
+def _summarize(runs: list[dict]) -> dict:
+    n = max(len(runs), 1)
+    report = {"runs": len(runs)}
+    for field in ("stt_ms", "response_ms", "total_ms"):
+        values = [r[field] for r in runs]
+        report[f"{field[:-3]}_p50_ms"] = round(_percentile(values, 50), 1)
+        report[f"{field[:-3]}_p95_ms"] = round(_percentile(values, 95), 1)
+    report["response_chars_avg"] = round(sum(r["response_chars"] for r in runs) / n, 1)
+    report["refs_avg"] = round(sum(r["refs"] for r in runs) / n, 2)
+    return report
+
+
+async def run_bench(clips: list[dict], language: str, repeat: int) -> dict:
+    print(f"\n{'=' * 72}")
+    print(f"  음성 모드 벤치마크: {len(clips)}클립 × {repeat}회, 언어 {language}")
+    print(f"{'=' * 72}")
+
+    runs: dict[str, list[dict]] = {"fast": [], "full": []}
+    order = 0
+    for _ in range(repeat):
+        for clip in clips:
+            modes = ["fast", "full"] if order % 2 == 0 else ["full", "fast"]
+            order += 1
+            for mode in modes:
+                try:
+                    r = await _run_mode(mode, clip, language)
+                except Exception as e:
+                    print(f"    -> {clip['name']} {mode} 실패: {str(e)[:80]}")
+                    continue
+                runs[mode].append(r)
+                print(f"  [{mode:<4}] {clip['name']:<22} stt {r['stt_ms']:>7.0f}ms  "
+                      f"응답 {r['response_ms']:>7.0f}ms  ({r['agent_type']}, refs {r['refs']})")
+
+    report = {mode: _summarize(mode_runs) for mode, mode_runs in runs.items()}
+    print(f"\n  {'mode':<6}{'runs':>6}{'stt p50':>10}{'stt p95':>10}{'resp p50':>10}{'resp p95':>10}"
+          f"{'total p50':>11}{'total p95':>11}{'chars':>8}{'refs':>6}")
+    for mode, r in report.items():
+        print(f"  {mode:<6}{r['runs']:>6}{r['stt_p50_ms']:>10.0f}{r['stt_p95_ms']:>10.0f}"
+              f"{r['response_p50_ms']:>10.0f}{r['response_p95_ms']:>10.0f}"
+              f"{r['total_p50_ms']:>11.0f}{r['total_p95_ms']:>11.0f}"
+              f"{r['response_chars_avg']:>8.0f}{r['refs_avg']:>6.1f}")
+    print(f"{'=' * 72}\n")
+    return report
+
+
+async def main(args):
+    if args.audio_dir:
+        clips = load_audio_dir(args.audio_dir)
+    else:
+        if args.phrases:
+            with open(args.phrases, encoding="utf-8") as f:
+                phrases = [line.strip() for line in f if line.strip()]
+        else:
+            phrases = _DEFAULT_PHRASES.get(args.language, _DEFAULT_PHRASES["ja"])
+        clips = await synthesize_clips(phrases, args.language)
+    if args.limit:
+        clips = clips[:args.limit]
+    if not clips:
+        print("입력 클립이 없습니다.")
+        return None
+    return await run_bench(clips, args.language, args.repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="음성 fast/full 모드 STT→응답 지연 비교")
+    parser.add_argument("--audio-dir", type=str, default="", help="녹음 파일 디렉터리 (없으면 TTS 합성)")
+    parser.add_argument("--phrases", type=str, default="", help="합성할 발화 문장 파일 (한 줄에 하나)")
+    parser.add_argument("--language", type=str, default="ja", choices=["ja", "ko"])
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--limit", type=int, default=0, help="사용할 클립 수 (0 = 전체)")
+    parser.add_argument("--json", type=str, default="", help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    if report and args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.json}")
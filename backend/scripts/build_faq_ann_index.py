@@ -0,0 +1,106 @@
+"""
+FAQ 벡터 ANN(IVF) 스냅샷 빌드 스크립트.
+
+faq_vectors 전체를 읽어 카테고리별 IVF 인덱스를 만들고 FAQ_ANN_DIR 아래
+버전 디렉터리로 저장한다. API 서버는 시작 시 최신 스냅샷을 mmap으로 열고
+스냅샷 이후 추가된 행만 Supabase에서 가져온다.
+벡터DB 구축 스크립트(build_vector_db, build_pubmed_vectors)의 마지막 단계에서도 호출된다.
+
+사용법:
+  cd backend
+  python -m scripts.build_faq_ann_index                 # 빌드 → data/faq_ann/v.../
+  python -m scripts.build_faq_ann_index --upload        # 빌드 후 Supabase Storage(FAQ_ANN_BUCKET) 업로드
+  python -m scripts.build_faq_ann_index --nlist 128     # 클러스터 수 지정
+  python -m scripts.build_faq_ann_index --quant float16 # 스캔용 양자화 (none | float16 | int8, 기본 FAQ_ANN_QUANT)
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+from config import FAQ_ANN_DIR, FAQ_ANN_BUCKET, FAQ_ANN_QUANT
+from agents.rag_agent import fetch_faq_rows, parse_embedding
+from services.faq_ann import QUANTIZATION_MODES, build_ivf_segment, save_snapshot, upload_snapshot
+
+
+def load_corpus() -> tuple[dict[str, tuple[np.ndarray, list[dict]]], str | None]:
+    """faq_vectors → 카테고리별 (정규화 행렬, 메타데이터). 더미(0) 임베딩은 제외."""
+    rows = fetch_faq_rows()
+    watermark = rows[-1]["created_at"] if rows else None
+
+    vectors: dict[str, list[np.ndarray]] = {}
+    metas: dict[str, list[dict]] = {}
+    skipped = 0
+    for row in rows:
+        vec = parse_embedding(row.pop("embedding", None))
+        norm = float(np.linalg.norm(vec)) if vec is not None else 0.0
+        if norm == 0.0:
+            skipped += 1
+            continue
+        row.pop("created_at", None)
+        category = row["category"]
+        vectors.setdefault(category, []).append(vec / norm)
+        metas.setdefault(category, []).append(row)
+
+    if skipped:
+        print(f"  임베딩 미완료 행 제외: {skipped}건")
+    corpus = {cat: (np.vstack(vecs).astype(np.float32), metas[cat]) for cat, vecs in vectors.items()}
+    return corpus, watermark
+
+
+def build_faq_ann_snapshot(
+    nlist: int | None = None,
+    upload: bool = False,
+    quantization: str = FAQ_ANN_QUANT,
+) -> str | None:
+    print(f"\n{'=' * 50}")
+    print("  FAQ ANN 인덱스 빌드")
+    print(f"{'=' * 50}\n")
+
+    start = time.time()
+    corpus, watermark = load_corpus()
+    if not corpus:
+        print("  faq_vectors가 비어 있습니다.")
+        return None
+    print(f"  로드 완료 ({time.time() - start:.1f}s)")
+
+    segments = {}
+    for category, (matrix, meta) in corpus.items():
+        t = time.time()
+        seg = build_ivf_segment(matrix, meta, nlist=nlist, quantization=quantization)
+        segments[category] = seg
+        sizes = np.diff(seg.offsets)
+        scan_bytes = seg.codes.nbytes if seg.codes is not None else seg.vectors.nbytes
+        print(
+            f"  [{category}] {len(seg)}행, nlist={seg.nlist}, "
+            f"리스트 크기 평균 {sizes.mean():.1f} / 최대 {sizes.max()}, "
+            f"스캔 {seg.quantization} {scan_bytes / 1e6:.1f}MB ({time.time() - t:.1f}s)"
+        )
+
+    os.makedirs(FAQ_ANN_DIR, exist_ok=True)
+    version = save_snapshot(FAQ_ANN_DIR, segments, watermark)
+    print(f"\n  저장: {os.path.join(FAQ_ANN_DIR, version)}")
+
+    if upload:
+        if not FAQ_ANN_BUCKET:
+            print("  [WARN] FAQ_ANN_BUCKET 미설정 — 업로드 생략")
+        else:
+            upload_snapshot(FAQ_ANN_DIR, version, FAQ_ANN_BUCKET)
+            print(f"  업로드 완료: {FAQ_ANN_BUCKET}/{version}")
+
+    print(f"{'=' * 50}\n")
+    return version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FAQ ANN 인덱스 빌드")
+    parser.add_argument("--nlist", type=int, default=None, help="카테고리별 클러스터 수 (기본: 2·√n)")
+    parser.add_argument("--upload", action="store_true", help="Supabase Storage에 업로드")
+    parser.add_argument("--quant", choices=QUANTIZATION_MODES, default=FAQ_ANN_QUANT, help="스캔용 양자화")
+    args = parser.parse_args()
+
+    build_faq_ann_snapshot(nlist=args.nlist, upload=args.upload, quantization=args.quant)
@@ -10,6 +10,7 @@ PubMed API로 논문 수집 -> Gemini로 한국어 FAQ 변환 -> Gemini Embeddin
   python -m scripts.build_pubmed_vectors --step 1      # 수집만
   python -m scripts.build_pubmed_vectors --step 2      # FAQ 변환만
   python -m scripts.build_pubmed_vectors --step 3      # 임베딩만
+  python -m scripts.build_pubmed_vectors --step 4      # ANN 인덱스 스냅샷 빌드만
   python -m scripts.build_pubmed_vectors --stats        # 통계
 """
 import argparse
@@ -26,6 +27,7 @@ from google.genai import types
 
 from config import GEMINI_API_KEY, NCBI_API_KEY, NCBI_EMAIL, NCBI_TOOL
 from services.supabase_client import get_supabase
+from services.gemini_client import embedding_columns
 
 
 # ============================================
@@ -687,7 +689,7 @@ def embed_pubmed_faqs():
                 try:
                     _db_retry(lambda fid=faq["id"], v=vec: (
                         db.table("faq_vectors")
-                        .update({"embedding": v})
+                        .update(embedding_columns(v))
                         .eq("id", fid)
                         .execute()
                     ))
@@ -718,7 +720,7 @@ def embed_pubmed_faqs():
                         vec = r.embeddings[0].values
                         _db_retry(lambda fid=faq["id"], v=vec: (
                             db.table("faq_vectors")
-                            .update({"embedding": v})
+                            .update(embedding_columns(v))
                             .eq("id", fid)
                             .execute()
                         ))
@@ -816,13 +818,17 @@ def run_pipeline(step: int | None = None):
         _safe_print(f"{'=' * 50}\n")
         embed_pubmed_faqs()
 
+    if step == 4 or step is None:
+        from scripts.build_faq_ann_index import build_faq_ann_snapshot
+        build_faq_ann_snapshot()
+
     if step is None:
         print_stats()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="PubMed -> 벡터DB 파이프라인")
-    parser.add_argument("--step", type=int, choices=[1, 2, 3], help="실행할 단계 (1-3)")
+    parser.add_argument("--step", type=int, choices=[1, 2, 3, 4], help="실행할 단계 (1-4)")
     parser.add_argument("--stats", action="store_true", help="현재 통계만 출력")
     args = parser.parse_args()
 
@@ -9,6 +9,7 @@
   python -m scripts.build_vector_db --step 3  # 자막 정제만
   python -m scripts.build_vector_db --step 4  # FAQ 생성만
   python -m scripts.build_vector_db --step 5  # 임베딩만
+  python -m scripts.build_vector_db --step 6  # ANN 인덱스 스냅샷 빌드만
 """
 import argparse
 from services.youtube_service import (
@@ -19,6 +20,7 @@ from services.youtube_service import (
     embed_all_faqs,
 )
 from services.supabase_client import get_supabase
+from scripts.build_faq_ann_index import build_faq_ann_snapshot
 
 
 def print_stats():
@@ -54,7 +56,7 @@ def print_stats():
         )
         faqs = (
             db.table("faq_vectors")
-            .select("*", count="exact")
+            .select("id", count="exact", head=True)
             .eq("category", category)
             .execute()
         )
@@ -65,7 +67,7 @@ def print_stats():
         print(f"    스킵 (자막 없음): {skipped.count}")
         print(f"    생성된 FAQ: {faqs.count}")
 
-    total_faqs = db.table("faq_vectors").select("*", count="exact").execute()
+    total_faqs = db.table("faq_vectors").select("id", count="exact", head=True).execute()
     print(f"\n  총 FAQ 벡터: {total_faqs.count}개")
     print(f"{'=' * 50}\n")
 
@@ -77,6 +79,7 @@ def run_pipeline(step=None):
         3: ("자막 정제 (Gemini LLM)", refine_all_transcripts),
         4: ("FAQ 변환 (Gemini LLM)", generate_all_faqs),
         5: ("임베딩 + 벡터 저장 (Gemini Embedding)", embed_all_faqs),
+        6: ("ANN 인덱스 스냅샷 빌드", build_faq_ann_snapshot),
     }
 
     if step:
@@ -88,7 +91,7 @@ def run_pipeline(step=None):
     else:
         for step_num, (name, func) in steps.items():
             print(f"\n{'=' * 50}")
-            print(f"  STEP {step_num}/5: {name}")
+            print(f"  STEP {step_num}/6: {name}")
             print(f"{'=' * 50}\n")
             func()
             print(f"\n  STEP {step_num} 완료!\n")
@@ -99,7 +102,7 @@ def run_pipeline(step=None):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="벡터DB 구축 파이프라인")
     parser.add_argument(
-        "--step", type=int, choices=[1, 2, 3, 4, 5], help="실행할 단계 (1-5)"
+        "--step", type=int, choices=[1, 2, 3, 4, 5, 6], help="실행할 단계 (1-6)"
     )
     parser.add_argument(
         "--stats", action="store_true", help="현재 통계만 출력"
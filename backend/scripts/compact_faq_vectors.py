@@ -0,0 +1,223 @@
+"""
+근사 중복 FAQ 정리 (코퍼스 컴팩션).
+
+여러 채널이 같은 질문에 답하면서 faq_vectors에 거의 같은 FAQ가 쌓이면
+인덱스 메모리를 낭비하고 RAG 상위 슬롯을 중복 컨텍스트로 채운다.
+카테고리별로 임베딩 코사인 유사도 >= threshold인 행을 묶고(대표 행 중심의 greedy 클러스터링 —
+연쇄 병합 없음), 대표 행만 남긴다.
+
+  - 대표 행: 클러스터 내 이웃 수가 가장 많은 행 (동률이면 답변이 긴 행)
+  - 중복 행: duplicate_of = 대표 id (검색 RPC / 인메모리 인덱스에서 제외, migration 013)
+    duplicate_marked_at이 트리거로 기록됨 → 실행 중인 API의 인덱스가 다음 증분 갱신에서 제거 (migration 017)
+  - 대표 행 duplicate_sources에 중복 행의 출처 링크(영상/논문) 보존
+  - --delete: duplicate_of가 설정된 행을 실제 삭제
+
+리포트: 카테고리별 행 수 / 인덱스 크기 변화, 샘플 쿼리 top-k에서 중복 슬롯이 차지하던 토큰(추정).
+
+사용법:
+  cd backend
+  python -m scripts.compact_faq_vectors                        # 드라이런 (리포트만)
+  python -m scripts.compact_faq_vectors --threshold 0.95 --apply
+  python -m scripts.compact_faq_vectors --apply --rebuild-ann  # 적용 후 ANN 스냅샷 재빌드
+  python -m scripts.compact_faq_vectors --delete               # 중복 표시 행 삭제
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+from agents.rag_agent import fetch_faq_rows, parse_embedding
+from agents.rag_context import estimate_tokens, format_rag_context
+from services.supabase_client import get_supabase
+
+_SOURCE_FIELDS = ("youtube_url", "youtube_title", "youtube_video_id", "source_type")
+
+
+def load_category_matrices() -> dict[str, tuple[np.ndarray, list[dict]]]:
+    """중복 표시되지 않은 행 → 카테고리별 (정규화 행렬, 메타데이터). 더미 임베딩 제외."""
+    vectors: dict[str, list[np.ndarray]] = {}
+    metas: dict[str, list[dict]] = {}
+    for row in fetch_faq_rows():
+        vec = parse_embedding(row.pop("embedding", None))
+        norm = float(np.linalg.norm(vec)) if vec is not None else 0.0
+        if norm == 0.0:
+            continue
+        vectors.setdefault(row["category"], []).append(vec / norm)
+        metas.setdefault(row["category"], []).append(row)
+    return {cat: (np.vstack(vecs).astype(np.float32), metas[cat]) for cat, vecs in vectors.items()}
+
+
+def find_clusters(matrix: np.ndarray, meta: list[dict], threshold: float, block: int = 1024) -> list[list[int]]:
+    """[대표, 중복...] 행 번호 목록. 중복 행은 대표와 직접 threshold 이상인 행만 (A~B~C 연쇄 없음)."""
+    n = len(matrix)
+    neighbors: list[np.ndarray] = []
+    for start in range(0, n, block):
+        sims = matrix[start:start + block] @ matrix.T
+        for offset, row in enumerate(sims):
+            idx = np.flatnonzero(row >= threshold)
+            neighbors.append(idx[idx != start + offset])
+
+    order = sorted(range(n), key=lambda i: (-len(neighbors[i]), -len(meta[i].get("answer") or "")))
+    assigned = np.zeros(n, dtype=bool)
+    clusters = []
+    for i in order:
+        if assigned[i]:
+            continue
+        assigned[i] = True
+        members = [int(j) for j in neighbors[i] if not assigned[j]]
+        if members:
+            assigned[members] = True
+            clusters.append([i] + members)
+    return clusters
+
+
+def measure_context(matrix: np.ndarray, meta: list[dict], cluster_of: np.ndarray, k: int, sample: int) -> dict:
+    """행 자신의 임베딩을 쿼리로 top-k 검색 — 같은 클러스터가 반복된 슬롯의 토큰 = 정리로 줄어드는 토큰"""
+    rng = np.random.default_rng(7)
+    picked = rng.choice(len(matrix), min(sample, len(matrix)), replace=False)
+    keep = np.flatnonzero(cluster_of == np.arange(len(matrix)))  # 대표 + 단독 행
+    kept = matrix[keep]
+
+    tokens_before = []
+    redundant_tokens = []
+    distinct_before = []
+    distinct_after = []
+    for q in picked:
+        scores = matrix @ matrix[q]
+        top = np.argsort(-scores)[:k]
+        seen = set()
+        wasted = 0
+        for i in top:
+            if cluster_of[i] in seen:
+                wasted += estimate_tokens(format_rag_context([meta[i]]))
+            seen.add(cluster_of[i])
+        tokens_before.append(estimate_tokens(format_rag_context([meta[i] for i in top])))
+        redundant_tokens.append(wasted)
+        distinct_before.append(len(seen))
+
+        after = keep[np.argsort(-(kept @ matrix[q]))[:k]]
+        distinct_after.append(len({cluster_of[i] for i in after}))
+
+    n = max(len(picked), 1)
+    return {
+        "queries": len(picked),
+        "avg_context_tokens": round(sum(tokens_before) / n, 1),
+        "avg_redundant_tokens": round(sum(redundant_tokens) / n, 1),
+        "avg_distinct_before": round(sum(distinct_before) / n, 2),
+        "avg_distinct_after": round(sum(distinct_after) / n, 2),
+    }
+
+
+def apply_clusters(meta: list[dict], clusters: list[list[int]]) -> int:
+    db = get_supabase()
+    canonical_ids = [meta[c[0]]["id"] for c in clusters]
+    existing = {}
+    for i in range(0, len(canonical_ids), 100):
+        result = (
+            db.table("faq_vectors")
+            .select("id, duplicate_sources")
+            .in_("id", canonical_ids[i:i + 100])
+            .execute()
+        )
+        existing.update({r["id"]: r.get("duplicate_sources") or [] for r in result.data or []})
+
+    marked = 0
+    for cluster in clusters:
+        canonical = meta[cluster[0]]
+        members = [meta[j] for j in cluster[1:]]
+        sources = existing.get(canonical["id"], []) + [
+            {"id": m["id"], **{f: m.get(f) for f in _SOURCE_FIELDS}} for m in members
+        ]
+        db.table("faq_vectors").update({"duplicate_sources": sources}).eq("id", canonical["id"]).execute()
+        # duplicate_marked_at은 트리거가 DB 시각으로 기록 (migration 017)
+        db.table("faq_vectors").update({"duplicate_of": canonical["id"]}).in_(
+            "id", [m["id"] for m in members]
+        ).execute()
+        marked += len(members)
+    return marked
+
+
+def delete_marked() -> int:
+    db = get_supabase()
+    count = db.table("faq_vectors").select("id", count="exact", head=True).not_.is_("duplicate_of", "null").execute()
+    if count.count:
+        db.table("faq_vectors").delete().not_.is_("duplicate_of", "null").execute()
+    return count.count or 0
+
+
+def compact(threshold: float, k: int, sample: int, apply: bool) -> dict:
+    print(f"\n{'=' * 60}")
+    print(f"  FAQ 근사 중복 정리 (threshold={threshold}, {'적용' if apply else '드라이런'})")
+    print(f"{'=' * 60}")
+
+    start = time.time()
+    corpus = load_category_matrices()
+    print(f"  로드 완료: {sum(len(m) for _, m in corpus.values())}행 ({time.time() - start:.1f}s)")
+
+    report = {"threshold": threshold, "applied": apply, "categories": {}}
+    for category, (matrix, meta) in corpus.items():
+        t = time.time()
+        clusters = find_clusters(matrix, meta, threshold)
+        cluster_of = np.arange(len(matrix))
+        for cluster in clusters:
+            cluster_of[cluster] = cluster[0]
+        redundant = sum(len(c) - 1 for c in clusters)
+        remaining = len(matrix) - redundant
+        bytes_per_row = matrix.shape[1] * 4
+
+        context = measure_context(matrix, meta, cluster_of, k, sample)
+        stats = {
+            "rows": len(matrix),
+            "clusters": len(clusters),
+            "redundant_rows": redundant,
+            "rows_after": remaining,
+            "index_mb_before": round(len(matrix) * bytes_per_row / 1e6, 2),
+            "index_mb_after": round(remaining * bytes_per_row / 1e6, 2),
+            "context": context,
+        }
+        report["categories"][category] = stats
+
+        print(f"\n  [{category}] {len(matrix)}행 → {remaining}행 (중복 {redundant}건, 클러스터 {len(clusters)}개, "
+              f"{time.time() - t:.1f}s)")
+        print(f"    인덱스: {stats['index_mb_before']}MB → {stats['index_mb_after']}MB")
+        print(f"    top-{k} 컨텍스트 평균 {context['avg_context_tokens']}토큰 중 중복 슬롯 "
+              f"{context['avg_redundant_tokens']}토큰, 고유 FAQ {context['avg_distinct_before']} → "
+              f"{context['avg_distinct_after']}")
+        for cluster in clusters[:3]:
+            print(f"    예) {meta[cluster[0]].get('question', '')[:50]}  (+{len(cluster) - 1})")
+
+        if apply and clusters:
+            marked = apply_clusters(meta, clusters)
+            print(f"    -> {marked}건 duplicate_of 표시")
+
+    print(f"{'=' * 60}\n")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FAQ 근사 중복 정리")
+    parser.add_argument("--threshold", type=float, default=0.95, help="중복으로 볼 코사인 유사도")
+    parser.add_argument("--k", type=int, default=8, help="컨텍스트 측정 top-k (에이전트 match_count)")
+    parser.add_argument("--sample", type=int, default=300, help="카테고리별 측정 쿼리 수")
+    parser.add_argument("--apply", action="store_true", help="duplicate_of / duplicate_sources 기록")
+    parser.add_argument("--rebuild-ann", action="store_true", help="적용 후 ANN 스냅샷 재빌드")
+    parser.add_argument("--delete", action="store_true", help="중복 표시된 행 삭제 (클러스터링 없음)")
+    parser.add_argument("--json", type=str, default="", help="리포트를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    if args.delete:
+        print(f"중복 표시 행 삭제: {delete_marked()}건")
+        sys.exit(0)
+
+    report = compact(args.threshold, args.k, args.sample, args.apply)
+    if args.apply and args.rebuild_ann:
+        from scripts.build_faq_ann_index import build_faq_ann_snapshot
+        build_faq_ann_snapshot()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"리포트 저장: {args.json}")
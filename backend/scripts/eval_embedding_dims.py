@@ -0,0 +1,126 @@
+"""
+임베딩 차원(768 / 512 / 256)별 검색 품질 · 지연시간 비교.
+
+faq_vectors의 768차원 embedding을 읽어 차원별로 잘라 정규화한 행렬을 만들고
+(축소 컬럼과 같은 값), FAQ 질문을 쿼리로 사용한 자기 검색(label = 해당 FAQ id)으로 평가한다.
+쿼리 임베딩은 Gemini에 output_dimensionality=dims로 요청해 실제 운영 경로와 동일하게 측정한다.
+
+  hit@k / MRR : 정답 FAQ가 상위 k 안에 있는 비율 / 역순위 평균
+  overlap@k   : 768차원 상위 k 결과와 겹치는 비율
+  embed ms    : 쿼리 임베딩 API 지연 (p50)
+  search ms   : 전수 코사인 검색 지연 (p50)
+
+사용법:
+  cd backend
+  python -m scripts.eval_embedding_dims                    # 카테고리별 질문 100개, k=5
+  python -m scripts.eval_embedding_dims --sample 300 --k 8
+  python -m scripts.eval_embedding_dims --dims 768,256
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+from config import EMBEDDING_REDUCED_DIMS
+from agents.rag_agent import fetch_faq_rows, parse_embedding
+from services.gemini_client import FULL_EMBEDDING_DIM, get_query_embedding
+
+
+def _load_corpus() -> dict[str, tuple[np.ndarray, list[dict]]]:
+    """카테고리별 (768차원 원본 행렬 — 정규화 전, 메타데이터). 더미 임베딩 제외."""
+    vectors: dict[str, list[np.ndarray]] = {}
+    metas: dict[str, list[dict]] = {}
+    for row in fetch_faq_rows(dims=FULL_EMBEDDING_DIM):
+        vec = parse_embedding(row.pop("embedding", None))
+        if vec is None or not np.any(vec):
+            continue
+        vectors.setdefault(row["category"], []).append(vec)
+        metas.setdefault(row["category"], []).append(row)
+    return {cat: (np.vstack(vecs).astype(np.float32), metas[cat]) for cat, vecs in vectors.items()}
+
+
+def _truncate(matrix: np.ndarray, dims: int) -> np.ndarray:
+    head = matrix[:, :dims]
+    norms = np.linalg.norm(head, axis=1, keepdims=True)
+    return np.ascontiguousarray(head / np.where(norms == 0, 1, norms))
+
+
+def _topk(matrix: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    scores = matrix @ query
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+async def _embed_queries(texts: list[str], dims: int, concurrency: int = 8) -> tuple[np.ndarray, list[float]]:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = [0.0] * len(texts)
+
+    async def _one(i: int, text: str):
+        async with sem:
+            start = time.perf_counter()
+            emb = await get_query_embedding(text, dims=dims)
+            latencies[i] = (time.perf_counter() - start) * 1000
+            return emb
+
+    embeddings = await asyncio.gather(*[_one(i, t) for i, t in enumerate(texts)])
+    queries = np.asarray(embeddings, dtype=np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True), latencies
+
+
+def evaluate(dims_list: list[int], sample: int, k: int, seed: int = 42):
+    start = time.time()
+    corpus = _load_corpus()
+    print(f"\n  코퍼스 로드: {sum(len(m) for _, m in corpus.values())}행 ({time.time() - start:.1f}s)")
+
+    rng = random.Random(seed)
+    for category, (full, meta) in corpus.items():
+        picked = rng.sample(range(len(meta)), min(sample, len(meta)))
+        texts = [meta[i]["question"] for i in picked]
+
+        print(f"\n{'=' * 72}")
+        print(f"  [{category}] {len(meta)}행, 쿼리 {len(texts)}개, k={k}")
+        print(f"{'=' * 72}")
+        print(f"  {'dims':<8}{'MB':>8}{'hit@k':>9}{'MRR':>9}{'overlap@k':>11}{'embed ms':>11}{'search ms':>11}")
+
+        baseline: list[set] | None = None
+        for dims in dims_list:
+            matrix = _truncate(full, dims)
+            queries, embed_latencies = asyncio.run(_embed_queries(texts, dims))
+
+            hits = 0
+            rr = 0.0
+            search_latencies = []
+            results: list[set] = []
+            for q, label in zip(queries, picked):
+                t = time.perf_counter()
+                top = _topk(matrix, q, k)
+                search_latencies.append((time.perf_counter() - t) * 1000)
+                ranked = top.tolist()
+                results.append(set(ranked))
+                if label in ranked:
+                    hits += 1
+                    rr += 1.0 / (ranked.index(label) + 1)
+            if baseline is None:
+                baseline = results
+            overlap = sum(len(a & b) for a, b in zip(results, baseline)) / max(sum(len(b) for b in baseline), 1)
+
+            n = max(len(texts), 1)
+            print(f"  {dims:<8}{matrix.nbytes / 1e6:>8.2f}{hits / n:>9.3f}{rr / n:>9.3f}{overlap:>11.3f}"
+                  f"{np.percentile(embed_latencies, 50):>11.1f}{np.percentile(search_latencies, 50):>11.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="임베딩 차원별 검색 품질/지연 비교")
+    parser.add_argument("--dims", type=str, default=",".join(str(d) for d in (FULL_EMBEDDING_DIM, *EMBEDDING_REDUCED_DIMS)),
+                        help="비교할 차원 (첫 번째가 overlap 기준)")
+    parser.add_argument("--sample", type=int, default=100, help="카테고리별 쿼리 수")
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    evaluate([int(d) for d in args.dims.split(",")], args.sample, args.k)
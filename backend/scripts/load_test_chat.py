@@ -0,0 +1,499 @@
+"""
+챗봇 부하 테스트 — 가상 방문자 N명이 /api/chat/start → /message × 턴 → /end 대화를 동시에 진행.
+
+실행 대상
+  - 기본: 프로세스 내 FastAPI 앱 (httpx ASGITransport, 서버 불필요)
+      ASGITransport는 BackgroundTasks까지 끝나야 응답을 돌려주므로, 요약 갱신 등이 겹치는 턴은 지연이 조금 크게 잡힘
+  - --base-url: 실행 중인 서버 (uvicorn/Cloud Run) — 정확한 지연 측정용
+백엔드 (프로세스 내 실행에서만 선택 가능)
+  - real: 실제 Gemini / Supabase — 세션·메시지가 실제로 생성되므로 운영 DB 대상 실행 금지
+  - stub: 로컬 대체 구현 — LLM/임베딩은 지연(--llm-ms, --embed-ms)·오류율(--llm-error-rate, 429 재현)을 흉내내는 고정 응답,
+          DB는 인메모리 테이블 (--db-ms 만큼 블로킹 — 이벤트 루프를 막는 동기 호출까지 재현)
+  - /end 뒤 리포트 파이프라인은 --with-pipeline일 때만 실행 (작업 큐 대신 프로세스 내 실행, 원격 서버는 항상 적재됨)
+
+지표: 엔드포인트별 p50/p95/p99, 오류율(HTTP 오류/예외), 폴백 응답(에이전트 실패로 사과 문구 반환) 수,
+      턴당 LLM 호출 수(함수별, 프로세스 내 실행) / 턴당 DB 요청 수, 처리량. --json으로 회귀 추적용 결과 저장.
+
+사용법:
+  cd backend
+  python -m scripts.load_test_chat --backend stub --visitors 50 --concurrency 20
+  python -m scripts.load_test_chat --backend stub --llm-ms 1500 --llm-error-rate 0.05 --json load_stub.json
+  python -m scripts.load_test_chat --backend real --visitors 5 --concurrency 5          # 개발 DB에서만
+  python -m scripts.load_test_chat --base-url http://localhost:8000 --visitors 20 --no-end
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+_SCRIPTS = [
+    {
+        "language": "ja",
+        "messages": [
+            "こんにちは",
+            "二重整形に興味があります。埋没法と切開法の違いは何ですか？",
+            "ダウンタイムはどれくらいですか？",
+            "韓国には何日くらい滞在すればいいですか？",
+            "費用の目安を教えてください。",
+        ],
+    },
+    {
+        "language": "ja",
+        "messages": [
+            "ニキビ跡が気になっています。",
+            "レーザー治療は痛いですか？",
+            "何回くらい通う必要がありますか？",
+            "副作用はありますか？",
+            "カウンセリングの予約はどうすればいいですか？",
+        ],
+    },
+    {
+        "language": "ko",
+        "messages": [
+            "안녕하세요",
+            "코 성형 상담을 받고 싶어요.",
+            "붓기는 언제까지 가나요?",
+            "수술 후 주의할 점이 있나요?",
+            "비용은 대략 얼마인가요?",
+        ],
+    },
+]
+_FALLBACK_PREFIXES = ("申し訳ございません。一時的に", "죄송합니다. 일시적인")
+_LLM_FUNCS = ("generate_text", "generate_json", "get_query_embedding", "speech_to_text", "text_to_speech")
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+# ============================================
+# 로컬 대체 백엔드 (stub)
+# ============================================
+class _FakeResult:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class _FakeQuery:
+    """supabase-py 쿼리 빌더 중 채팅 경로가 쓰는 부분만 구현 (그 외 필터는 무시)"""
+
+    def __init__(self, db: "_FakeSupabase", table: str):
+        self._db = db
+        self.table = table
+        self.op = "select"
+        self.payload = None
+        self.filters: list = []
+        self.order_by: tuple[str, bool] | None = None
+        self.limit_n: int | None = None
+        self.single_row = False
+        self.count = None
+        self.ignore_duplicates = False
+
+    def select(self, *_, count=None, **__):
+        self.op, self.count = "select", count
+        return self
+
+    def insert(self, rows, **_):
+        self.op, self.payload = "insert", rows
+        return self
+
+    def upsert(self, rows, ignore_duplicates: bool = False, **_):
+        self.op, self.payload, self.ignore_duplicates = "upsert", rows, ignore_duplicates
+        return self
+
+    def update(self, values, **_):
+        self.op, self.payload = "update", values
+        return self
+
+    def delete(self, **_):
+        self.op = "delete"
+        return self
+
+    def eq(self, col, value):
+        self.filters.append(lambda r: str(r.get(col)) == str(value))
+        return self
+
+    def neq(self, col, value):
+        self.filters.append(lambda r: str(r.get(col)) != str(value))
+        return self
+
+    def gt(self, col, value):
+        self.filters.append(lambda r: r.get(col) is not None and str(r[col]) > str(value))
+        return self
+
+    def in_(self, col, values):
+        allowed = {str(v) for v in values}
+        self.filters.append(lambda r: str(r.get(col)) in allowed)
+        return self
+
+    def order(self, col, desc: bool = False, **_):
+        self.order_by = (col, desc)
+        return self
+
+    def limit(self, n, **_):
+        self.limit_n = n
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    maybe_single = single
+
+    def __getattr__(self, name):
+        # 구현하지 않은 필터/옵션 (range, is_, not_ 등) — 체인만 유지
+        return lambda *a, **k: self
+
+    def execute(self):
+        return self._db.execute(self)
+
+
+class _FakeRpc:
+    def __init__(self, db: "_FakeSupabase"):
+        self._db = db
+
+    def execute(self):
+        self._db.tick()
+        return _FakeResult([])
+
+
+class _FakeSupabase:
+    """인메모리 테이블. execute마다 db_ms 만큼 블로킹 (실제 동기 HTTP 호출과 같은 방식으로 스레드/루프를 점유)"""
+
+    def __init__(self, db_ms: float):
+        self.db_ms = db_ms
+        self.tables: dict[str, list[dict]] = defaultdict(list)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> _FakeQuery:
+        return _FakeQuery(self, name)
+
+    def rpc(self, *_, **__) -> _FakeRpc:
+        return _FakeRpc(self)
+
+    def tick(self):
+        with self._lock:
+            self.calls += 1
+        if self.db_ms:
+            time.sleep(random.uniform(0.5, 1.5) * self.db_ms / 1000)
+
+    def execute(self, q: _FakeQuery) -> _FakeResult:
+        self.tick()
+        with self._lock:
+            rows = self.tables[q.table]
+            if q.op in ("insert", "upsert"):
+                payload = q.payload if isinstance(q.payload, list) else [q.payload]
+                existing = {r.get("id") for r in rows}
+                inserted = []
+                for item in payload:
+                    row = {"id": str(uuid.uuid4()), "created_at": datetime.now(timezone.utc).isoformat(), **item}
+                    if row["id"] in existing and q.ignore_duplicates:
+                        continue
+                    rows.append(row)
+                    inserted.append(dict(row))
+                return _FakeResult(inserted)
+
+            matched = [r for r in rows if all(f(r) for f in q.filters)]
+            if q.op == "update":
+                for r in matched:
+                    r.update(q.payload)
+                return _FakeResult([dict(r) for r in matched])
+            if q.op == "delete":
+                self.tables[q.table] = [r for r in rows if r not in matched]
+                return _FakeResult(matched)
+
+            if q.order_by:
+                col, desc = q.order_by
+                matched.sort(key=lambda r: str(r.get(col) or ""), reverse=desc)
+            total = len(matched)
+            if q.limit_n is not None:
+                matched = matched[:q.limit_n]
+            data = [dict(r) for r in matched]
+            if q.single_row:
+                return _FakeResult(data[0] if data else None, total)
+            return _FakeResult(data, total if q.count else None)
+
+
+class _StubLLM:
+    def __init__(self, llm_ms: float, embed_ms: float, error_rate: float, dims: int):
+        self.llm_ms = llm_ms
+        self.embed_ms = embed_ms
+        self.error_rate = error_rate
+        self.dims = dims
+
+    async def _delay(self, ms: float):
+        await asyncio.sleep(max(0.0, random.gauss(ms, ms * 0.25)) / 1000)
+        if random.random() < self.error_rate:
+            raise RuntimeError("429 Resource has been exhausted (stub)")
+
+    async def generate_text(self, prompt: str, system_instruction: str = "", **_) -> str:
+        await self._delay(self.llm_ms)
+        if any("぀" <= ch <= "ヿ" for ch in prompt[:400]):
+            return "ご質問ありがとうございます。一般的には施術後1〜2週間ほどで腫れが落ち着くことが多いです。詳しくはご来院時に担当医からご説明いたします。他に気になる点はございますか？"
+        return "질문 감사합니다. 일반적으로 시술 후 1~2주 정도면 붓기가 가라앉는 경우가 많습니다. 자세한 내용은 내원 시 담당 의사가 안내드립니다. 다른 궁금한 점이 있으신가요?"
+
+    async def generate_json(self, prompt: str, *_, **__) -> str:
+        await self._delay(self.llm_ms * 0.5)
+        return json.dumps({
+            "intent": random.choice(["medical", "consultation", "general"]),
+            "category": random.choice(["dermatology", "plastic_surgery"]),
+            "cta_level": random.choice(["cool", "warm", "hot"]),
+            "keywords": ["施術", "ダウンタイム"],
+        }, ensure_ascii=False)
+
+    async def get_query_embedding(self, text: str, dims: int | None = None) -> list[float]:
+        await self._delay(self.embed_ms)
+        seed = int(hashlib.sha1(text.encode()).hexdigest()[:8], 16)
+        vec = np.random.default_rng(seed).standard_normal(dims or self.dims).astype(np.float32)
+        return (vec / np.linalg.norm(vec)).tolist()
+
+    async def speech_to_text(self, *_, **__) -> str:
+        await self._delay(self.llm_ms * 0.5)
+        return "ダウンタイムはどれくらいですか？"
+
+    async def text_to_speech(self, *_, **__) -> str | None:
+        await self._delay(self.llm_ms * 0.5)
+        return None
+
+
+# ============================================
+# 패치 / 호출 집계
+# ============================================
+def _patch_everywhere(originals: dict[str, object], replacements: dict[str, object]):
+    """from-import로 복사된 참조까지 모든 로드된 모듈에서 교체"""
+    for module in list(sys.modules.values()):
+        for name, original in originals.items():
+            try:
+                if getattr(module, name, None) is original:
+                    setattr(module, name, replacements[name])
+            except Exception:
+                continue
+
+
+def _counting(name: str, fn, counts: dict[str, int]):
+    async def wrapper(*args, **kwargs):
+        counts[name] += 1
+        return await fn(*args, **kwargs)
+    return wrapper
+
+
+def setup_in_process(args) -> tuple[object, dict[str, int], callable]:
+    """앱 로드 + 백엔드 교체. Returns: (app, LLM 호출 카운터, DB 요청 수 조회 함수)"""
+    import main
+    import api.chat
+    import services.gemini_client as gemini
+    import services.supabase_client as supabase_client
+    from config import EMBEDDING_DIM
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)  # 앱 INFO 로그가 결과 출력을 덮지 않도록
+    llm_counts: dict[str, int] = defaultdict(int)
+    originals = {name: getattr(gemini, name) for name in _LLM_FUNCS}
+    if args.backend == "stub":
+        stub = _StubLLM(args.llm_ms, args.embed_ms, args.llm_error_rate, EMBEDDING_DIM)
+        impls = {name: getattr(stub, name) for name in _LLM_FUNCS}
+        fake_db = _FakeSupabase(args.db_ms)
+        _patch_everywhere({"get_supabase": supabase_client.get_supabase}, {"get_supabase": lambda: fake_db})
+        db_calls = lambda: fake_db.calls  # noqa: E731
+    else:
+        impls = originals
+        db_calls = lambda: supabase_client.get_pool_stats()["total_requests"]  # noqa: E731
+    _patch_everywhere(originals, {name: _counting(name, impls[name], llm_counts) for name in _LLM_FUNCS})
+
+    # /end의 작업 큐 적재 대신: --with-pipeline이면 프로세스 내에서 바로 실행, 아니면 버림
+    def _enqueue(kind: str, payload: dict, dedup_key: str | None = None, **_):
+        if args.with_pipeline:
+            from worker import JOB_HANDLERS
+            asyncio.get_running_loop().create_task(JOB_HANDLERS[kind](**payload))
+        return None
+    api.chat.enqueue = _enqueue
+
+    return main.app, llm_counts, db_calls
+
+
+# ============================================
+# 가상 방문자
+# ============================================
+class _Metrics:
+    def __init__(self):
+        self.latency: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.status: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.fallbacks = 0
+        self.error_samples: list[str] = []
+
+    def record(self, endpoint: str, ms: float, status: str, ok: bool):
+        self.latency[endpoint].append(ms)
+        self.status[endpoint][status] += 1
+        if not ok:
+            self.errors[endpoint] += 1
+
+
+async def _call(client: httpx.AsyncClient, metrics: _Metrics, endpoint: str, path: str, body: dict) -> dict | None:
+    start = time.perf_counter()
+    try:
+        res = await client.post(path, json=body)
+    except Exception as e:
+        metrics.record(endpoint, (time.perf_counter() - start) * 1000, type(e).__name__, False)
+        if len(metrics.error_samples) < 10:
+            metrics.error_samples.append(f"{endpoint}: {type(e).__name__} {str(e)[:80]}")
+        return None
+    ms = (time.perf_counter() - start) * 1000
+    ok = res.status_code < 400
+    metrics.record(endpoint, ms, str(res.status_code), ok)
+    if not ok:
+        if len(metrics.error_samples) < 10:
+            metrics.error_samples.append(f"{endpoint}: {res.status_code} {res.text[:80]}")
+        return None
+    return res.json()
+
+
+async def _visitor(idx: int, client: httpx.AsyncClient, metrics: _Metrics, sem: asyncio.Semaphore, args):
+    script = _SCRIPTS[idx % len(_SCRIPTS)]
+    if args.ramp_sec:
+        await asyncio.sleep(args.ramp_sec * idx / max(args.visitors, 1))
+    async with sem:
+        started = await _call(client, metrics, "start", "/api/chat/start", {"language": script["language"]})
+        if not started:
+            return
+        session_id = started["session_id"]
+        for content in script["messages"][:args.turns or None]:
+            if args.think_ms:
+                await asyncio.sleep(random.uniform(0.5, 1.5) * args.think_ms / 1000)
+            reply = await _call(client, metrics, "message", "/api/chat/message",
+                                {"session_id": session_id, "content": content})
+            if reply and str(reply.get("content", "")).startswith(_FALLBACK_PREFIXES):
+                metrics.fallbacks += 1
+        if args.end:
+            await _call(client, metrics, "end", "/api/chat/end", {
+                "session_id": session_id,
+                "customer_name": f"Load Test {idx}",
+                "customer_email": f"loadtest+{idx}@example.com",
+                "language": script["language"],
+            })
+
+
+async def run_load(args) -> dict:
+    llm_counts: dict[str, int] = {}
+    db_calls = None
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout)
+        target = args.base_url
+    else:
+        app, llm_counts, db_calls = setup_in_process(args)
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                                   timeout=args.timeout)
+        target = f"in-process ({args.backend})"
+
+    print(f"\n{'=' * 72}")
+    print(f"  챗봇 부하 테스트: {target}")
+    print(f"  방문자 {args.visitors}명, 동시 {args.concurrency}, 턴 {args.turns or '전체'}, "
+          f"/end {'포함' if args.end else '제외'}")
+    print(f"{'=' * 72}")
+
+    metrics = _Metrics()
+    sem = asyncio.Semaphore(args.concurrency)
+    db_before = db_calls() if db_calls else 0
+    start = time.perf_counter()
+    async with client:
+        await asyncio.gather(*[_visitor(i, client, metrics, sem, args) for i in range(args.visitors)])
+    elapsed = time.perf_counter() - start
+    if not args.base_url:
+        from services.chat_persistence import chat_persistence
+        await chat_persistence.flush()
+    db_total = (db_calls() - db_before) if db_calls else None
+
+    turns = len(metrics.latency["message"])
+    endpoints = {}
+    for endpoint in ("start", "message", "end"):
+        values = metrics.latency.get(endpoint) or []
+        if not values:
+            continue
+        endpoints[endpoint] = {
+            "requests": len(values),
+            "p50_ms": round(_percentile(values, 50), 1),
+            "p95_ms": round(_percentile(values, 95), 1),
+            "p99_ms": round(_percentile(values, 99), 1),
+            "errors": metrics.errors.get(endpoint, 0),
+            "error_rate": round(metrics.errors.get(endpoint, 0) / len(values), 4),
+            "status": dict(metrics.status[endpoint]),
+        }
+
+    report = {
+        "target": target,
+        "config": {
+            "visitors": args.visitors, "concurrency": args.concurrency, "turns": args.turns,
+            "end": args.end, "think_ms": args.think_ms, "backend": None if args.base_url else args.backend,
+            "llm_ms": args.llm_ms, "embed_ms": args.embed_ms, "db_ms": args.db_ms,
+            "llm_error_rate": args.llm_error_rate,
+        },
+        "elapsed_sec": round(elapsed, 2),
+        "turns_per_sec": round(turns / elapsed, 2) if elapsed else 0.0,
+        "endpoints": endpoints,
+        "fallback_replies": metrics.fallbacks,
+        "per_turn": {
+            "llm_calls": {k: round(v / max(turns, 1), 2) for k, v in sorted(llm_counts.items())} if llm_counts else None,
+            "db_requests": round(db_total / max(turns, 1), 2) if db_total is not None else None,
+        },
+        "error_samples": metrics.error_samples,
+    }
+
+    print(f"\n  {'endpoint':<10}{'req':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'err %':>8}")
+    for endpoint, r in endpoints.items():
+        print(f"  {endpoint:<10}{r['requests']:>6}{r['p50_ms']:>10.0f}{r['p95_ms']:>10.0f}{r['p99_ms']:>10.0f}"
+              f"{r['error_rate'] * 100:>8.2f}")
+    print(f"\n  처리량: {report['turns_per_sec']} 턴/s ({elapsed:.1f}s), 폴백 응답 {metrics.fallbacks}건")
+    if report["per_turn"]["llm_calls"] is not None:
+        print(f"  턴당 LLM 호출: {report['per_turn']['llm_calls']}")
+    if report["per_turn"]["db_requests"] is not None:
+        print(f"  턴당 DB 요청: {report['per_turn']['db_requests']} (start/end 포함 전체 ÷ 메시지 턴)")
+    for sample in metrics.error_samples:
+        print(f"    -> {sample}")
+    print(f"{'=' * 72}\n")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="챗봇 동시 대화 부하 테스트")
+    parser.add_argument("--base-url", type=str, default="", help="원격 서버 URL (없으면 프로세스 내 앱)")
+    parser.add_argument("--backend", type=str, default="stub", choices=["stub", "real"], help="프로세스 내 실행 백엔드")
+    parser.add_argument("--visitors", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=0, help="방문자당 메시지 턴 수 (0 = 스크립트 전체)")
+    parser.add_argument("--think-ms", type=float, default=0, help="턴 사이 사용자 입력 시간 (평균)")
+    parser.add_argument("--ramp-sec", type=float, default=0, help="방문자 시작을 이 시간에 걸쳐 분산")
+    parser.add_argument("--no-end", dest="end", action="store_false", help="/api/chat/end 호출 생략")
+    parser.add_argument("--with-pipeline", action="store_true", help="/end 후 리포트 파이프라인 실행 (프로세스 내)")
+    parser.add_argument("--llm-ms", type=float, default=800, help="stub LLM 평균 지연")
+    parser.add_argument("--embed-ms", type=float, default=80, help="stub 임베딩 평균 지연")
+    parser.add_argument("--db-ms", type=float, default=15, help="stub DB 요청당 지연 (블로킹)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="stub LLM 오류(429) 비율")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--verbose", action="store_true", help="앱 INFO 로그 출력")
+    parser.add_argument("--json", type=str, default="", help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"결과 저장: {args.json}")
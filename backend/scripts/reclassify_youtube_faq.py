@@ -264,13 +264,13 @@ async def main():
     # 7) 최종 통계
     derm_count = (
         db.table("faq_vectors")
-        .select("*", count="exact")
+        .select("id", count="exact", head=True)
         .eq("category", "dermatology")
         .execute()
     )
     ps_count = (
         db.table("faq_vectors")
-        .select("*", count="exact")
+        .select("id", count="exact", head=True)
         .eq("category", "plastic_surgery")
         .execute()
     )
@@ -0,0 +1,171 @@
+"""
+faq_vectors 축소 차원(Matryoshka) 임베딩 컬럼 채우기.
+
+migration 012로 추가된 embedding_512 / embedding_256 컬럼이 비어 있는 행을 배치로 처리한다.
+  - truncate (기본): 저장된 768차원 embedding 앞부분을 잘라 정규화 — API 호출 없음
+  - api: Gemini에 output_dimensionality=dims로 다시 임베딩 — 출처별 수집 경로와 같은 텍스트
+    (youtube: question만 — youtube_service.embed_all_faqs / pubmed: question + answer — build_pubmed_vectors)
+더미(0) 임베딩 행은 아직 임베딩 전이므로 truncate 모드에서 건너뛴다.
+
+사용법:
+  cd backend
+  python -m scripts.reembed_faq_vectors                     # 축소 컬럼 전부, truncate
+  python -m scripts.reembed_faq_vectors --dims 256          # embedding_256만
+  python -m scripts.reembed_faq_vectors --source api --dims 256 --batch 20
+  python -m scripts.reembed_faq_vectors --dry-run           # 대상 건수만 확인
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.stdout.reconfigure(encoding="utf-8")
+
+from google import genai
+from google.genai import types
+
+from config import GEMINI_API_KEY, EMBEDDING_REDUCED_DIMS
+from services.gemini_client import embedding_column, truncate_embedding
+from services.supabase_client import get_supabase
+
+
+def _db_retry(func, max_retries=3):
+    for attempt in range(max_retries):
+        try:
+            return func()
+        except Exception as e:
+            if attempt < max_retries - 1:
+                wait = 5 * (attempt + 1)
+                print(f"    -> DB error (retry {attempt + 1}), wait {wait}s: {str(e)[:80]}")
+                time.sleep(wait)
+            else:
+                raise
+
+
+def _fetch_batch(column: str, after_id: str | None, batch: int, with_text: bool) -> list[dict]:
+    """column이 NULL인 행을 id 순으로 (keyset 페이지네이션 — 건너뛴 행 때문에 offset 사용 불가)"""
+    db = get_supabase()
+    fields = "id, question, answer, source_type" if with_text else "id, embedding"
+
+    def _query():
+        query = db.table("faq_vectors").select(fields).is_(column, "null")
+        if after_id:
+            query = query.gt("id", after_id)
+        return query.order("id").limit(batch).execute()
+
+    return _db_retry(_query).data or []
+
+
+def _count_missing(column: str) -> int:
+    db = get_supabase()
+    result = _db_retry(lambda: (
+        db.table("faq_vectors").select("id", count="exact", head=True).is_(column, "null").execute()
+    ))
+    return result.count or 0
+
+
+def _update_rows(updates: list[tuple[str, dict]], workers: int) -> int:
+    """행별 UPDATE를 공유 커넥션 풀로 병렬 실행. 성공 건수 반환."""
+    db = get_supabase()
+
+    def _update(item):
+        faq_id, values = item
+        try:
+            _db_retry(lambda: db.table("faq_vectors").update(values).eq("id", faq_id).execute())
+            return True
+        except Exception as e:
+            print(f"    -> update failed {faq_id}: {str(e)[:80]}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(_update, updates))
+
+
+def _embedding_text(row: dict) -> str:
+    """768차원 embedding과 같은 텍스트 (source_type은 migration 011 생성 컬럼)"""
+    if row.get("source_type") == "pubmed":
+        return f"{row['question']} {row['answer']}"
+    return row["question"]
+
+
+def _embed_api(client, texts: list[str], dims: int) -> list[list[float]]:
+    for attempt in range(3):
+        try:
+            result = client.models.embed_content(
+                model="models/gemini-embedding-001",
+                contents=texts,
+                config=types.EmbedContentConfig(
+                    task_type="RETRIEVAL_DOCUMENT",
+                    output_dimensionality=dims,
+                ),
+            )
+            # 768 미만 출력은 정규화되어 있지 않음
+            return [truncate_embedding(list(e.values), dims) for e in result.embeddings]
+        except Exception as e:
+            if attempt < 2 and ("429" in str(e) or "RESOURCE_EXHAUSTED" in str(e)):
+                print("    -> Rate limited, waiting 60s...")
+                time.sleep(60)
+            else:
+                raise
+
+
+def reembed(dims_list: list[int], source: str, batch: int, workers: int, dry_run: bool = False):
+    print(f"\n{'=' * 50}")
+    print(f"  축소 차원 임베딩 채우기 ({source}, dims={dims_list})")
+    print(f"{'=' * 50}")
+
+    for dims in dims_list:
+        column = embedding_column(dims)
+        missing = _count_missing(column)
+        print(f"\n  [{column}] 대상 {missing}건")
+        if dry_run or not missing:
+            continue
+
+        client = genai.Client(api_key=GEMINI_API_KEY) if source == "api" else None
+        start = time.time()
+        done = 0
+        skipped = 0
+        after_id = None
+        while True:
+            rows = _fetch_batch(column, after_id, batch, with_text=source == "api")
+            if not rows:
+                break
+            after_id = rows[-1]["id"]
+
+            updates = []
+            if source == "api":
+                texts = [_embedding_text(r) for r in rows]
+                vectors = _embed_api(client, texts, dims)
+                updates = [(r["id"], {column: v}) for r, v in zip(rows, vectors)]
+                time.sleep(2)  # Rate limit
+            else:
+                for r in rows:
+                    raw = r.get("embedding")
+                    vec = json.loads(raw) if isinstance(raw, str) else raw
+                    if not vec or not any(vec):
+                        skipped += 1  # 더미 임베딩 — 임베딩 완료 후 다시 실행
+                        continue
+                    updates.append((r["id"], {column: truncate_embedding(vec, dims)}))
+
+            done += _update_rows(updates, workers)
+            elapsed = time.time() - start
+            print(f"    -> {done}/{missing} ({done / max(elapsed, 1e-6):.1f} rows/s, 건너뜀 {skipped})")
+
+        print(f"  [{column}] 완료: {done}건, 건너뜀 {skipped}건 ({time.time() - start:.1f}s)")
+
+    print(f"{'=' * 50}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="faq_vectors 축소 차원 임베딩 채우기")
+    parser.add_argument("--dims", type=int, choices=EMBEDDING_REDUCED_DIMS, default=None,
+                        help="대상 차원 (기본: 축소 컬럼 전부)")
+    parser.add_argument("--source", choices=("truncate", "api"), default="truncate")
+    parser.add_argument("--batch", type=int, default=200, help="배치 크기 (api 모드는 20 권장)")
+    parser.add_argument("--workers", type=int, default=8, help="병렬 UPDATE 수")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    dims_list = [args.dims] if args.dims else list(EMBEDDING_REDUCED_DIMS)
+    reembed(dims_list, args.source, args.batch, args.workers, args.dry_run)
@@ -0,0 +1,201 @@
+"""
+채팅 저장 파이프라인 — 메시지/세션 쓰기를 응답 경로 밖에서 처리.
+
+- 세션별 순서 보장: 세션마다 작업 큐 1개 + 워커 1개 (큐가 비면 워커 종료)
+- 배치: 같은 테이블로 연속된 insert는 한 번의 요청으로, 연속된 세션 update는 병합
+- 멱등 재시도: 행 id를 앱에서 부여하고 upsert(ignore_duplicates) — 응답 유실 후 재시도해도 중복 행 없음
+  최종 실패한 배치는 행 단위로 한 번 더 시도 (잘못된 행 1개가 배치 전체를 잃게 하지 않도록)
+- created_at도 앱에서 부여 — 한 번에 insert된 user/assistant 메시지의 순서 유지
+- drain(session_id): 해당 세션의 대기 쓰기 완료까지 대기 (다음 턴 이력 조회 전)
+- flush(): 종료 시 전체 대기 쓰기 완료까지 대기 (main.py shutdown)
+
+주의: 큐는 프로세스 메모리에만 있음 — 응답을 보낸 뒤 쓰기 전에 인스턴스가 강제 종료되면
+(OOM, SIGKILL, SIGTERM 후 유예 시간 초과) 대기 중인 메시지는 유실된다.
+- Cloud Run은 응답 사이 CPU를 회수하므로 API 서비스는 --no-cpu-throttling 으로 배포 (cloudbuild.yaml)
+- 정상 종료는 flush()가 CHAT_PERSIST_SHUTDOWN_TIMEOUT_SEC 동안 처리 (못 쓴 작업 수는 에러 로그)
+- 유실 규모는 /health/persistence 의 queued_ops (보통 세션당 1~2건, 수 초 이내)
+"""
+import asyncio
+import logging
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+
+from config import (
+    CHAT_PERSIST_BATCH_SIZE,
+    CHAT_PERSIST_MAX_RETRIES,
+    CHAT_PERSIST_SHUTDOWN_TIMEOUT_SEC,
+)
+from services.supabase_client import get_supabase
+
+logger = logging.getLogger(__name__)
+
+_RETRY_BASE_SEC = 0.5
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ChatPersistence:
+    def __init__(self, batch_size: int, max_retries: int):
+        self.batch_size = max(1, batch_size)
+        self.max_retries = max_retries
+        # session_id → [(kind, table, payload)]  kind: "insert" | "update"
+        self._queues: dict[str, deque[tuple[str, str, dict]]] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+        self.enqueued = 0
+        self.written = 0
+        self.requests = 0
+        self.retries = 0
+        self.failed = 0
+
+    # ------------------------------------------
+    # 큐잉
+    # ------------------------------------------
+    def _enqueue(self, session_id: str, op: tuple[str, str, dict]):
+        self._queues.setdefault(session_id, deque()).append(op)
+        self.enqueued += 1
+        worker = self._workers.get(session_id)
+        if worker is None or worker.done():
+            self._workers[session_id] = asyncio.create_task(self._run(session_id))
+
+    def add_message(
+        self,
+        session_id: str,
+        role: str,
+        content: str,
+        rag_references: list[dict] | None = None,
+        created_at: str | None = None,
+    ) -> dict:
+        """chat_messages insert 예약. Returns: 저장될 행 (id/created_at 포함)"""
+        row = {
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "role": role,
+            "content": content,
+            "created_at": created_at or now_iso(),
+            "rag_references": rag_references or None,  # 배치 insert는 행마다 같은 컬럼 필요
+        }
+        self._enqueue(session_id, ("insert", "chat_messages", row))
+        return row
+
+    def update_session(self, session_id: str, values: dict):
+        self._enqueue(session_id, ("update", "chat_sessions", dict(values)))
+
+    def pending(self, session_id: str) -> int:
+        return len(self._queues.get(session_id) or ())
+
+    # ------------------------------------------
+    # 워커
+    # ------------------------------------------
+    def _next_batch(self, queue: deque) -> tuple[str, str, list[dict]]:
+        kind, table, payload = queue.popleft()
+        batch = [payload]
+        while queue and queue[0][0] == kind and queue[0][1] == table:
+            if kind == "insert":
+                if len(batch) >= self.batch_size:
+                    break
+                batch.append(queue.popleft()[2])
+            else:
+                batch[0] = {**batch[0], **queue.popleft()[2]}
+        return kind, table, batch
+
+    async def _run(self, session_id: str):
+        db = get_supabase()
+        queue = self._queues[session_id]
+        try:
+            while queue:
+                kind, table, batch = self._next_batch(queue)
+                if kind == "insert":
+                    ok = await self._write(
+                        session_id, len(batch),
+                        lambda rows=batch: db.table(table)
+                        .upsert(rows, on_conflict="id", ignore_duplicates=True).execute(),
+                    )
+                    if not ok and len(batch) > 1:
+                        for row in batch:
+                            await self._write(
+                                session_id, 1,
+                                lambda rows=[row]: db.table(table)
+                                .upsert(rows, on_conflict="id", ignore_duplicates=True).execute(),
+                                final=True,
+                            )
+                    elif not ok:
+                        self.failed += 1
+                else:
+                    ok = await self._write(
+                        session_id, 1,
+                        lambda values=batch[0]: db.table(table).update(values).eq("id", session_id).execute(),
+                    )
+                    if not ok:
+                        self.failed += 1
+        finally:
+            # 큐가 비었을 때만 정리 (await 없이 확인하므로 그 사이 새 작업이 끼어들지 않음)
+            if not queue:
+                self._queues.pop(session_id, None)
+            if self._workers.get(session_id) is asyncio.current_task():
+                self._workers.pop(session_id, None)
+
+    async def _write(self, session_id: str, rows: int, fn, final: bool = False) -> bool:
+        """fn을 스레드에서 실행, 실패 시 지수 백오프 재시도. final=True면 재시도 없이 1회 (실패 시 집계)"""
+        attempts = 1 if final else self.max_retries + 1
+        for attempt in range(attempts):
+            self.requests += 1
+            try:
+                await asyncio.to_thread(fn)
+                self.written += rows
+                return True
+            except Exception as e:
+                if attempt == attempts - 1:
+                    logger.error(f"[ChatPersist] write failed (session {session_id[:8]}, {rows} rows): {e}")
+                    if final:
+                        self.failed += rows
+                    return False
+                self.retries += 1
+                logger.warning(
+                    f"[ChatPersist] retry {attempt + 1}/{self.max_retries} (session {session_id[:8]}): {e}"
+                )
+                await asyncio.sleep(_RETRY_BASE_SEC * (2 ** attempt))
+        return False
+
+    # ------------------------------------------
+    # 대기 / 종료
+    # ------------------------------------------
+    async def drain(self, session_id: str):
+        """해당 세션의 대기 중 쓰기가 모두 끝날 때까지 대기"""
+        while True:
+            worker = self._workers.get(session_id)
+            if worker is None or worker.done():
+                return
+            try:
+                await asyncio.shield(worker)
+            except Exception as e:
+                logger.error(f"[ChatPersist] writer crashed (session {session_id[:8]}): {e}")
+                return
+
+    async def flush(self, timeout: float = CHAT_PERSIST_SHUTDOWN_TIMEOUT_SEC) -> int:
+        """모든 세션의 대기 쓰기 처리. Returns: 시간 안에 못 쓴 작업 수"""
+        workers = [w for w in self._workers.values() if not w.done()]
+        if workers:
+            logger.info(f"[ChatPersist] flushing {sum(len(q) for q in self._queues.values())} ops "
+                        f"({len(workers)} sessions)")
+            await asyncio.wait(workers, timeout=timeout)
+        left = sum(len(q) for q in self._queues.values())
+        if left:
+            logger.error(f"[ChatPersist] shutdown with {left} unwritten ops")
+        return left
+
+    def stats(self) -> dict:
+        return {
+            "active_sessions": sum(1 for w in self._workers.values() if not w.done()),
+            "queued_ops": sum(len(q) for q in self._queues.values()),
+            "enqueued": self.enqueued,
+            "written_rows": self.written,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failed": self.failed,
+        }
+
+
+chat_persistence = ChatPersistence(CHAT_PERSIST_BATCH_SIZE, CHAT_PERSIST_MAX_RETRIES)
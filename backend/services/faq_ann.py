@@ -0,0 +1,308 @@
+"""
+FAQ 벡터 ANN(IVF) 인덱스 — 빌드 / 저장 / mmap 로드 / 검색.
+
+카테고리별로 spherical k-means로 코스 클러스터(nlist개)를 학습하고,
+행을 클러스터 순서로 정렬해 저장한다. 검색 시 쿼리와 가까운 nprobe개 클러스터의
+연속 구간만 스캔하므로 전수 코사인 대비 스캔량이 nprobe/nlist로 줄어든다.
+
+스냅샷은 버전 디렉터리(v{빌드시각}) 단위로 저장되며 .npy 파일은
+np.load(mmap_mode="r")로 열어 같은 인스턴스의 워커 프로세스들이 페이지를 공유한다.
+
+양자화(quantization="int8" | "float16")를 켜면 클러스터 스캔은 codes(행별 scale을 곱한 int8,
+또는 float16)로 하고, 상위 k·rerank개 후보만 float32 원본 벡터로 재채점한다.
+원본 벡터는 mmap이라 재채점된 행의 페이지만 메모리에 올라온다.
+
+  {FAQ_ANN_DIR}/LATEST                       ← 최신 버전 디렉터리 이름
+  {FAQ_ANN_DIR}/v20260301120000/manifest.json
+  {FAQ_ANN_DIR}/v20260301120000/{category}.vectors.npy    (n, dim) float32, 정규화, 클러스터 순
+  {FAQ_ANN_DIR}/v20260301120000/{category}.centroids.npy  (nlist, dim) float32
+  {FAQ_ANN_DIR}/v20260301120000/{category}.offsets.npy    (nlist + 1,) int64
+  {FAQ_ANN_DIR}/v20260301120000/{category}.meta.json      행 순서와 같은 메타데이터 목록
+  {FAQ_ANN_DIR}/v20260301120000/{category}.codes.npy      (n, dim) int8 | float16   (양자화 시)
+  {FAQ_ANN_DIR}/v20260301120000/{category}.scales.npy     (n,) float32              (int8만)
+"""
+import json
+import logging
+import math
+import os
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2  # 2: 양자화 codes/scales 추가 (1도 로드 가능)
+_SUPPORTED_FORMATS = (1, 2)
+QUANTIZATION_MODES = ("none", "float16", "int8")
+_LATEST_FILE = "LATEST"
+_MANIFEST_FILE = "manifest.json"
+
+
+def quantize(vectors: np.ndarray, mode: str) -> tuple[np.ndarray | None, np.ndarray | None]:
+    """정규화된 벡터 → (codes, scales). int8은 행별 대칭 스케일 (max|x| / 127)."""
+    if mode == "float16":
+        return vectors.astype(np.float16), None
+    if mode == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+    return None, None
+
+
+class IvfSegment:
+    """한 카테고리의 IVF 리스트. vectors/codes는 np.memmap일 수 있음 (읽기 전용).
+    codes가 있으면 스캔은 codes로, 상위 후보는 vectors(float32)로 재채점."""
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        centroids: np.ndarray,
+        offsets: np.ndarray,
+        meta: list[dict],
+        codes: np.ndarray | None = None,
+        scales: np.ndarray | None = None,
+    ):
+        self.vectors = vectors
+        self.centroids = centroids
+        self.offsets = offsets
+        self.meta = meta
+        self.codes = codes
+        self.scales = scales
+        self.ids = [m["id"] for m in meta]
+        self.row_of = {faq_id: row for row, faq_id in enumerate(self.ids)}
+
+    @property
+    def quantization(self) -> str:
+        if self.codes is None:
+            return "none"
+        return "int8" if self.codes.dtype == np.int8 else "float16"
+
+    def _scan(self, start: int, end: int, query: np.ndarray) -> np.ndarray:
+        """[start, end) 행의 (근사) 유사도"""
+        if self.codes is None:
+            return np.asarray(self.vectors[start:end] @ query, dtype=np.float32)
+        scores = np.asarray(self.codes[start:end], dtype=np.float32) @ query
+        if self.scales is not None:
+            scores *= self.scales[start:end]
+        return scores
+
+    def __len__(self) -> int:
+        return len(self.meta)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    def search(self, query: np.ndarray, k: int, nprobe: int, rerank: int = 4) -> tuple[np.ndarray, np.ndarray]:
+        """정규화된 쿼리로 상위 k개 (행 번호, 유사도) 반환. nprobe >= nlist면 전수 검색.
+        양자화 세그먼트는 k·rerank개 후보를 float32로 재채점 (rerank=0이면 근사 점수 그대로)."""
+        if not len(self) or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        nprobe = max(1, min(nprobe, self.nlist))
+        if nprobe >= self.nlist:
+            rows = np.arange(len(self), dtype=np.int64)
+            scores = self._scan(0, len(self), query)
+        else:
+            centroid_scores = self.centroids @ query
+            probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+            row_chunks = []
+            score_chunks = []
+            for c in probe:
+                start, end = int(self.offsets[c]), int(self.offsets[c + 1])
+                if start == end:
+                    continue
+                row_chunks.append(np.arange(start, end, dtype=np.int64))
+                score_chunks.append(self._scan(start, end, query))
+            if not row_chunks:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            rows = np.concatenate(row_chunks)
+            scores = np.concatenate(score_chunks)
+
+        if self.codes is not None and rerank > 0:
+            # 근사 점수 상위 후보만 원본 벡터로 재채점 (행 번호 순으로 읽어 mmap 지역성 확보)
+            n = min(k * rerank, len(scores))
+            cand = np.sort(rows[np.argpartition(-scores, n - 1)[:n]])
+            rows = cand
+            scores = np.asarray(self.vectors[cand] @ query, dtype=np.float32)
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return rows[top], scores[top]
+
+
+def _spherical_kmeans(vectors: np.ndarray, nlist: int, iterations: int = 15, seed: int = 42) -> np.ndarray:
+    """코사인 기준 k-means. 학습 샘플은 최대 50,000행."""
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if len(vectors) > 50_000:
+        sample = vectors[rng.choice(len(vectors), 50_000, replace=False)]
+
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = sample[assign == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+            else:
+                # 빈 클러스터는 임의 행으로 재초기화
+                centroids[c] = sample[rng.integers(len(sample))]
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        centroids /= np.where(norms == 0, 1, norms)
+    return centroids.astype(np.float32)
+
+
+def default_nlist(n: int) -> int:
+    """행 수 기반 클러스터 수 (≈ 2·√n, 1~1024)"""
+    if n <= 0:
+        return 1
+    return max(1, min(1024, int(2 * math.sqrt(n)), n))
+
+
+def build_ivf_segment(
+    vectors: np.ndarray,
+    meta: list[dict],
+    nlist: int | None = None,
+    quantization: str = "none",
+) -> IvfSegment:
+    """정규화된 (n, dim) 벡터로 IVF 세그먼트 생성"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    # --nlist가 카테고리 행 수보다 크면 k-means 초기 중심을 뽑을 수 없으므로 행 수로 제한
+    nlist = min(nlist or default_nlist(len(vectors)), len(vectors))
+    centroids = _spherical_kmeans(vectors, nlist)
+
+    assign = np.argmax(vectors @ centroids.T, axis=1)
+    order = np.argsort(assign, kind="stable")
+    counts = np.bincount(assign, minlength=nlist)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    ordered = np.ascontiguousarray(vectors[order])
+    codes, scales = quantize(ordered, quantization)
+    return IvfSegment(ordered, centroids, offsets, [meta[i] for i in order], codes, scales)
+
+
+def save_snapshot(root: str, segments: dict[str, IvfSegment], watermark: str | None) -> str:
+    """버전 디렉터리에 스냅샷 저장 후 LATEST 갱신. 버전 이름 반환."""
+    version = "v" + datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    out_dir = os.path.join(root, version)
+    os.makedirs(out_dir, exist_ok=True)
+
+    files = []
+    categories = {}
+    dim = 0
+    for category, seg in segments.items():
+        np.save(os.path.join(out_dir, f"{category}.vectors.npy"), seg.vectors)
+        np.save(os.path.join(out_dir, f"{category}.centroids.npy"), seg.centroids)
+        np.save(os.path.join(out_dir, f"{category}.offsets.npy"), seg.offsets)
+        with open(os.path.join(out_dir, f"{category}.meta.json"), "w", encoding="utf-8") as f:
+            json.dump(seg.meta, f, ensure_ascii=False)
+        files += [f"{category}.{name}" for name in ("vectors.npy", "centroids.npy", "offsets.npy", "meta.json")]
+        if seg.codes is not None:
+            np.save(os.path.join(out_dir, f"{category}.codes.npy"), seg.codes)
+            files.append(f"{category}.codes.npy")
+        if seg.scales is not None:
+            np.save(os.path.join(out_dir, f"{category}.scales.npy"), seg.scales)
+            files.append(f"{category}.scales.npy")
+        categories[category] = {"count": len(seg), "nlist": seg.nlist, "quantization": seg.quantization}
+        dim = seg.vectors.shape[1] if len(seg) else dim
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "watermark": watermark,
+        "dim": dim,
+        "categories": categories,
+        "files": files,
+    }
+    with open(os.path.join(out_dir, _MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    # LATEST는 모든 파일 기록 후 원자적으로 교체
+    tmp = os.path.join(root, _LATEST_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(root, _LATEST_FILE))
+    return version
+
+
+def load_snapshot(root: str, version: str | None = None) -> tuple[dict[str, IvfSegment], dict] | None:
+    """스냅샷을 mmap으로 로드. 없거나 포맷이 다르면 None."""
+    if version is None:
+        latest = os.path.join(root, _LATEST_FILE)
+        if not os.path.exists(latest):
+            return None
+        with open(latest) as f:
+            version = f.read().strip()
+
+    snap_dir = os.path.join(root, version)
+    manifest_path = os.path.join(snap_dir, _MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") not in _SUPPORTED_FORMATS:
+        logger.warning(f"[ANN] Unsupported snapshot format {manifest.get('format_version')} in {version}")
+        return None
+
+    start = time.time()
+    segments = {}
+    for category in manifest["categories"]:
+        base = os.path.join(snap_dir, category)
+        with open(f"{base}.meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+        codes = np.load(f"{base}.codes.npy", mmap_mode="r") if os.path.exists(f"{base}.codes.npy") else None
+        scales = np.load(f"{base}.scales.npy") if os.path.exists(f"{base}.scales.npy") else None
+        segments[category] = IvfSegment(
+            np.load(f"{base}.vectors.npy", mmap_mode="r"),
+            np.load(f"{base}.centroids.npy"),
+            np.load(f"{base}.offsets.npy"),
+            meta,
+            codes,
+            scales,
+        )
+    duration = int((time.time() - start) * 1000)
+    logger.info(f"[ANN] Mapped snapshot {version} ({manifest['categories']}) in {duration}ms")
+    return segments, manifest
+
+
+def upload_snapshot(root: str, version: str, bucket: str):
+    """스냅샷을 Supabase Storage에 업로드 (Cloud Run 인스턴스 배포용)"""
+    from services.supabase_client import get_supabase
+
+    storage = get_supabase().storage.from_(bucket)
+    snap_dir = os.path.join(root, version)
+    with open(os.path.join(snap_dir, _MANIFEST_FILE), encoding="utf-8") as f:
+        manifest = json.load(f)
+    for name in manifest["files"] + [_MANIFEST_FILE]:
+        with open(os.path.join(snap_dir, name), "rb") as f:
+            storage.upload(f"{version}/{name}", f.read(), {"upsert": "true"})
+    storage.upload(_LATEST_FILE, version.encode(), {"upsert": "true", "content-type": "text/plain"})
+
+
+def download_snapshot(root: str, bucket: str) -> str | None:
+    """Storage의 최신 스냅샷을 로컬 디렉터리로 내려받음. 이미 있으면 건너뜀."""
+    from services.supabase_client import get_supabase
+
+    storage = get_supabase().storage.from_(bucket)
+    version = storage.download(_LATEST_FILE).decode().strip()
+    snap_dir = os.path.join(root, version)
+    if os.path.exists(os.path.join(snap_dir, _MANIFEST_FILE)):
+        return version
+
+    os.makedirs(snap_dir, exist_ok=True)
+    manifest_bytes = storage.download(f"{version}/{_MANIFEST_FILE}")
+    manifest = json.loads(manifest_bytes)
+    for name in manifest["files"]:
+        with open(os.path.join(snap_dir, name), "wb") as f:
+            f.write(storage.download(f"{version}/{name}"))
+    # manifest를 마지막에 써서 불완전한 다운로드가 로드되지 않게 함
+    with open(os.path.join(snap_dir, _MANIFEST_FILE), "wb") as f:
+        f.write(manifest_bytes)
+    with open(os.path.join(root, _LATEST_FILE), "w") as f:
+        f.write(version)
+    return version
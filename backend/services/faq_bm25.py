@@ -0,0 +1,110 @@
+"""
+FAQ 어휘(BM25) 인덱스 — CJK n-gram 토크나이저.
+
+시술명(울쎄라, 하이푸, リジュラン 등)은 임베딩만으로는 매칭이 약하므로
+question / answer / procedure_name에 대한 BM25 점수를 벡터 검색과 RRF로 결합한다.
+
+토큰화 규칙:
+  - NFKC 정규화 + 소문자화 (반각 가나 → 전각, 전각 영숫자 → 반각)
+  - 한글/가나/한자 구간은 공백을 제거하고 문자 bigram ("코 성형" == "코성형" → 코성, 성형)
+    한 글자 구간은 unigram
+  - 라틴 문자/숫자는 단어 단위 (1글자 영문 제외)
+"""
+import re
+import unicodedata
+
+import numpy as np
+
+_CJK = r"ᄀ-ᇿ぀-ヿ㄰-㆏㐀-䶿一-鿿가-힯"
+_TOKEN_RE = re.compile(rf"([{_CJK}]+(?:\s+[{_CJK}]+)*)|([a-z0-9]+)")
+_SPACE_RE = re.compile(r"\s+")
+
+# 필드 가중치 (토큰 반복 횟수)
+_FIELD_WEIGHTS = (("procedure_name", 2), ("question", 1), ("answer", 1))
+
+
+def tokenize(text: str) -> list[str]:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    tokens: list[str] = []
+    for match in _TOKEN_RE.finditer(text):
+        cjk, word = match.groups()
+        if cjk:
+            run = _SPACE_RE.sub("", cjk)
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        elif len(word) > 1 or word.isdigit():
+            tokens.append(word)
+    return tokens
+
+
+def _is_word(token: str) -> bool:
+    return len(token) > 1 and token.isascii() and token.isalnum()
+
+
+def faq_tokens(faq: dict) -> list[str]:
+    tokens: list[str] = []
+    for field, weight in _FIELD_WEIGHTS:
+        field_tokens = tokenize(faq.get(field) or "")
+        for _ in range(weight):
+            tokens.extend(field_tokens)
+    return tokens
+
+
+class Bm25Index:
+    """메모리 역색인 BM25 (Okapi). 문서 순서는 meta 리스트와 동일."""
+
+    def __init__(self, meta: list[dict], k1: float = 1.2, b: float = 0.75):
+        self.meta = meta
+        self.k1 = k1
+        self.b = b
+
+        postings: dict[str, dict[int, int]] = {}
+        doc_len = np.zeros(len(meta), dtype=np.float32)
+        for doc, faq in enumerate(meta):
+            tokens = faq_tokens(faq)
+            doc_len[doc] = len(tokens)
+            for tok in tokens:
+                tf = postings.setdefault(tok, {})
+                tf[doc] = tf.get(doc, 0) + 1
+
+        n = max(len(meta), 1)
+        avgdl = float(doc_len.mean()) if len(meta) else 1.0
+        norm = self.k1 * (1 - self.b + self.b * doc_len / max(avgdl, 1e-6))
+
+        # 용어별 (문서 번호, 사전 계산된 BM25 가중치)
+        self._postings: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        for tok, tf_map in postings.items():
+            docs = np.fromiter(tf_map.keys(), dtype=np.int64, count=len(tf_map))
+            tf = np.fromiter(tf_map.values(), dtype=np.float32, count=len(tf_map))
+            idf = np.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            weights = idf * tf * (self.k1 + 1) / (tf + norm[docs])
+            self._postings[tok] = (docs, weights.astype(np.float32))
+
+    def __len__(self) -> int:
+        return len(self.meta)
+
+    def search(self, query: str, k: int) -> list[tuple[int, float, int]]:
+        """상위 k개 (문서 번호, 점수, 매칭 근거). 매칭 없는 문서는 제외.
+        매칭 근거 = 겹친 질의 토큰 수 (라틴 단어는 온전한 단어라 2, CJK bigram/unigram은 1)
+        → 1이면 bigram 하나만 우연히 겹친 것 ("코성" 등), 2 이상이면 시술명 등 단어 단위 매칭"""
+        terms = set(tokenize(query))
+        if not terms or not len(self.meta) or k <= 0:
+            return []
+        scores = np.zeros(len(self.meta), dtype=np.float32)
+        evidence = np.zeros(len(self.meta), dtype=np.int32)
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                docs, weights = posting
+                scores[docs] += weights
+                evidence[docs] += 2 if _is_word(term) else 1
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        k = min(k, len(matched))
+        top = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i]), int(evidence[i])) for i in top]
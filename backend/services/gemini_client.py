@@ -6,7 +6,7 @@ import re
 import struct
 import google.generativeai as genai
 from google import genai as genai_new
-from config import GEMINI_API_KEY
+from config import GEMINI_API_KEY, EMBEDDING_DIM, EMBEDDING_REDUCED_DIMS
 
 logger = logging.getLogger(__name__)
 
@@ -166,11 +166,44 @@ def _sync_embed_content(model_name: str, content: str, task_type: str, dims: int
     )
 
 
+# ============================================
+# Matryoshka 차원 — faq_vectors 컬럼 매핑
+# ============================================
+FULL_EMBEDDING_DIM = 768
+
+
+def embedding_column(dims: int = EMBEDDING_DIM) -> str:
+    """차원 → faq_vectors 컬럼명 (768: embedding, 그 외: embedding_{dims})"""
+    if dims == FULL_EMBEDDING_DIM:
+        return "embedding"
+    if dims not in EMBEDDING_REDUCED_DIMS:
+        raise ValueError(f"Unsupported embedding dimension: {dims}")
+    return f"embedding_{dims}"
+
+
+def truncate_embedding(vec: list[float], dims: int) -> list[float]:
+    """Matryoshka 축소: 앞 dims개만 남기고 L2 정규화"""
+    head = vec[:dims]
+    norm = sum(v * v for v in head) ** 0.5
+    if norm == 0:
+        return list(head)
+    return [v / norm for v in head]
+
+
+def embedding_columns(vec: list[float]) -> dict:
+    """768차원 문서 임베딩 → faq_vectors 저장용 컬럼 dict (embedding + 축소 컬럼 전부)"""
+    columns = {"embedding": vec}
+    for dims in EMBEDDING_REDUCED_DIMS:
+        columns[embedding_column(dims)] = truncate_embedding(vec, dims)
+    return columns
+
+
 async def get_embedding(text: str) -> list[float]:
+    """문서 임베딩 (항상 768차원 — 축소 컬럼은 embedding_columns로 파생)"""
     for attempt in range(3):
         try:
             result = await asyncio.to_thread(
-                _sync_embed_content, _embedding_model, text, "retrieval_document", 768
+                _sync_embed_content, _embedding_model, text, "retrieval_document", FULL_EMBEDDING_DIM
             )
             return result["embedding"]
         except Exception as e:
@@ -181,11 +214,12 @@ async def get_embedding(text: str) -> list[float]:
                 raise
 
 
-async def get_query_embedding(text: str) -> list[float]:
+async def get_query_embedding(text: str, dims: int = EMBEDDING_DIM) -> list[float]:
+    """검색 쿼리 임베딩 (EMBEDDING_DIM 차원 — 검색 컬럼과 일치)"""
     for attempt in range(3):
         try:
             result = await asyncio.to_thread(
-                _sync_embed_content, _embedding_model, text, "retrieval_query", 768
+                _sync_embed_content, _embedding_model, text, "retrieval_query", dims
             )
             return result["embedding"]
         except Exception as e:
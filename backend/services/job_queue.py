@@ -0,0 +1,264 @@
+"""
+파이프라인 작업 큐 — pipeline_jobs 테이블 (migration 015) 기반.
+
+- enqueue(): API에서 호출. 작업을 적재만 하고 바로 반환 (같은 dedup_key의 진행 중 작업이 있으면 재사용)
+- JobWorker: 별도 프로세스(worker.py)에서 실행
+  - claim_pipeline_jobs RPC로 동시성 여유만큼 점유 (SKIP LOCKED, 임대 만료 작업 재점유 포함)
+  - 처리 중 LEASE/3마다 heartbeat로 임대 연장 — 연장 실패(다른 워커로 넘어감) 시 작업 취소
+  - 핸들러 예외 → fail_pipeline_job (지수 백오프 후 재시도, 시도 소진 시 failed)
+  - stop(): 새 점유 중단, 진행 중 작업은 취소 후 반납 (다른 인스턴스가 즉시 재점유)
+
+핸들러는 멱등이어야 함 — 임대 만료/재시도로 같은 작업이 다시 실행될 수 있음
+(핸들러 안에서 current_attempt()로 재시도 여부 확인 — 재시도일 때만 체크포인트 재사용 등)
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from config import (
+    JOB_WORKER_CONCURRENCY,
+    JOB_LEASE_SEC,
+    JOB_POLL_INTERVAL_SEC,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BASE_SEC,
+)
+from services.supabase_client import get_supabase
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[..., Awaitable[None]]
+
+_RETRY_MAX_SEC = 3600
+
+# 실행 중인 작업의 시도 횟수 (핸들러 태스크에 복사됨, 큐 밖에서 호출되면 0)
+_current_attempt: contextvars.ContextVar[int] = contextvars.ContextVar("job_attempt", default=0)
+
+
+def current_attempt() -> int:
+    return _current_attempt.get()
+
+
+def enqueue(
+    kind: str,
+    payload: dict,
+    dedup_key: str | None = None,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+) -> str | None:
+    """작업 적재. Returns: 작업 id (dedup으로 기존 작업을 재사용한 경우 그 id)"""
+    db = get_supabase()
+    result = db.rpc("enqueue_pipeline_job", {
+        "p_kind": kind,
+        "p_payload": payload,
+        "p_dedup_key": dedup_key,
+        "p_max_attempts": max_attempts,
+    }).execute()
+    if not result.data:
+        return None
+    row = result.data[0]
+    if row["created"]:
+        logger.info(f"[Jobs] enqueued {kind} {row['job_id'][:8]} ({dedup_key or '-'})")
+    else:
+        logger.info(f"[Jobs] {kind} already queued as {row['job_id'][:8]} ({dedup_key})")
+    return row["job_id"]
+
+
+def queue_stats() -> dict:
+    """상태별 작업 수 (/health/jobs)"""
+    db = get_supabase()
+    stats = {}
+    for status in ("queued", "running", "failed"):
+        result = (
+            db.table("pipeline_jobs").select("id", count="exact")
+            .eq("status", status).limit(1).execute()
+        )
+        stats[status] = result.count or 0
+    return stats
+
+
+def retry_delay(attempts: int) -> int:
+    return min(_RETRY_MAX_SEC, JOB_RETRY_BASE_SEC * (2 ** max(0, attempts - 1)))
+
+
+class JobWorker:
+    def __init__(
+        self,
+        handlers: dict[str, JobHandler],
+        concurrency: int = JOB_WORKER_CONCURRENCY,
+        lease_sec: int = JOB_LEASE_SEC,
+        poll_interval: float = JOB_POLL_INTERVAL_SEC,
+        worker_id: str | None = None,
+    ):
+        self.handlers = handlers
+        self.concurrency = max(1, concurrency)
+        self.lease_sec = lease_sec
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._active: dict[asyncio.Task, dict] = {}
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        self.started_at = time.time()
+        self.claimed = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.released = 0
+        self.lost_leases = 0
+
+    # ------------------------------------------
+    # 메인 루프
+    # ------------------------------------------
+    async def run(self):
+        logger.info(f"[Jobs] worker {self.worker_id} started (concurrency={self.concurrency}, lease={self.lease_sec}s)")
+        while not self._stopping.is_set():
+            free = self.concurrency - len(self._active)
+            jobs = []
+            if free > 0:
+                try:
+                    jobs = await self._claim(free)
+                except Exception as e:
+                    logger.warning(f"[Jobs] claim failed: {e}")
+            for job in jobs:
+                task = asyncio.create_task(self._execute(job))
+                self._active[task] = job
+                task.add_done_callback(self._on_done)
+            # 작업 완료(여유 생김) 또는 폴링 주기까지 대기
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+        await self._release_active()
+        logger.info(f"[Jobs] worker {self.worker_id} stopped ({self.stats()})")
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup.set()
+
+    def _on_done(self, task: asyncio.Task):
+        self._active.pop(task, None)
+        self._wakeup.set()
+
+    async def _claim(self, limit: int) -> list[dict]:
+        db = get_supabase()
+        result = await asyncio.to_thread(
+            lambda: db.rpc("claim_pipeline_jobs", {
+                "p_worker": self.worker_id,
+                "p_limit": limit,
+                "p_lease_seconds": self.lease_sec,
+            }).execute()
+        )
+        jobs = result.data or []
+        self.claimed += len(jobs)
+        return jobs
+
+    # ------------------------------------------
+    # 작업 실행
+    # ------------------------------------------
+    async def _execute(self, job: dict):
+        job_id, kind = job["id"], job["kind"]
+        tag = f"{kind} {job_id[:8]} (attempt {job['attempts']}/{job['max_attempts']})"
+        handler = self.handlers.get(kind)
+        if handler is None:
+            await self._fail(job, f"unknown job kind: {kind}")
+            return
+
+        logger.info(f"[Jobs] start {tag}")
+        start = time.time()
+        _current_attempt.set(job["attempts"])
+        run = asyncio.create_task(handler(**(job.get("payload") or {})))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, run))
+        try:
+            await run
+        except asyncio.CancelledError:
+            if self._stopping.is_set():
+                raise  # 종료 중 — _release_active에서 반납
+            logger.warning(f"[Jobs] {tag} cancelled (lease lost)")
+            return
+        except Exception as e:
+            duration = int((time.time() - start) * 1000)
+            logger.error(f"[Jobs] {tag} failed ({duration}ms): {e}", exc_info=True)
+            await self._fail(job, str(e))
+            return
+        finally:
+            heartbeat.cancel()
+
+        duration = int((time.time() - start) * 1000)
+        try:
+            db = get_supabase()
+            await asyncio.to_thread(
+                lambda: db.rpc("complete_pipeline_job", {"p_job_id": job_id, "p_worker": self.worker_id}).execute()
+            )
+        except Exception as e:
+            logger.error(f"[Jobs] {tag} done but complete failed: {e}")
+        self.succeeded += 1
+        logger.info(f"[Jobs] done {tag} ({duration}ms)")
+
+    async def _heartbeat(self, job_id: str, run: asyncio.Task):
+        db = get_supabase()
+        while True:
+            await asyncio.sleep(max(1, self.lease_sec // 3))
+            try:
+                result = await asyncio.to_thread(
+                    lambda: db.rpc("heartbeat_pipeline_job", {
+                        "p_job_id": job_id,
+                        "p_worker": self.worker_id,
+                        "p_lease_seconds": self.lease_sec,
+                    }).execute()
+                )
+            except Exception as e:
+                logger.warning(f"[Jobs] heartbeat failed for {job_id[:8]}: {e}")
+                continue  # 일시 오류 — 임대가 남아 있는 동안 다음 주기에 재시도
+            if result.data is False:
+                # 임대가 만료되어 다른 워커가 가져감 — 중복 실행 방지를 위해 중단
+                self.lost_leases += 1
+                run.cancel()
+                return
+
+    async def _fail(self, job: dict, error: str, release: bool = False):
+        if not release:
+            self.failed += 1
+        try:
+            db = get_supabase()
+            result = await asyncio.to_thread(
+                lambda: db.rpc("fail_pipeline_job", {
+                    "p_job_id": job["id"],
+                    "p_worker": self.worker_id,
+                    "p_error": error[:2000],
+                    "p_retry_seconds": retry_delay(job["attempts"]),
+                    "p_release": release,
+                }).execute()
+            )
+            if not release:
+                logger.info(f"[Jobs] {job['kind']} {job['id'][:8]} → {result.data}")
+        except Exception as e:
+            logger.error(f"[Jobs] could not record failure for {job['id'][:8]}: {e}")
+
+    async def _release_active(self):
+        """종료 시 진행 중 작업 취소 + 반납 (임대 만료를 기다리지 않고 다른 인스턴스가 재점유)"""
+        if not self._active:
+            return
+        jobs = list(self._active.items())
+        logger.info(f"[Jobs] releasing {len(jobs)} running jobs")
+        for task, _ in jobs:
+            task.cancel()
+        await asyncio.gather(*(task for task, _ in jobs), return_exceptions=True)
+        for _, job in jobs:
+            await self._fail(job, "worker shutdown", release=True)
+            self.released += 1
+
+    def stats(self) -> dict:
+        return {
+            "worker_id": self.worker_id,
+            "uptime_sec": int(time.time() - self.started_at),
+            "active": len(self._active),
+            "concurrency": self.concurrency,
+            "claimed": self.claimed,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "released": self.released,
+            "lost_leases": self.lost_leases,
+        }
@@ -1,11 +1,139 @@
+import logging
+import threading
+import time
+
+import httpx
 from supabase import create_client, Client
-from config import SUPABASE_URL, SUPABASE_SERVICE_KEY
+from supabase.lib.client_options import SyncClientOptions
+from config import (
+    SUPABASE_URL,
+    SUPABASE_SERVICE_KEY,
+    SUPABASE_HTTP2,
+    SUPABASE_MAX_CONNECTIONS,
+    SUPABASE_MAX_KEEPALIVE,
+    SUPABASE_KEEPALIVE_EXPIRY,
+    SUPABASE_CONNECT_TIMEOUT,
+    SUPABASE_REQUEST_TIMEOUT,
+    SUPABASE_POOL_TIMEOUT,
+)
+
+logger = logging.getLogger(__name__)
 
 _client: Client | None = None
 
 
+class _PoolStats:
+    """커넥션 풀 사용 현황 (스레드 풀에서 동시에 갱신되므로 lock 사용)"""
+
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_requests = 0
+        self.saturated_requests = 0  # 요청 시작 시점에 풀이 가득 차 있던 횟수
+        self.pool_timeouts = 0
+        self.errors = 0
+        self.total_ms = 0.0
+
+    def start(self):
+        with self._lock:
+            if self.in_flight >= self.max_connections:
+                self.saturated_requests += 1
+            self.in_flight += 1
+            self.total_requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def finish(self, elapsed_ms: float, error: Exception | None = None):
+        with self._lock:
+            self.in_flight -= 1
+            self.total_ms += elapsed_ms
+            if isinstance(error, httpx.PoolTimeout):
+                self.pool_timeouts += 1
+            elif error is not None:
+                self.errors += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.total_requests
+            return {
+                "max_connections": self.max_connections,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "utilization": round(self.in_flight / self.max_connections, 3) if self.max_connections else 0,
+                "total_requests": total,
+                "saturated_requests": self.saturated_requests,
+                "saturation_rate": round(self.saturated_requests / total, 4) if total else 0,
+                "pool_timeouts": self.pool_timeouts,
+                "errors": self.errors,
+                "avg_ms": round(self.total_ms / total, 1) if total else 0,
+            }
+
+
+class _InstrumentedTransport(httpx.BaseTransport):
+    """HTTPTransport를 감싸 요청 단위로 풀 사용량을 기록"""
+
+    def __init__(self, transport: httpx.BaseTransport, stats: _PoolStats):
+        self._transport = transport
+        self._stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._stats.start()
+        start = time.perf_counter()
+        error = None
+        try:
+            return self._transport.handle_request(request)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._stats.finish((time.perf_counter() - start) * 1000, error)
+
+    def close(self):
+        self._transport.close()
+
+
+_pool_stats = _PoolStats(SUPABASE_MAX_CONNECTIONS)
+
+
+def _build_http_client(stats: _PoolStats) -> httpx.Client:
+    limits = httpx.Limits(
+        max_connections=SUPABASE_MAX_CONNECTIONS,
+        max_keepalive_connections=SUPABASE_MAX_KEEPALIVE,
+        keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        SUPABASE_REQUEST_TIMEOUT,
+        connect=SUPABASE_CONNECT_TIMEOUT,
+        pool=SUPABASE_POOL_TIMEOUT,
+    )
+    transport = httpx.HTTPTransport(http2=SUPABASE_HTTP2, limits=limits, retries=1)
+    return httpx.Client(
+        transport=_InstrumentedTransport(transport, stats),
+        timeout=timeout,
+        follow_redirects=True,
+    )
+
+
+def create_supabase_client(tuned: bool = True) -> Client:
+    """Supabase 클라이언트 생성. tuned=False면 라이브러리 기본 설정 (벤치마크 비교용)."""
+    if not tuned:
+        return create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+    options = SyncClientOptions(httpx_client=_build_http_client(_pool_stats))
+    return create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY, options=options)
+
+
 def get_supabase() -> Client:
     global _client
     if _client is None:
-        _client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+        _client = create_supabase_client()
+        logger.info(
+            f"[Supabase] HTTP pool ready (http2={SUPABASE_HTTP2}, "
+            f"max_conn={SUPABASE_MAX_CONNECTIONS}, keepalive={SUPABASE_MAX_KEEPALIVE})"
+        )
     return _client
+
+
+def get_pool_stats() -> dict:
+    """공유 커넥션 풀 사용 현황 (포화율, 최대 동시 요청 수 등)"""
+    return _pool_stats.snapshot()
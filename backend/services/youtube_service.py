@@ -7,6 +7,7 @@ from googleapiclient.discovery import build
 from youtube_transcript_api import YouTubeTranscriptApi
 
 from config import YOUTUBE_API_KEY, GEMINI_API_KEY
+from services.gemini_client import embedding_columns
 from services.supabase_client import get_supabase
 
 
@@ -576,7 +577,7 @@ def embed_all_faqs():
                 embedding = generate_embedding(faq["question"])
 
                 _db_retry(lambda fid=faq["id"], emb=embedding: (
-                    db.table("faq_vectors").update({"embedding": emb}).eq(
+                    db.table("faq_vectors").update(embedding_columns(emb)).eq(
                         "id", fid
                     ).execute()
                 ))
@@ -0,0 +1,234 @@
+"""
+services/chat_persistence.py — 세션별 순서/배치, 재시도 시 upsert 중복 방지, drain/flush.
+
+Supabase 대신 요청을 기록하는 가짜 클라이언트를 주입해 실행 (네트워크 없음).
+
+사용법:
+  cd backend
+  python -m pytest -q
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services import chat_persistence as persistence_module
+from services.chat_persistence import ChatPersistence
+
+
+# ============================================
+# 가짜 Supabase 클라이언트
+# ============================================
+class _Query:
+    def __init__(self, db: "_FakeDB", table: str):
+        self.db = db
+        self.table = table
+        self.op = None
+        self.rows: list[dict] = []
+        self.values: dict = {}
+        self.options: dict = {}
+        self.filters: dict = {}
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False):
+        self.op = "upsert"
+        self.rows = [dict(r) for r in rows]
+        self.options = {"on_conflict": on_conflict, "ignore_duplicates": ignore_duplicates}
+        return self
+
+    def update(self, values):
+        self.op = "update"
+        self.values = dict(values)
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def execute(self):
+        return self.db.execute(self)
+
+
+class _FakeDB:
+    """upsert(on_conflict="id", ignore_duplicates=True)를 id 기준으로 흉내냄.
+    lose_responses: 쓰기는 반영하고 응답만 실패시키는 횟수 (타임아웃 후 재시도 상황)
+    reject: 항상 실패시키는 행 content (배치 → 행 단위 재시도 확인용)"""
+
+    def __init__(self, lose_responses: int = 0, reject: set[str] | None = None, delay: float = 0.0):
+        self.lose_responses = lose_responses
+        self.reject = reject or set()
+        self.delay = delay
+        self.rows: dict[str, list[dict]] = {}
+        self.sessions: dict[str, dict] = {}
+        self.requests: list[tuple] = []
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def execute(self, query: _Query):
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            if query.op == "upsert":
+                self.requests.append(("upsert", query.table, [r["content"] for r in query.rows], query.options))
+                if any(r["content"] in self.reject for r in query.rows):
+                    raise RuntimeError("rejected row")
+                stored = self.rows.setdefault(query.table, [])
+                ids = {r["id"] for r in stored}
+                for row in query.rows:
+                    if row["id"] not in ids:
+                        stored.append(row)
+            else:
+                self.requests.append(("update", query.table, query.values))
+                self.sessions.setdefault(query.filters["id"], {}).update(query.values)
+            if self.lose_responses:
+                self.lose_responses -= 1
+                raise TimeoutError("response lost")
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = _FakeDB()
+    monkeypatch.setattr(persistence_module, "get_supabase", lambda: db)
+    monkeypatch.setattr(persistence_module, "_RETRY_BASE_SEC", 0)
+    return db
+
+
+def _contents(db: _FakeDB, session_id: str) -> list[str]:
+    return [r["content"] for r in db.rows.get("chat_messages", []) if r["session_id"] == session_id]
+
+
+# ============================================
+# 순서 / 배치
+# ============================================
+def test_consecutive_inserts_batched_in_session_order(fake_db):
+    async def scenario():
+        store = ChatPersistence(batch_size=20, max_retries=2)
+        store.add_message("s1", "user", "q1")
+        store.add_message("s1", "assistant", "a1")
+        store.update_session("s1", {"cta_level": "warm"})
+        store.update_session("s1", {"status": "active"})
+        store.add_message("s1", "user", "q2")
+        store.add_message("s1", "assistant", "a2")
+        await store.drain("s1")
+        return store
+
+    store = asyncio.run(scenario())
+    assert fake_db.requests == [
+        ("upsert", "chat_messages", ["q1", "a1"], {"on_conflict": "id", "ignore_duplicates": True}),
+        ("update", "chat_sessions", {"cta_level": "warm", "status": "active"}),
+        ("upsert", "chat_messages", ["q2", "a2"], {"on_conflict": "id", "ignore_duplicates": True}),
+    ]
+    assert _contents(fake_db, "s1") == ["q1", "a1", "q2", "a2"]
+    assert fake_db.sessions["s1"] == {"cta_level": "warm", "status": "active"}
+    assert store.stats()["written_rows"] == 5
+    assert store.stats()["queued_ops"] == 0
+
+
+def test_batch_size_splits_inserts(fake_db):
+    async def scenario():
+        store = ChatPersistence(batch_size=2, max_retries=0)
+        for i in range(5):
+            store.add_message("s1", "user", f"m{i}")
+        await store.drain("s1")
+
+    asyncio.run(scenario())
+    assert [r[2] for r in fake_db.requests] == [["m0", "m1"], ["m2", "m3"], ["m4"]]
+    assert _contents(fake_db, "s1") == ["m0", "m1", "m2", "m3", "m4"]
+
+
+def test_sessions_keep_their_own_order(fake_db):
+    async def scenario():
+        store = ChatPersistence(batch_size=1, max_retries=0)
+        for i in range(3):
+            store.add_message("s1", "user", f"a{i}")
+            store.add_message("s2", "user", f"b{i}")
+        await asyncio.gather(store.drain("s1"), store.drain("s2"))
+
+    asyncio.run(scenario())
+    assert _contents(fake_db, "s1") == ["a0", "a1", "a2"]
+    assert _contents(fake_db, "s2") == ["b0", "b1", "b2"]
+
+
+# ============================================
+# 재시도
+# ============================================
+def test_retry_after_lost_response_does_not_duplicate(fake_db):
+    fake_db.lose_responses = 1
+
+    async def scenario():
+        store = ChatPersistence(batch_size=20, max_retries=2)
+        row = store.add_message("s1", "user", "q1")
+        store.add_message("s1", "assistant", "a1")
+        await store.drain("s1")
+        return store, row
+
+    store, row = asyncio.run(scenario())
+    assert len(fake_db.requests) == 2  # 첫 요청은 반영됐지만 응답 유실 → 같은 id로 재시도
+    assert _contents(fake_db, "s1") == ["q1", "a1"]
+    assert fake_db.rows["chat_messages"][0]["id"] == row["id"]
+    assert store.stats()["retries"] == 1
+    assert store.stats()["failed"] == 0
+
+
+def test_failed_batch_falls_back_to_single_rows(fake_db):
+    fake_db.reject = {"bad"}
+
+    async def scenario():
+        store = ChatPersistence(batch_size=20, max_retries=1)
+        store.add_message("s1", "user", "q1")
+        store.add_message("s1", "user", "bad")
+        store.add_message("s1", "assistant", "a1")
+        await store.drain("s1")
+        return store
+
+    store = asyncio.run(scenario())
+    assert _contents(fake_db, "s1") == ["q1", "a1"]
+    assert store.stats()["failed"] == 1
+
+
+# ============================================
+# drain / flush
+# ============================================
+def test_drain_unknown_session_returns_immediately(fake_db):
+    async def scenario():
+        store = ChatPersistence(batch_size=20, max_retries=0)
+        await asyncio.wait_for(store.drain("missing"), timeout=1)
+
+    asyncio.run(scenario())
+    assert fake_db.requests == []
+
+
+def test_flush_writes_all_sessions(fake_db):
+    fake_db.delay = 0.01
+
+    async def scenario():
+        store = ChatPersistence(batch_size=1, max_retries=0)
+        for sid in ("s1", "s2", "s3"):
+            store.add_message(sid, "user", f"{sid}-q")
+            store.add_message(sid, "assistant", f"{sid}-a")
+        left = await store.flush(timeout=5)
+        return store, left
+
+    store, left = asyncio.run(scenario())
+    assert left == 0
+    assert store.stats()["active_sessions"] == 0
+    for sid in ("s1", "s2", "s3"):
+        assert _contents(fake_db, sid) == [f"{sid}-q", f"{sid}-a"]
+
+
+def test_flush_timeout_reports_unwritten_ops(fake_db):
+    fake_db.delay = 0.2
+
+    async def scenario():
+        store = ChatPersistence(batch_size=1, max_retries=0)
+        for i in range(4):
+            store.add_message("s1", "user", f"m{i}")
+        left = await store.flush(timeout=0.05)
+        await store.drain("s1")  # 테스트 종료 전 남은 쓰기 정리
+        return left
+
+    left = asyncio.run(scenario())
+    assert left == 3  # 첫 행은 쓰는 중(큐에서 꺼냄), 나머지 3건이 대기
+    assert _contents(fake_db, "s1") == ["m0", "m1", "m2", "m3"]
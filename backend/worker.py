@@ -0,0 +1,143 @@
+"""
+파이프라인 작업 워커 — pipeline_jobs(migration 015)에서 작업을 점유해 실행.
+
+API 인스턴스와 분리해 배포하면 요청 처리와 리포트 생성 처리량을 따로 확장할 수 있음.
+SIGTERM 시 새 점유를 멈추고 진행 중 작업을 반납 → 다른 워커가 즉시 이어받음.
+PORT 환경변수가 있으면 /health 를 같이 띄움 (Cloud Run 서비스로 배포 시 필요).
+
+사용법:
+  cd backend
+  python worker.py                       # JOB_WORKER_CONCURRENCY (기본 4)
+  python worker.py --concurrency 8
+  PORT=8080 python worker.py             # /health (워커 통계 + 큐 현황)
+"""
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import signal
+import sys
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    stream=sys.stdout,
+)
+logging.getLogger("google").setLevel(logging.WARNING)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("urllib3").setLevel(logging.WARNING)
+
+from config import JOB_WORKER_CONCURRENCY
+from services.supabase_client import get_supabase
+from services.job_queue import JobWorker, queue_stats, current_attempt
+from agents.pipeline import run_pipeline, resume_pipeline, regenerate_report
+
+logger = logging.getLogger("worker")
+
+
+# ============================================
+# 작업 핸들러 (kind → 코루틴). 예외를 던지면 백오프 후 재시도
+# ============================================
+def _raise_if_failed(consultation_id: str):
+    """파이프라인은 실패를 report_failed 상태로 남기고 반환 → 재시도되도록 예외로 변환"""
+    db = get_supabase()
+    row = (
+        db.table("consultations").select("status, error_message")
+        .eq("id", consultation_id).limit(1).execute()
+    ).data
+    if row and row[0]["status"] == "report_failed":
+        raise RuntimeError(row[0].get("error_message") or "pipeline failed")
+
+
+async def _finish_pipeline(consultation_id: str):
+    """pipeline:{id} 키 작업 공통 마무리 — 실패면 재시도, 성공이면 관리자 send-email로 예약된 이메일 발송
+    (send-email이 진행 중인 작업에 합류한 경우 어느 핸들러든 이 작업이 발송을 맡음)"""
+    from api.chat import _send_pending_report_email
+    _raise_if_failed(consultation_id)
+    await _send_pending_report_email(consultation_id)
+
+
+async def _pipeline(consultation_id: str):
+    # 관리자 생성 요청은 처음부터, 큐 재시도만 체크포인트 재사용 (실패한 뒤쪽 스텝부터 다시 실행)
+    await run_pipeline(consultation_id, resume=current_attempt() > 1)
+    await _finish_pipeline(consultation_id)
+
+
+async def _resume_pipeline(consultation_id: str, classification: str):
+    await resume_pipeline(consultation_id, classification)
+    await _finish_pipeline(consultation_id)
+
+
+async def _regenerate_report(report_id: str, direction: str):
+    # 재생성 실패는 리포트를 rejected로 남김 (관리자가 방향을 바꿔 다시 요청) — 재시도하지 않음
+    await regenerate_report(report_id, direction)
+
+
+async def _chat_pipeline(consultation_id: str, session_id: str):
+    from api.chat import _run_pipeline_and_auto_approve
+    await _run_pipeline_and_auto_approve(consultation_id, session_id)
+    await _finish_pipeline(consultation_id)
+
+
+async def _pipeline_email(consultation_id: str, session_id: str):
+    from api.chat import _run_pipeline_and_email
+    await _run_pipeline_and_email(consultation_id, session_id)
+    await _finish_pipeline(consultation_id)
+
+
+JOB_HANDLERS = {
+    "pipeline": _pipeline,
+    "resume_pipeline": _resume_pipeline,
+    "regenerate_report": _regenerate_report,
+    "chat_pipeline": _chat_pipeline,
+    "pipeline_email": _pipeline_email,
+}
+
+
+# ============================================
+# 실행
+# ============================================
+async def _serve_health(worker: JobWorker, port: int):
+    import uvicorn
+    from fastapi import FastAPI
+
+    app = FastAPI(title="ARUMI worker")
+
+    @app.get("/health")
+    async def health():
+        try:
+            queue = await asyncio.to_thread(queue_stats)
+        except Exception as e:
+            queue = {"error": str(e)}
+        return {"status": "ok", "worker": worker.stats(), "queue": queue}
+
+    server = uvicorn.Server(uvicorn.Config(app, host="0.0.0.0", port=port, log_level="warning"))
+    server.capture_signals = contextlib.nullcontext  # 시그널은 main에서 처리 (워커 정지 → 작업 반납)
+    await server.serve()
+
+
+async def main(args):
+    worker = JobWorker(JOB_HANDLERS, concurrency=args.concurrency)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+
+    health = None
+    port = os.getenv("PORT")
+    if port:
+        health = asyncio.create_task(_serve_health(worker, int(port)))
+
+    await worker.run()
+
+    if health:
+        health.cancel()
+        await asyncio.gather(health, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="파이프라인 작업 워커")
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKER_CONCURRENCY, help="동시 실행 작업 수")
+    args = parser.parse_args()
+    asyncio.run(main(args))
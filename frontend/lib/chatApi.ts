@@ -40,8 +40,11 @@ export interface SendMessageResponse {
   pending_email?: string;
 }
 
+export type VoiceMode = "fast" | "full";
+
 export interface VoiceMessageResponse extends SendMessageResponse {
   transcribed_text: string;
+  voice_mode?: VoiceMode;
   audio_base64: string | null;
   audio_format: string | null;
 }
@@ -94,6 +97,31 @@ async function fetchChatAPI<T>(
   return res.json();
 }
 
+/**
+ * 메시지 1건당 멱등 키 — 재전송 시 같은 키를 보내면 서버가 처리 중인 턴에 합류하거나
+ * 완료된 결과를 재사용 (같은 메시지가 두 번 처리되지 않음)
+ */
+function newIdempotencyKey(): string {
+  if (typeof crypto !== "undefined" && typeof crypto.randomUUID === "function") {
+    return crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+}
+
+/**
+ * 턴 요청 — 응답을 받지 못한 네트워크 오류(fetch 예외)만 같은 body(같은 멱등 키)로 1회 재전송
+ * HTTP 오류 응답은 서버가 처리한 결과이므로 재전송하지 않음
+ */
+async function postTurn<T>(endpoint: string, body: Record<string, unknown>): Promise<T> {
+  const init = { method: "POST", body: JSON.stringify(body) };
+  try {
+    return await fetchChatAPI<T>(endpoint, init);
+  } catch (e) {
+    if (!(e instanceof TypeError)) throw e;
+    return fetchChatAPI<T>(endpoint, init);
+  }
+}
+
 /**
  * 채팅 세션 시작
  * - language: 'ja' (일본어, 기본) 또는 'ko' (한국어)
@@ -112,14 +140,16 @@ export function startSession(
  * 메시지 전송
  * - content: 사용자 입력 텍스트
  * - AI 응답 + RAG 참조 + 리포트 생성 가능 여부 반환
+ * - 메시지마다 idempotency_key 부여 (네트워크 오류 재전송 시 중복 처리 방지)
  */
 export function sendMessage(
   sessionId: string,
   content: string
 ): Promise<SendMessageResponse> {
-  return fetchChatAPI<SendMessageResponse>("/chat/message", {
-    method: "POST",
-    body: JSON.stringify({ session_id: sessionId, content }),
+  return postTurn<SendMessageResponse>("/chat/message", {
+    session_id: sessionId,
+    content,
+    idempotency_key: newIdempotencyKey(),
   });
 }
 
@@ -196,21 +226,22 @@ export function confirmEmail(
 
 /**
  * 음성 메시지 전송 (STT → 챗봇, TTS 없이 텍스트만 즉시 반환)
+ * - voiceMode: "fast"(경량 1회 호출) | "full"(멀티에이전트), 생략 시 서버 설정
  */
 export function sendVoiceMessage(
   sessionId: string,
   audioBase64: string,
   mimeType: string = "audio/webm",
-  enableTts: boolean = false
+  enableTts: boolean = false,
+  voiceMode?: VoiceMode
 ): Promise<VoiceMessageResponse> {
-  return fetchChatAPI<VoiceMessageResponse>("/chat/voice-message", {
-    method: "POST",
-    body: JSON.stringify({
-      session_id: sessionId,
-      audio_base64: audioBase64,
-      mime_type: mimeType,
-      enable_tts: enableTts,
-    }),
+  return postTurn<VoiceMessageResponse>("/chat/voice-message", {
+    session_id: sessionId,
+    audio_base64: audioBase64,
+    mime_type: mimeType,
+    enable_tts: enableTts,
+    voice_mode: voiceMode,
+    idempotency_key: newIdempotencyKey(),
   });
 }
 
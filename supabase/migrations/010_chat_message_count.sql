@@ -0,0 +1,47 @@
+-- ============================================
+-- 010: chat_sessions.message_count 비정규화 유지
+-- 관리자 세션 목록에서 chat_messages 전체 행을 조회하지 않도록
+-- 메시지 INSERT/DELETE 시 트리거로 카운트 갱신
+-- ============================================
+
+CREATE OR REPLACE FUNCTION update_chat_session_message_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE chat_sessions
+        SET message_count = COALESCE(message_count, 0) + 1,
+            first_message_at = COALESCE(first_message_at, NEW.created_at),
+            last_message_at = NEW.created_at
+        WHERE id = NEW.session_id;
+        RETURN NEW;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE chat_sessions
+        SET message_count = GREATEST(COALESCE(message_count, 0) - 1, 0)
+        WHERE id = OLD.session_id;
+        RETURN OLD;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_chat_messages_count ON chat_messages;
+CREATE TRIGGER trigger_chat_messages_count
+    AFTER INSERT OR DELETE ON chat_messages
+    FOR EACH ROW EXECUTE FUNCTION update_chat_session_message_count();
+
+-- 기존 데이터 백필
+UPDATE chat_sessions cs
+SET message_count = agg.cnt,
+    first_message_at = agg.first_at,
+    last_message_at = agg.last_at
+FROM (
+    SELECT session_id,
+           COUNT(*) AS cnt,
+           MIN(created_at) AS first_at,
+           MAX(created_at) AS last_at
+    FROM chat_messages
+    GROUP BY session_id
+) agg
+WHERE cs.id = agg.session_id;
+
+UPDATE chat_sessions SET message_count = 0 WHERE message_count IS NULL;
@@ -0,0 +1,86 @@
+-- ============================================
+-- 011: search_faq_multi RPC
+-- 포커스 + 컨텍스트 임베딩을 한 번에 검색하고 출처 메타데이터까지 반환
+-- (search_faq 호출 2회 + faq_vectors 추가 조회 1회 → RPC 1회)
+-- ============================================
+
+-- 출처 구분을 저장 컬럼으로 (URL 문자열 매칭을 클라이언트에서 하지 않도록)
+ALTER TABLE faq_vectors
+    ADD COLUMN IF NOT EXISTS source_type TEXT
+    GENERATED ALWAYS AS (
+        CASE WHEN youtube_url LIKE '%pubmed.ncbi.nlm.nih.gov%' THEN 'pubmed' ELSE 'youtube' END
+    ) STORED;
+
+CREATE OR REPLACE FUNCTION search_faq_multi(
+    target_category TEXT,
+    focus_embedding vector(768) DEFAULT NULL,
+    context_embedding vector(768) DEFAULT NULL,
+    match_threshold FLOAT DEFAULT 0.7,
+    match_count INT DEFAULT 5
+)
+RETURNS TABLE (
+    id UUID,
+    category TEXT,
+    question TEXT,
+    answer TEXT,
+    procedure_name TEXT,
+    youtube_url TEXT,
+    youtube_title TEXT,
+    youtube_video_id TEXT,
+    source_type TEXT,
+    similarity FLOAT,
+    matched_by TEXT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    WITH focus_hits AS (
+        SELECT fv.id AS faq_id,
+               1 - (fv.embedding <=> focus_embedding) AS sim,
+               'focus'::TEXT AS label
+        FROM faq_vectors fv
+        WHERE focus_embedding IS NOT NULL
+            AND fv.category = target_category
+        ORDER BY fv.embedding <=> focus_embedding
+        LIMIT match_count
+    ),
+    context_hits AS (
+        SELECT fv.id AS faq_id,
+               1 - (fv.embedding <=> context_embedding) AS sim,
+               'context'::TEXT AS label
+        FROM faq_vectors fv
+        WHERE context_embedding IS NOT NULL
+            AND fv.category = target_category
+        ORDER BY fv.embedding <=> context_embedding
+        LIMIT match_count
+    ),
+    -- 양쪽에 모두 걸린 행은 유사도가 높은 쪽 하나만 (동점이면 포커스 우선)
+    hits AS (
+        SELECT DISTINCT ON (h.faq_id) h.faq_id, h.sim, h.label
+        FROM (
+            SELECT * FROM focus_hits
+            UNION ALL
+            SELECT * FROM context_hits
+        ) h
+        WHERE h.sim > match_threshold
+        ORDER BY h.faq_id, h.sim DESC, h.label = 'context'
+    )
+    SELECT
+        fv.id,
+        fv.category,
+        fv.question,
+        fv.answer,
+        fv.procedure_name,
+        fv.youtube_url,
+        fv.youtube_title,
+        fv.youtube_video_id,
+        fv.source_type,
+        hits.sim AS similarity,
+        hits.label AS matched_by
+    FROM hits
+    JOIN faq_vectors fv ON fv.id = hits.faq_id
+    ORDER BY hits.sim DESC
+    LIMIT match_count;
+END;
+$$;
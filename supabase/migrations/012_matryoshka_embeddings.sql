@@ -0,0 +1,104 @@
+-- ============================================
+-- 012: Matryoshka 축소 차원 임베딩 (gemini-embedding-001)
+-- 768차원 embedding 컬럼은 그대로 두고 512/256차원 병렬 컬럼 추가
+-- 값은 768차원 벡터 앞부분을 잘라 정규화한 것 (scripts/reembed_faq_vectors.py로 채움)
+-- 백엔드는 EMBEDDING_DIM 설정에 맞는 컬럼으로 검색
+-- ============================================
+
+ALTER TABLE faq_vectors ADD COLUMN IF NOT EXISTS embedding_512 vector(512);
+ALTER TABLE faq_vectors ADD COLUMN IF NOT EXISTS embedding_256 vector(256);
+
+CREATE INDEX IF NOT EXISTS idx_faq_vectors_embedding_512
+    ON faq_vectors USING ivfflat (embedding_512 vector_cosine_ops) WITH (lists = 100);
+CREATE INDEX IF NOT EXISTS idx_faq_vectors_embedding_256
+    ON faq_vectors USING ivfflat (embedding_256 vector_cosine_ops) WITH (lists = 100);
+
+-- search_faq_multi와 같은 결과 형식. 쿼리 벡터 차원(vector_dims)으로 검색 컬럼 선택
+CREATE OR REPLACE FUNCTION search_faq_multi_dim(
+    target_category TEXT,
+    focus_embedding vector DEFAULT NULL,
+    context_embedding vector DEFAULT NULL,
+    match_threshold FLOAT DEFAULT 0.7,
+    match_count INT DEFAULT 5
+)
+RETURNS TABLE (
+    id UUID,
+    category TEXT,
+    question TEXT,
+    answer TEXT,
+    procedure_name TEXT,
+    youtube_url TEXT,
+    youtube_title TEXT,
+    youtube_video_id TEXT,
+    source_type TEXT,
+    similarity FLOAT,
+    matched_by TEXT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    dims INT := vector_dims(COALESCE(focus_embedding, context_embedding));
+    col TEXT;
+BEGIN
+    col := CASE dims
+        WHEN 768 THEN 'embedding'
+        WHEN 512 THEN 'embedding_512'
+        WHEN 256 THEN 'embedding_256'
+    END;
+    IF col IS NULL THEN
+        RAISE EXCEPTION 'unsupported embedding dimension: %', dims;
+    END IF;
+
+    RETURN QUERY EXECUTE format($q$
+        WITH focus_hits AS (
+            SELECT fv.id AS faq_id,
+                   1 - (fv.%1$I <=> $1) AS sim,
+                   'focus'::TEXT AS label
+            FROM faq_vectors fv
+            WHERE $1 IS NOT NULL
+                AND fv.category = $3
+                AND fv.%1$I IS NOT NULL
+            ORDER BY fv.%1$I <=> $1
+            LIMIT $5
+        ),
+        context_hits AS (
+            SELECT fv.id AS faq_id,
+                   1 - (fv.%1$I <=> $2) AS sim,
+                   'context'::TEXT AS label
+            FROM faq_vectors fv
+            WHERE $2 IS NOT NULL
+                AND fv.category = $3
+                AND fv.%1$I IS NOT NULL
+            ORDER BY fv.%1$I <=> $2
+            LIMIT $5
+        ),
+        hits AS (
+            SELECT DISTINCT ON (h.faq_id) h.faq_id, h.sim, h.label
+            FROM (
+                SELECT * FROM focus_hits
+                UNION ALL
+                SELECT * FROM context_hits
+            ) h
+            WHERE h.sim > $4
+            ORDER BY h.faq_id, h.sim DESC, h.label = 'context'
+        )
+        SELECT
+            fv.id,
+            fv.category,
+            fv.question,
+            fv.answer,
+            fv.procedure_name,
+            fv.youtube_url,
+            fv.youtube_title,
+            fv.youtube_video_id,
+            fv.source_type,
+            hits.sim AS similarity,
+            hits.label AS matched_by
+        FROM hits
+        JOIN faq_vectors fv ON fv.id = hits.faq_id
+        ORDER BY hits.sim DESC
+        LIMIT $5
+    $q$, col)
+    USING focus_embedding, context_embedding, target_category, match_threshold, match_count;
+END;
+$$;
@@ -0,0 +1,180 @@
+-- ============================================
+-- 013: 근사 중복 FAQ 정리 (scripts/compact_faq_vectors.py)
+-- 중복 행은 duplicate_of로 대표 행을 가리키고 검색에서 제외
+-- 대표 행의 duplicate_sources에 병합된 행의 출처(영상/논문) 링크 보존
+-- ============================================
+
+ALTER TABLE faq_vectors
+    ADD COLUMN IF NOT EXISTS duplicate_of UUID REFERENCES faq_vectors(id) ON DELETE SET NULL;
+ALTER TABLE faq_vectors
+    ADD COLUMN IF NOT EXISTS duplicate_sources JSONB DEFAULT '[]'::jsonb;
+
+CREATE INDEX IF NOT EXISTS idx_faq_vectors_duplicate_of
+    ON faq_vectors (duplicate_of) WHERE duplicate_of IS NOT NULL;
+
+-- 검색 RPC: 중복 표시된 행 제외 (본문은 011 / 012와 동일)
+CREATE OR REPLACE FUNCTION search_faq_multi(
+    target_category TEXT,
+    focus_embedding vector(768) DEFAULT NULL,
+    context_embedding vector(768) DEFAULT NULL,
+    match_threshold FLOAT DEFAULT 0.7,
+    match_count INT DEFAULT 5
+)
+RETURNS TABLE (
+    id UUID,
+    category TEXT,
+    question TEXT,
+    answer TEXT,
+    procedure_name TEXT,
+    youtube_url TEXT,
+    youtube_title TEXT,
+    youtube_video_id TEXT,
+    source_type TEXT,
+    similarity FLOAT,
+    matched_by TEXT
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    RETURN QUERY
+    WITH focus_hits AS (
+        SELECT fv.id AS faq_id,
+               1 - (fv.embedding <=> focus_embedding) AS sim,
+               'focus'::TEXT AS label
+        FROM faq_vectors fv
+        WHERE focus_embedding IS NOT NULL
+            AND fv.category = target_category
+            AND fv.duplicate_of IS NULL
+        ORDER BY fv.embedding <=> focus_embedding
+        LIMIT match_count
+    ),
+    context_hits AS (
+        SELECT fv.id AS faq_id,
+               1 - (fv.embedding <=> context_embedding) AS sim,
+               'context'::TEXT AS label
+        FROM faq_vectors fv
+        WHERE context_embedding IS NOT NULL
+            AND fv.category = target_category
+            AND fv.duplicate_of IS NULL
+        ORDER BY fv.embedding <=> context_embedding
+        LIMIT match_count
+    ),
+    hits AS (
+        SELECT DISTINCT ON (h.faq_id) h.faq_id, h.sim, h.label
+        FROM (
+            SELECT * FROM focus_hits
+            UNION ALL
+            SELECT * FROM context_hits
+        ) h
+        WHERE h.sim > match_threshold
+        ORDER BY h.faq_id, h.sim DESC, h.label = 'context'
+    )
+    SELECT
+        fv.id,
+        fv.category,
+        fv.question,
+        fv.answer,
+        fv.procedure_name,
+        fv.youtube_url,
+        fv.youtube_title,
+        fv.youtube_video_id,
+        fv.source_type,
+        hits.sim AS similarity,
+        hits.label AS matched_by
+    FROM hits
+    JOIN faq_vectors fv ON fv.id = hits.faq_id
+    ORDER BY hits.sim DESC
+    LIMIT match_count;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION search_faq_multi_dim(
+    target_category TEXT,
+    focus_embedding vector DEFAULT NULL,
+    context_embedding vector DEFAULT NULL,
+    match_threshold FLOAT DEFAULT 0.7,
+    match_count INT DEFAULT 5
+)
+RETURNS TABLE (
+    id UUID,
+    category TEXT,
+    question TEXT,
+    answer TEXT,
+    procedure_name TEXT,
+    youtube_url TEXT,
+    youtube_title TEXT,
+    youtube_video_id TEXT,
+    source_type TEXT,
+    similarity FLOAT,
+    matched_by TEXT
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    dims INT := vector_dims(COALESCE(focus_embedding, context_embedding));
+    col TEXT;
+BEGIN
+    col := CASE dims
+        WHEN 768 THEN 'embedding'
+        WHEN 512 THEN 'embedding_512'
+        WHEN 256 THEN 'embedding_256'
+    END;
+    IF col IS NULL THEN
+        RAISE EXCEPTION 'unsupported embedding dimension: %', dims;
+    END IF;
+
+    RETURN QUERY EXECUTE format($q$
+        WITH focus_hits AS (
+            SELECT fv.id AS faq_id,
+                   1 - (fv.%1$I <=> $1) AS sim,
+                   'focus'::TEXT AS label
+            FROM faq_vectors fv
+            WHERE $1 IS NOT NULL
+                AND fv.category = $3
+                AND fv.%1$I IS NOT NULL
+                AND fv.duplicate_of IS NULL
+            ORDER BY fv.%1$I <=> $1
+            LIMIT $5
+        ),
+        context_hits AS (
+            SELECT fv.id AS faq_id,
+                   1 - (fv.%1$I <=> $2) AS sim,
+                   'context'::TEXT AS label
+            FROM faq_vectors fv
+            WHERE $2 IS NOT NULL
+                AND fv.category = $3
+                AND fv.%1$I IS NOT NULL
+                AND fv.duplicate_of IS NULL
+            ORDER BY fv.%1$I <=> $2
+            LIMIT $5
+        ),
+        hits AS (
+            SELECT DISTINCT ON (h.faq_id) h.faq_id, h.sim, h.label
+            FROM (
+                SELECT * FROM focus_hits
+                UNION ALL
+                SELECT * FROM context_hits
+            ) h
+            WHERE h.sim > $4
+            ORDER BY h.faq_id, h.sim DESC, h.label = 'context'
+        )
+        SELECT
+            fv.id,
+            fv.category,
+            fv.question,
+            fv.answer,
+            fv.procedure_name,
+            fv.youtube_url,
+            fv.youtube_title,
+            fv.youtube_video_id,
+            fv.source_type,
+            hits.sim AS similarity,
+            hits.label AS matched_by
+        FROM hits
+        JOIN faq_vectors fv ON fv.id = hits.faq_id
+        ORDER BY hits.sim DESC
+        LIMIT $5
+    $q$, col)
+    USING focus_embedding, context_embedding, target_category, match_threshold, match_count;
+END;
+$$;
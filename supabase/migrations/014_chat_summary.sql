@@ -0,0 +1,9 @@
+-- ============================================
+-- 014: 채팅 세션 롤링 요약
+-- 오래된 메시지를 요약문으로 접어 챗봇 프롬프트 크기를 제한 (agents/conversation_summary.py)
+--   conversation_summary: 지금까지 접힌 대화의 요약
+--   summary_until: 요약에 포함된 마지막 메시지의 created_at (이후 메시지만 원문으로 프롬프트에 포함)
+-- ============================================
+
+ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS conversation_summary TEXT;
+ALTER TABLE chat_sessions ADD COLUMN IF NOT EXISTS summary_until TIMESTAMPTZ;
@@ -0,0 +1,195 @@
+-- ============================================
+-- 015: pipeline_jobs — 리포트 파이프라인 작업 큐
+-- API 요청 처리 프로세스의 BackgroundTasks 대신 테이블에 적재하고 별도 워커(backend/worker.py)가 처리
+-- (인스턴스 축소/배포로 작업이 사라져 상담이 processing에 멈추는 문제 방지)
+--   - 임대(lease) 기반 점유: 워커가 lease_expires_at까지 작업을 점유, 처리 중 heartbeat로 연장
+--   - 가시성 타임아웃: 임대가 만료된 running 작업은 다른 워커가 다시 점유 (워커 비정상 종료 복구)
+--   - 재시도: 실패 시 run_after를 지수 백오프로 미루고 queued로 복귀, max_attempts 초과 시 failed
+--   - 중복 방지: 같은 dedup_key의 queued/running 작업은 하나만
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS pipeline_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    kind TEXT NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    dedup_key TEXT,
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'succeeded', 'failed')),
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 3,
+    run_after TIMESTAMPTZ NOT NULL DEFAULT now(),
+    leased_by TEXT,
+    lease_expires_at TIMESTAMPTZ,
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_pipeline_jobs_dedup_active
+    ON pipeline_jobs (dedup_key)
+    WHERE dedup_key IS NOT NULL AND status IN ('queued', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_jobs_queued
+    ON pipeline_jobs (run_after)
+    WHERE status = 'queued';
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_jobs_running_lease
+    ON pipeline_jobs (lease_expires_at)
+    WHERE status = 'running';
+
+
+-- 적재 (같은 dedup_key의 진행 중 작업이 있으면 그 작업 id 반환)
+CREATE OR REPLACE FUNCTION enqueue_pipeline_job(
+    p_kind TEXT,
+    p_payload JSONB DEFAULT '{}'::jsonb,
+    p_dedup_key TEXT DEFAULT NULL,
+    p_max_attempts INT DEFAULT 3
+)
+RETURNS TABLE (job_id UUID, created BOOLEAN)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_id UUID;
+BEGIN
+    INSERT INTO pipeline_jobs (kind, payload, dedup_key, max_attempts)
+    VALUES (p_kind, p_payload, p_dedup_key, p_max_attempts)
+    ON CONFLICT (dedup_key) WHERE dedup_key IS NOT NULL AND status IN ('queued', 'running')
+    DO NOTHING
+    RETURNING id INTO v_id;
+
+    IF v_id IS NOT NULL THEN
+        RETURN QUERY SELECT v_id, TRUE;
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    SELECT pj.id, FALSE
+    FROM pipeline_jobs pj
+    WHERE pj.dedup_key = p_dedup_key AND pj.status IN ('queued', 'running')
+    LIMIT 1;
+END;
+$$;
+
+
+-- 점유: 실행 가능한 queued 작업 + 임대 만료된 running 작업을 최대 p_limit개 (SKIP LOCKED로 워커 간 경합 없음)
+CREATE OR REPLACE FUNCTION claim_pipeline_jobs(
+    p_worker TEXT,
+    p_limit INT DEFAULT 1,
+    p_lease_seconds INT DEFAULT 300
+)
+RETURNS SETOF pipeline_jobs
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- 임대 만료 + 시도 소진 작업은 failed로 정리 (다시 점유하지 않음)
+    UPDATE pipeline_jobs
+    SET status = 'failed',
+        last_error = COALESCE(last_error, '') || ' [lease expired after final attempt]',
+        leased_by = NULL,
+        lease_expires_at = NULL,
+        finished_at = now(),
+        updated_at = now()
+    WHERE status = 'running'
+        AND lease_expires_at < now()
+        AND attempts >= max_attempts;
+
+    RETURN QUERY
+    WITH candidates AS (
+        SELECT pj.id
+        FROM pipeline_jobs pj
+        WHERE (pj.status = 'queued' AND pj.run_after <= now())
+           OR (pj.status = 'running' AND pj.lease_expires_at < now())
+        ORDER BY pj.run_after, pj.created_at
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE pipeline_jobs pj
+    SET status = 'running',
+        attempts = pj.attempts + 1,
+        leased_by = p_worker,
+        lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+        updated_at = now()
+    FROM candidates
+    WHERE pj.id = candidates.id
+    RETURNING pj.*;
+END;
+$$;
+
+
+-- 임대 연장 (다른 워커에게 넘어간 작업이면 FALSE)
+CREATE OR REPLACE FUNCTION heartbeat_pipeline_job(
+    p_job_id UUID,
+    p_worker TEXT,
+    p_lease_seconds INT DEFAULT 300
+)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE pipeline_jobs
+    SET lease_expires_at = now() + make_interval(secs => p_lease_seconds),
+        updated_at = now()
+    WHERE id = p_job_id AND leased_by = p_worker AND status = 'running';
+    RETURN FOUND;
+END;
+$$;
+
+
+-- 완료
+CREATE OR REPLACE FUNCTION complete_pipeline_job(p_job_id UUID, p_worker TEXT)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE pipeline_jobs
+    SET status = 'succeeded',
+        leased_by = NULL,
+        lease_expires_at = NULL,
+        last_error = NULL,
+        finished_at = now(),
+        updated_at = now()
+    WHERE id = p_job_id AND leased_by = p_worker AND status = 'running';
+    RETURN FOUND;
+END;
+$$;
+
+
+-- 실패: 시도가 남았으면 p_retry_seconds 뒤로 미뤄 queued, 아니면 failed
+-- p_release=TRUE: 워커 종료로 반납 (시도 횟수 차감, 즉시 재점유 가능)
+CREATE OR REPLACE FUNCTION fail_pipeline_job(
+    p_job_id UUID,
+    p_worker TEXT,
+    p_error TEXT,
+    p_retry_seconds INT DEFAULT 30,
+    p_release BOOLEAN DEFAULT FALSE
+)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_status TEXT;
+BEGIN
+    UPDATE pipeline_jobs
+    SET status = CASE
+            WHEN p_release OR attempts < max_attempts THEN 'queued'
+            ELSE 'failed'
+        END,
+        attempts = CASE WHEN p_release THEN GREATEST(attempts - 1, 0) ELSE attempts END,
+        run_after = CASE
+            WHEN p_release THEN now()
+            ELSE now() + make_interval(secs => p_retry_seconds)
+        END,
+        last_error = p_error,
+        leased_by = NULL,
+        lease_expires_at = NULL,
+        finished_at = CASE
+            WHEN p_release OR attempts < max_attempts THEN NULL
+            ELSE now()
+        END,
+        updated_at = now()
+    WHERE id = p_job_id AND leased_by = p_worker AND status = 'running'
+    RETURNING status INTO v_status;
+    RETURN v_status;
+END;
+$$;
@@ -0,0 +1,15 @@
+-- ============================================
+-- 016: pipeline_checkpoints — 파이프라인 스텝별 체크포인트
+-- 스텝 입력의 내용 해시 + 출력 저장. 재실행(resume) 시 입력 해시가 같은 스텝은 저장된 출력으로 건너뜀
+-- (R4 작성 실패 후 재시도에서 번역/정제/CTA/의도/분류/검증을 다시 호출하지 않도록)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS pipeline_checkpoints (
+    consultation_id UUID NOT NULL REFERENCES consultations(id) ON DELETE CASCADE,
+    step TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    output JSONB NOT NULL,
+    duration_ms INT,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (consultation_id, step)
+);
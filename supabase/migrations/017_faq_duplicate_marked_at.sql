@@ -0,0 +1,35 @@
+-- ============================================
+-- 017: faq_vectors.duplicate_marked_at — duplicate_of가 기록된 시각
+-- 인메모리 인덱스 증분 갱신이 "이후에 중복 표시된 행"만 조회해 제거하도록
+-- (duplicate_of는 오래된 행에도 붙으므로 created_at 워터마크로는 알 수 없음)
+-- 값은 트리거가 DB 시각으로 기록 — 스크립트 실행 호스트의 시계가 늦으면 워터마크 아래로 기록돼 누락되므로
+-- ============================================
+
+ALTER TABLE faq_vectors
+    ADD COLUMN IF NOT EXISTS duplicate_marked_at TIMESTAMPTZ;
+
+UPDATE faq_vectors
+SET duplicate_marked_at = now()
+WHERE duplicate_of IS NOT NULL AND duplicate_marked_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_faq_vectors_duplicate_marked_at
+    ON faq_vectors (duplicate_marked_at) WHERE duplicate_of IS NOT NULL;
+
+
+-- duplicate_of가 바뀔 때 DB 시각으로 기록 (클라이언트가 보낸 값은 무시)
+CREATE OR REPLACE FUNCTION set_duplicate_marked_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.duplicate_of IS DISTINCT FROM OLD.duplicate_of THEN
+        NEW.duplicate_marked_at = CASE WHEN NEW.duplicate_of IS NULL THEN NULL ELSE NOW() END;
+    ELSE
+        NEW.duplicate_marked_at = COALESCE(OLD.duplicate_marked_at, NEW.duplicate_marked_at);  -- 백필(위 UPDATE) 재실행 허용
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_faq_vectors_duplicate_marked_at ON faq_vectors;
+CREATE TRIGGER trigger_faq_vectors_duplicate_marked_at
+    BEFORE UPDATE ON faq_vectors
+    FOR EACH ROW EXECUTE FUNCTION set_duplicate_marked_at();
@@ -0,0 +1,44 @@
+-- ============================================
+-- 018: consultations.pending_report_email — 관리자 send-email로 예약된 R4 이메일
+-- send-email은 /end의 chat_pipeline과 같은 작업 키(pipeline:{id})로 적재해 파이프라인이 동시에 두 번 돌지 않게 하고,
+-- 이메일 정보는 여기에 남겨 그 키로 실행된 작업(어느 핸들러든)이 리포트 생성 후 발송 (발송 시 NULL로 비움)
+--   {"email": "...", "customer_name": "...", "session_id": "..."}
+-- ============================================
+
+ALTER TABLE consultations
+    ADD COLUMN IF NOT EXISTS pending_report_email JSONB;
+
+
+-- 예약 가져가기: 값을 반환하고 비움 (동시에 호출돼도 한 호출만 값을 받음 → 이메일 중복 발송 방지)
+CREATE OR REPLACE FUNCTION take_pending_report_email(p_consultation_id UUID)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    v_pending JSONB;
+BEGIN
+    SELECT pending_report_email INTO v_pending
+    FROM consultations
+    WHERE id = p_consultation_id
+    FOR UPDATE;
+
+    IF v_pending IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    UPDATE consultations
+    SET pending_report_email = NULL
+    WHERE id = p_consultation_id;
+    RETURN v_pending;
+END;
+$$;
+
+-- 발송 실패 시 되돌리기 (그 사이 새 예약이 들어왔으면 새 예약 유지)
+CREATE OR REPLACE FUNCTION restore_pending_report_email(p_consultation_id UUID, p_pending JSONB)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+    UPDATE consultations
+    SET pending_report_email = COALESCE(pending_report_email, p_pending)
+    WHERE id = p_consultation_id;
+$$;